@@ -8,6 +8,7 @@ from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import func, or_, select
 
 from sql.db import async_session
+from sql.db_roles import invalidate_user_roles
 from sql.models import Admins, OrdinaryUser
 from .admin_buttons import (
     ADMIN_ADD_CB,
@@ -345,8 +346,10 @@ async def confirm_admin_delete(callback: types.CallbackQuery):
             return
 
         deleted_name = _admin_display_name(admin)
+        deleted_tg_id = admin.tg_id
         await session.delete(admin)
         await session.commit()
+    invalidate_user_roles(deleted_tg_id)
 
     remaining_total = await _count_admins()
     next_index = 0 if remaining_total <= 0 else min(index, remaining_total - 1)
@@ -508,6 +511,7 @@ async def add_admin_phone(message: types.Message, state: FSMContext):
         )
         session.add(new_admin)
         await session.commit()
+    invalidate_user_roles(tg_id)
 
     await state.clear()
     display_name = escape((admin_fullname or "").strip() or _normalize_username(username) or str(tg_id))
@@ -9,6 +9,9 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from sqlalchemy import delete, func, select
 
 from sql.db import async_session
+from sql.db_availability import apply_compiled_schedule, invalidate_barber_schedule
+from sql.db_catalog import bump_catalog_version
+from sql.db_roles import invalidate_user_roles
 from sql.models import BarberPhotos, BarberServices, Barbers, OrdinaryUser
 from utils.states import AdminStates
 from .admin_buttons import (
@@ -399,10 +402,14 @@ async def confirm_barber_delete(callback: types.CallbackQuery):
             return
 
         deleted_name = _barber_display_name(barber)
+        deleted_tg_id = barber.tg_id
         await session.execute(delete(BarberPhotos).where(BarberPhotos.barber_id == barber_id))
         await session.execute(delete(BarberServices).where(BarberServices.barber_id == barber_id))
         await session.delete(barber)
         await session.commit()
+    invalidate_barber_schedule(barber_id)
+    invalidate_user_roles(deleted_tg_id)
+    await bump_catalog_version()
 
     remaining_total = await _count_barbers()
     next_index = 0 if remaining_total <= 0 else min(index, remaining_total - 1)
@@ -634,8 +641,11 @@ async def save_without_photo(call: types.CallbackQuery, state: FSMContext):
             breakdown=data.get("breakdown"),
             is_paused_date=date.today(),
         )
+        apply_compiled_schedule(barber)
         session.add(barber)
         await session.commit()
+    invalidate_user_roles(data["tg_id"])
+    await bump_catalog_version()
 
     work_time = escape(_format_time_range(data.get("work_time")))
     breakdown = escape(_format_time_range(data.get("breakdown")))
@@ -696,6 +706,7 @@ async def add_barber_photo(message: types.Message, state: FSMContext):
             breakdown=breakdown,
             is_paused_date=date.today(),
         )
+        apply_compiled_schedule(new_barber)
         session.add(new_barber)
         await session.flush()
         session.add(
@@ -705,6 +716,8 @@ async def add_barber_photo(message: types.Message, state: FSMContext):
             )
         )
         await session.commit()
+    invalidate_user_roles(new_barber.tg_id)
+    await bump_catalog_version()
 
     work_time_text = escape(_format_time_range(work_time))
     breakdown_text = escape(_format_time_range(breakdown))
@@ -7,6 +7,7 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy import func, select
 
 from sql.db import async_session
+from sql.db_catalog import bump_catalog_version
 from sql.db_services import create_service
 from sql.models import Services
 from utils.emoji_map import SERVICE_EMOJIS
@@ -333,6 +334,7 @@ async def confirm_service_delete(callback: types.CallbackQuery):
         deleted_name = service.name
         await session.delete(service)
         await session.commit()
+    await bump_catalog_version()
 
     remaining_total = await _count_services()
     next_index = 0 if remaining_total <= 0 else min(index, remaining_total - 1)
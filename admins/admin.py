@@ -1,9 +1,7 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from sqlalchemy.future import select
-
-from sql.db import async_session
-from sql.models import Admins
+from sql.db_admins import get_admin
+from sql.db_roles import UserRoles, resolve_user_roles
 from .admin_buttons import markup
 from .service_admin_common import show_admin_main_menu
 
@@ -11,14 +9,11 @@ router = Router()
 
 
 @router.message(Command("admin"))
-async def admin_panel(message: types.Message) -> None:
-    user_tg_id = message.from_user.id
-
-    async with async_session() as session:
-        result = await session.execute(
-            select(Admins).where(Admins.tg_id == user_tg_id)
-        )
-        admin = result.scalars().first()
+async def admin_panel(message: types.Message, roles: UserRoles | None = None) -> None:
+    # roles — RoleMiddleware'dan; middleware'siz chaqirilsa keshdan olinadi
+    if roles is None:
+        roles = await resolve_user_roles(message.from_user.id)
+    admin = await get_admin(roles.admin_id) if roles.is_admin else None
 
     if not admin:
         await message.answer("⛔ Bu bo'lim faqat adminlar uchun.")
@@ -5,8 +5,10 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from sqlalchemy import select
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_day
+from sql.db_order_rollup import apply_order_stats_delta
+from sql.db_pagination import fetch_keyset_page, invalidate_order_pages
 from sql.models import Order, Services, Barbers
-from sqlalchemy import func
 
 router = Router()
 CHECK_ORDERS_PER_PAGE = 1
@@ -98,16 +100,6 @@ async def _prepare_order_rows(orders):
     return rows
 
 
-def _clamp_page(page: int, total_pages: int) -> int:
-    if total_pages < 1:
-        return 1
-    if page < 1:
-        return 1
-    if page > total_pages:
-        return total_pages
-    return page
-
-
 def _page_window(page: int, total_pages: int, window: int = 20):
     if total_pages <= 50:
         return list(range(1, total_pages + 1))
@@ -186,25 +178,25 @@ def _build_check_orders_keyboard(
 async def get_check_orders_page(page: int, search_mode: bool = False):
     try:
         async with async_session() as session:
-            total_orders = await session.scalar(select(func.count(Order.id)))
-            total_orders = int(total_orders or 0)
-            if total_orders == 0:
-                return "Hozircha navbatlar mavjud emas.", None, 0, 0, 1
-
-            total_pages = (total_orders + CHECK_ORDERS_PER_PAGE - 1) // CHECK_ORDERS_PER_PAGE
-            page = _clamp_page(page, total_pages)
-            offset = (page - 1) * CHECK_ORDERS_PER_PAGE
-
-            result = await session.execute(
-                select(Order)
-                .order_by(Order.date.desc(), Order.time.desc())
-                .offset(offset)
-                .limit(CHECK_ORDERS_PER_PAGE)
+            order_page = await fetch_keyset_page(
+                session,
+                select(Order),
+                [Order.date, Order.time, Order.id],
+                scope=("check_orders",),
+                page=page,
+                page_size=CHECK_ORDERS_PER_PAGE,
+                descending=True,
             )
-            orders = result.scalars().all()
     except Exception:
         return "❌ Navbatlar olishda xatolik yuz berdi.", None, 0, 0, 1
 
+    total_orders = order_page.total
+    if total_orders == 0:
+        return "Hozircha navbatlar mavjud emas.", None, 0, 0, 1
+
+    orders = order_page.items
+    total_pages = order_page.total_pages
+    page = order_page.page
     if not orders:
         return "Hozircha navbatlar mavjud emas.", None, total_orders, total_pages, page
 
@@ -377,7 +369,10 @@ async def delete_order_from_edit_mode(callback: types.CallbackQuery, state: FSMC
             order = await session.get(Order, order_id)
             if order is not None:
                 await session.delete(order)
+                await apply_order_stats_delta(session, [order], sign=-1)
                 await session.commit()
+                invalidate_barber_day(order.barber_id, order.date)
+                invalidate_order_pages()
                 deleted = True
     except Exception:
         await callback.answer("❌ Navbatni o'chirishda xatolik yuz berdi.", show_alert=True)
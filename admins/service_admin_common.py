@@ -3,10 +3,9 @@ from html import escape
 
 from aiogram import Bot, types
 from aiogram.types import InlineKeyboardMarkup
-from sqlalchemy import select
 
-from sql.db import async_session
-from sql.models import Admins, Services, BarberServices
+from sql.db_roles import resolve_user_roles
+from sql.models import Services, BarberServices
 from utils.emoji_map import SERVICE_EMOJIS
 from utils.service_pricing import format_price
 from .admin_buttons import ADMIN_MAIN_MENU_TITLE, get_main_menu
@@ -105,12 +104,7 @@ def render_empty_services_text(
 
 
 async def is_admin_user(user_id: int) -> bool:
-    async with async_session() as session:
-        admin_id = await session.scalar(
-            select(Admins.id).where(Admins.tg_id == user_id)
-        )
-
-    return admin_id is not None
+    return (await resolve_user_roles(user_id)).is_admin
 
 
 async def ensure_admin_callback(
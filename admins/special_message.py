@@ -1,15 +1,27 @@
 # admins/special_message.py
+from collections.abc import AsyncIterator
+
 from aiogram import Router, types, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
+from sqlalchemy import select, union
 
 from sql.db import async_session
+from sql.db_roles import resolve_user_roles
+from sql.db_broadcast import (
+    add_broadcast_recipients,
+    create_broadcast_job,
+    finish_broadcast_collection,
+    renew_broadcast_lease,
+)
 from sql.models import Admins, Barbers, OrdinaryUser, User
+from utils.broadcast import broadcast_engine
 from utils.states import BroadcastState
 
 router = Router()
 
+TARGET_STREAM_CHUNK_SIZE = 1000
+
 SPECIAL_MSG_ADMINS_CB = "special_msg_admins"
 SPECIAL_MSG_BARBERS_CB = "special_msg_barbers"
 SPECIAL_MSG_ALL_CB = "special_msg_all"
@@ -32,31 +44,40 @@ def _broadcast_target_kb() -> types.InlineKeyboardMarkup:
 
 
 async def _is_admin(tg_id: int) -> bool:
-    async with async_session() as session:
-        res = await session.execute(select(Admins.tg_id).where(Admins.tg_id == tg_id))
-        return res.scalar_one_or_none() is not None
-
-
-async def _fetch_tg_ids(session, model) -> set[int]:
-    res = await session.execute(select(model.tg_id).where(model.tg_id.isnot(None)))
-    return {tg_id for (tg_id,) in res if tg_id}
-
+    return (await resolve_user_roles(tg_id)).is_admin
+
+
+def _target_tg_ids_query(target: str):
+    if target == SPECIAL_MSG_ADMINS_CB:
+        models = (Admins,)
+    elif target == SPECIAL_MSG_BARBERS_CB:
+        models = (Barbers,)
+    elif target == SPECIAL_MSG_ALL_CB:
+        models = (Admins, Barbers, User, OrdinaryUser)
+    else:
+        return None
+
+    selects = [
+        select(model.tg_id.label("tg_id")).where(model.tg_id.isnot(None), model.tg_id != 0)
+        for model in models
+    ]
+    # UNION takrorlarni bazaning o'zida olib tashlaydi
+    return selects[0].distinct() if len(selects) == 1 else union(*selects)
+
+
+async def _iter_target_tg_id_chunks(
+    target: str,
+    chunk_size: int = TARGET_STREAM_CHUNK_SIZE,
+) -> AsyncIterator[list[int]]:
+    """Qabul qiluvchilarni server-side cursor orqali bo'lak-bo'lak beradi."""
+    query = _target_tg_ids_query(target)
+    if query is None:
+        return
 
-async def _resolve_target_tg_ids(target: str) -> set[int]:
     async with async_session() as session:
-        tg_ids = set()
-
-        if target == SPECIAL_MSG_ADMINS_CB:
-            tg_ids.update(await _fetch_tg_ids(session, Admins))
-        elif target == SPECIAL_MSG_BARBERS_CB:
-            tg_ids.update(await _fetch_tg_ids(session, Barbers))
-        elif target == SPECIAL_MSG_ALL_CB:
-            tg_ids.update(await _fetch_tg_ids(session, Admins))
-            tg_ids.update(await _fetch_tg_ids(session, Barbers))
-            tg_ids.update(await _fetch_tg_ids(session, User))
-            tg_ids.update(await _fetch_tg_ids(session, OrdinaryUser))
-
-        return tg_ids
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.scalars().partitions(chunk_size):
+            yield [int(tg_id) for tg_id in partition]
 
 
 @router.message(F.text == "✉️ Mahsus xabar yuborish")
@@ -119,28 +140,32 @@ async def send_broadcast(message: types.Message, state: FSMContext):
         await state.clear()
         return await message.answer("⚠️ Xatolik: qabul qiluvchi guruh tanlanmagan.")
 
-    tg_ids = await _resolve_target_tg_ids(target)
-    if not tg_ids:
-        await state.clear()
-        return await message.answer("Hech qanday foydalanuvchi topilmadi.")
-
-    sent = 0
-    failed = 0
-
-    await message.answer("📨 Xabar yuborilmoqda, iltimos kuting...")
-
-    for tg_id in tg_ids:
-        try:
-            await message.bot.send_message(chat_id=tg_id, text=text)
-            sent += 1
-        except Exception:
-            failed += 1
+    job = None
+    # Birinchi bo'lak kelishi bilan yuborish boshlanadi, qolganlari navbatga qo'shiladi
+    try:
+        async for tg_ids in _iter_target_tg_id_chunks(target):
+            if job is None:
+                progress_msg = await message.answer("📨 Xabar yuborilmoqda, iltimos kuting...")
+                job = await create_broadcast_job(
+                    sender_tg_id=message.from_user.id,
+                    text=text,
+                    chat_ids=tg_ids,
+                    progress_chat_id=progress_msg.chat.id,
+                    progress_message_id=progress_msg.message_id,
+                    collecting=True,
+                    owner=broadcast_engine.owner,
+                    lease_seconds=broadcast_engine.lease_seconds,
+                )
+                broadcast_engine.start(message.bot, job.id)
+            else:
+                await add_broadcast_recipients(job.id, tg_ids)
+                # Yig'uvchi tirik: boshqa worker'lar bu vazifani yopmaydi
+                await renew_broadcast_lease(job.id, broadcast_engine.owner, broadcast_engine.lease_seconds)
+    finally:
+        # Xatolikda ham yuboruvchi yig'ilganlari bilan yakunlanishi kerak
+        if job is not None:
+            await finish_broadcast_collection(job.id)
 
     await state.clear()
-
-    if sent == 0:
-        return await message.answer("❌ Xabar yuborilmadi.")
-    if failed == 0:
-        return await message.answer(f"Xabar muvaffaqiyatli yuborildi ✅\nYuborildi: {sent} ta")
-
-    await message.answer(f"Yuborildi: {sent} ta, Xatolik: {failed} ta")
+    if job is None:
+        return await message.answer("Hech qanday foydalanuvchi topilmadi.")
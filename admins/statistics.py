@@ -4,10 +4,12 @@ from datetime import datetime
 from typing import Any
 from aiogram import F, Router, types
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from sql.db import async_session
-from sql.models import Barbers, Order, Services
+from sql.db_order_stats import get_barber_order_stats, get_overall_order_stats
+from sql.models import Barbers
+from utils.service_pricing import format_price
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -70,6 +72,7 @@ def _overall_panel_text(stats: dict[str, int], now_dt: datetime) -> str:
         f"📅 <b>Bugungi sana:</b> {now_dt.strftime('%Y-%m-%d')}\n\n"
         f"👥 <b>Jami navbat olgan foydalanuvchilar:</b> {stats['queue_users']}\n"
         f"📦 <b>Jami buyurtmalar:</b> {stats['total_orders']}\n"
+        f"💰 <b>Jami tushum:</b> {format_price(stats['total_revenue'])} so'm\n"
         f"📅 <b>Bugungi buyurtmalar:</b> {stats['today_orders']}\n"
         f"✅ <b>Bugungi yakunlangan:</b> {stats['today_completed']}\n"
         f"⏳ <b>Bugungi kelasi navbatlar:</b> {stats['today_upcoming']}\n"
@@ -109,32 +112,10 @@ def _barber_panel_text(
 
 
 async def _fetch_overall_data(now_dt: datetime) -> tuple[dict[str, int], list[tuple[int, str | None, str | None]]]:
-    today = now_dt.date()
-    now_time = now_dt.time()
-
-    upcoming_condition = or_(
-        Order.date > today,
-        and_(Order.date == today, Order.time >= now_time),
-    )
 
     try:
         async with async_session() as session:
-            order_row = (
-                await session.execute(
-                    select(
-                        func.count(Order.id).label("total_orders"),
-                        func.count(func.distinct(Order.user_id)).label("queue_users"),
-                        func.count(Order.id).filter(Order.booked_date == today).label("today_orders"),
-                        func.count(Order.id)
-                        .filter(and_(Order.date == today, Order.time < now_time))
-                        .label("today_completed"),
-                        func.count(Order.id)
-                        .filter(and_(Order.date == today, Order.time >= now_time))
-                        .label("today_upcoming"),
-                        func.count(Order.id).filter(upcoming_condition).label("overall_upcoming"),
-                    )
-                )
-            ).mappings().one()
+            order_stats = await get_overall_order_stats(now=now_dt, session=session)
 
             barber_row = (
                 await session.execute(
@@ -164,12 +145,13 @@ async def _fetch_overall_data(now_dt: datetime) -> tuple[dict[str, int], list[tu
         raise
 
     stats = {
-        "queue_users": _safe_int(order_row["queue_users"]),
-        "total_orders": _safe_int(order_row["total_orders"]),
-        "today_orders": _safe_int(order_row["today_orders"]),
-        "today_completed": _safe_int(order_row["today_completed"]),
-        "today_upcoming": _safe_int(order_row["today_upcoming"]),
-        "overall_upcoming": _safe_int(order_row["overall_upcoming"]),
+        "queue_users": order_stats.queue_users,
+        "total_orders": order_stats.total,
+        "total_revenue": order_stats.revenue,
+        "today_orders": order_stats.booked_today,
+        "today_completed": order_stats.today_completed,
+        "today_upcoming": order_stats.today_upcoming,
+        "overall_upcoming": order_stats.upcoming,
         "active_barbers": _safe_int(barber_row["active_barbers"]),
         "paused_barbers": _safe_int(barber_row["paused_barbers"]),
     }
@@ -230,12 +212,6 @@ async def barber_stats(callback: CallbackQuery):
         return
 
     now_dt = datetime.now()
-    today = now_dt.date()
-    now_time = now_dt.time()
-    upcoming_condition = or_(
-        Order.date > today,
-        and_(Order.date == today, Order.time >= now_time),
-    )
 
     try:
         async with async_session() as session:
@@ -244,56 +220,7 @@ async def barber_stats(callback: CallbackQuery):
                 await callback.answer("❌ Barber topilmadi.", show_alert=True)
                 return
 
-            barber_id_str = str(barber.id)
-            row = (
-                await session.execute(
-                    select(
-                        func.count(Order.id).label("total_orders"),
-                        func.count(Order.id).filter(Order.booked_date == today).label("today_orders"),
-                        func.count(Order.id)
-                        .filter(and_(Order.date == today, Order.time < now_time))
-                        .label("today_completed"),
-                        func.count(Order.id)
-                        .filter(and_(Order.date == today, Order.time >= now_time))
-                        .label("today_upcoming"),
-                        func.count(Order.id).filter(upcoming_condition).label("overall_upcoming"),
-                        func.count(func.distinct(Order.user_id)).label("unique_users"),
-                    ).where(Order.barber_id == barber_id_str)
-                )
-            ).mappings().one()
-
-            top_service_row = (
-                await session.execute(
-                    select(
-                        Order.service_id.label("service_id"),
-                        func.count(Order.id).label("service_count"),
-                    )
-                    .where(Order.barber_id == barber_id_str)
-                    .group_by(Order.service_id)
-                    .order_by(func.count(Order.id).desc(), Order.service_id.asc())
-                    .limit(1)
-                )
-            ).mappings().first()
-
-            top_service_name = "Mavjud emas"
-            top_service_count = 0
-            if top_service_row:
-                top_service_count = _safe_int(top_service_row["service_count"])
-                raw_service_id = top_service_row["service_id"]
-                top_service_name = str(raw_service_id)
-
-                service_pk = None
-                try:
-                    service_pk = int(raw_service_id)
-                except (TypeError, ValueError):
-                    service_pk = None
-
-                if service_pk is not None:
-                    service_name = await session.scalar(
-                        select(Services.name).where(Services.id == service_pk)
-                    )
-                    if service_name:
-                        top_service_name = service_name
+            stats_row = await get_barber_order_stats(barber.id, now=now_dt, session=session)
 
     except SQLAlchemyError:
         logger.exception("DB error when fetching barber analytics for barber_id=%s", barber_id)
@@ -301,19 +228,24 @@ async def barber_stats(callback: CallbackQuery):
         return
 
     stats = {
-        "total_orders": _safe_int(row["total_orders"]),
-        "today_orders": _safe_int(row["today_orders"]),
-        "today_completed": _safe_int(row["today_completed"]),
-        "today_upcoming": _safe_int(row["today_upcoming"]),
-        "overall_upcoming": _safe_int(row["overall_upcoming"]),
-        "unique_users": _safe_int(row["unique_users"]),
+        "total_orders": stats_row.total,
+        "today_orders": stats_row.booked_today,
+        "today_completed": stats_row.today_completed,
+        "today_upcoming": stats_row.today_upcoming,
+        "overall_upcoming": stats_row.upcoming,
+        "unique_users": stats_row.unique_users,
     }
+    top_service_name = stats_row.top_service_name
+    if not top_service_name:
+        top_service_name = (
+            str(stats_row.top_service_id) if stats_row.top_service_id is not None else "Mavjud emas"
+        )
 
     text = _barber_panel_text(
         barber_name=_barber_display_name(barber.barber_first_name, barber.barber_last_name),
         stats=stats,
         top_service_name=top_service_name,
-        top_service_count=top_service_count,
+        top_service_count=stats_row.top_service_count,
         now_dt=now_dt,
     )
 
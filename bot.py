@@ -1,14 +1,39 @@
 #bot.py
 import asyncio
+import logging
 from contextlib import suppress
+from datetime import timedelta
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import StateFilter
-from config import BOT_TOKEN
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import web
+from config import (
+    BOT_MODE,
+    BOT_TOKEN,
+    FSM_EVENT_LOCK_TIMEOUT_SECONDS,
+    FSM_PURGE_INTERVAL_SECONDS,
+    FSM_STATE_TTL_SECONDS,
+    FSM_STORAGE,
+    WEBHOOK_BASE_URL,
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_PENDING,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_WORKERS,
+)
+from utils.broadcast import broadcast_engine
 from utils.logger import setup_logger
+from utils.role_middleware import RoleMiddleware
+from utils.webhook import build_webhook_app
 from admins import router as admins_router
 from superadmins import router as barber_router
-from sql.db import init_db
+from sql.db import engine, get_pool_status, init_db
+from sql.db_availability import backfill_barber_schedules
+from sql.db_fsm_storage import DatabaseEventIsolation, DatabaseStorage, fsm_purge_worker
+from sql.db_order_rollup import ensure_order_stats_backfilled
 from sql.db_services import service_discount_expiry_worker
+from superadmins.order_realtime_notify import barber_event_bus
 #kere bopqoldi
 # from utils.get_file_id import router as fileid_router
 from handlers import (
@@ -23,7 +48,22 @@ from handlers.main_btn_handle import router as main_btn_router
         
 # Bot va Dispatcher obyektlari
 bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+if FSM_STORAGE == "database":
+    # Bir nechta worker bitta foydalanuvchi holatini ko'radi va qayta ishga tushishda yo'qolmaydi
+    fsm_storage = DatabaseStorage(
+        ttl=timedelta(seconds=FSM_STATE_TTL_SECONDS) if FSM_STATE_TTL_SECONDS > 0 else None
+    )
+    fsm_isolation = DatabaseEventIsolation(
+        timeout=timedelta(seconds=FSM_EVENT_LOCK_TIMEOUT_SECONDS)
+    )
+    dp = Dispatcher(storage=fsm_storage, events_isolation=fsm_isolation)
+else:
+    fsm_storage = MemoryStorage()
+    fsm_isolation = None
+    dp = Dispatcher(storage=fsm_storage)
+
+# Rollar (admin/barber/foydalanuvchi) har bir update uchun keshdan bir marta olinadi
+dp.update.outer_middleware(RoleMiddleware())
 
 # dp.message.register(
 #     start.start_handler,
@@ -251,18 +291,62 @@ dp.message.register(
     booking.UserState.waiting_for_date
 )
 
+async def run_webhook():
+    app = build_webhook_app(
+        dp,
+        bot,
+        path=WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        workers=WEBHOOK_WORKERS,
+        max_pending=WEBHOOK_MAX_PENDING,
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+    await site.start()
+    await bot.set_webhook(
+        f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
 # Asosiy ishga tushirish
 async def main():
     setup_logger()
     await init_db()
+    await ensure_order_stats_backfilled()
+    await backfill_barber_schedules()
     print("Bot ishga tushdi...")
-    discount_expiry_task = asyncio.create_task(service_discount_expiry_worker())
+    background_tasks = [asyncio.create_task(service_discount_expiry_worker())]
+    if isinstance(fsm_storage, DatabaseStorage):
+        # Muddati o'tgan FSM qatorlari faqat ishga tushishda emas, doimiy tozalanadi
+        background_tasks.append(
+            asyncio.create_task(
+                fsm_purge_worker(fsm_storage, fsm_isolation, interval_seconds=FSM_PURGE_INTERVAL_SECONDS)
+            )
+        )
+    # To'xtab qolgan (egasining ijarasi tugagan) xabar yuborish vazifalari
+    background_tasks.append(asyncio.create_task(broadcast_engine.watch_unfinished(bot)))
+    # Yangi navbat e'lonlari (pg_notify) barcha worker'larda tinglanadi
+    barber_event_bus.start(bot)
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == "webhook":
+            await run_webhook()
+        else:
+            await dp.start_polling(bot)
     finally:
-        discount_expiry_task.cancel()
-        with suppress(asyncio.CancelledError):
-            await discount_expiry_task
+        await barber_event_bus.stop()
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        logging.getLogger(__name__).info("DB pool stats: %s", get_pool_status())
+        await engine.dispose()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -3,7 +3,8 @@ from html import escape
 from sqlalchemy import select
 
 from sql.db import async_session
-from sql.db_barber_profile import get_barber_hidden_fields
+from sql.db_barber_profile import load_barber_cards
+from sql.db_catalog import get_catalog_barber_extras
 from sql.models import BarberPhotos, Barbers
 
 
@@ -75,7 +76,15 @@ async def get_barber_card_content(
     include_status: bool = False,
     position: tuple[int, int] | None = None,
 ) -> tuple[str, str | None]:
-    hidden_fields = set(await get_barber_hidden_fields(barber.id))
+    extras = await get_catalog_barber_extras(barber.id)
+    if extras is None:
+        # Katalogga hali tushmagan barber: bitta so'rov bilan bazadan
+        card = (await load_barber_cards([barber.id])).get(int(barber.id))
+        photo = card.photo if card else None
+        hidden_fields = set(card.hidden_fields) if card else set()
+    else:
+        photo, hidden_fields = extras
+
     caption = build_barber_caption(
         barber,
         title=title,
@@ -83,5 +92,4 @@ async def get_barber_card_content(
         hidden_fields=hidden_fields,
         position=position,
     )
-    photo = await fetch_latest_barber_photo(barber.id)
     return caption, photo
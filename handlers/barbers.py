@@ -1,10 +1,8 @@
 # handlers/barbers.py
 from aiogram import Router, types
-from sqlalchemy.future import select
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from handlers.barber_cards import get_barber_card_content
-from sql.db import async_session
-from sql.models import Barbers
+from sql.db_catalog import get_catalog_barbers
 from keyboards.booking_keyboards import back_button
 
 router = Router()
@@ -103,9 +101,7 @@ async def send_barber(callback: types.CallbackQuery, barbers, index: int):
 
 
 async def show_barbers(callback: types.CallbackQuery):
-    async with async_session() as session:
-        result = await session.execute(select(Barbers))
-        barbers = result.scalars().all()
+    barbers = await get_catalog_barbers()
 
     if not barbers:
         await callback.message.edit_text(
@@ -120,9 +116,7 @@ async def show_barbers(callback: types.CallbackQuery):
 async def navigate_barbers(callback: types.CallbackQuery):
     action, index = callback.data.split("_")[1], int(callback.data.split("_")[2])
 
-    async with async_session() as session:
-        result = await session.execute(select(Barbers))
-        barbers = result.scalars().all()
+    barbers = await get_catalog_barbers()
 
     if action == "next":
         index = (index + 1) % len(barbers)
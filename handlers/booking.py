@@ -2,7 +2,7 @@
 import logging
 import math
 import re
-from datetime import date, datetime, time, timedelta
+from datetime import date, datetime, time
 from aiogram import F, Router, types
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -20,23 +20,24 @@ from keyboards.main_buttons import get_dynamic_main_keyboard, phone_request_keyb
 from keyboards.main_menu import get_main_menu
 from handlers.barber_cards import barber_full_name, get_barber_card_content
 from sql.db import async_session
-from sql.db_services import list_services_ordered
-from sql.db_barber_services import (
-    get_barber_service_by_pair,
-    get_barber_services_by_service,
-)
+from sql.db_availability import get_available_slots
+from sql.db_catalog import get_catalog_offerings, get_catalog_services
+from sql.db_barber_services import get_barber_service_by_pair
 from sql.db_temporary_orders import (
     delete_temporary_order,
     finalize_temporary_order,
     get_missing_temporary_order_fields,
     get_temporary_order,
     is_temporary_order_complete,
+    is_temporary_order_flush_due,
+    SlotUnavailableError,
+    temporary_order_from_draft,
     TemporaryOrderIncompleteError,
     TemporaryOrderNotFoundError,
     upsert_temporary_order,
 )
 from sql.db_users_utils import get_user, save_user
-from sql.models import Barbers, OrdinaryUser, Services, Order
+from sql.models import Barbers, OrdinaryUser, Services
 from superadmins.order_realtime_notify import notify_barber_realtime
 from utils.emoji_map import SERVICE_EMOJIS
 from utils.service_pricing import build_service_price_lines, format_duration_minutes
@@ -60,11 +61,11 @@ NO_BARBER_FOR_SERVICE_TEXT = "🛑 Hozircha ushbu xizmat uchun barber mavjud ema
 SELECTED_BARBER_UNAVAILABLE_TEXT = "❌ Tanlangan barber ushbu xizmatni bajarmaydi."
 LOCKED_BARBER_STATE_KEY = "selected_barber_locked"
 PENDING_BOOKING_ENTRY_KEY = "pending_booking_entry"
+# temporary_orders'ga oxirgi yozilgan vaqt (unix soniya); FSM ma'lumotlarida saqlanadi
+TEMPORARY_ORDER_FLUSHED_AT_KEY = "temporary_order_flushed_at"
 TIME_BUTTONS_PER_ROW = 2
 TIME_ROWS_PER_PAGE = 6
 TIME_SLOTS_PER_PAGE = TIME_ROWS_PER_PAGE * TIME_BUTTONS_PER_ROW
-DEFAULT_EXISTING_ORDER_DURATION_MINUTES = 60
-DATE_BUTTON_DAYS_AHEAD = 7
 ISO_DATE_FORMAT = "%Y-%m-%d"
 HM_TIME_FORMAT = "%H:%M"
 DURATION_HOUR_PATTERN = re.compile(
@@ -75,39 +76,6 @@ DURATION_MINUTE_PATTERN = re.compile(
     r"(\d+(?:[.,]\d+)?)\s*(daqiqa|minute|minutes|min|мин|m)\b",
     re.IGNORECASE,
 )
-TIME_TOKEN_PATTERN = re.compile(r"\d{1,2}:\d{2}")
-WEEKDAY_ALIASES = {
-    "dushanba": 0,
-    "seshanba": 1,
-    "chorshanba": 2,
-    "payshanba": 3,
-    "juma": 4,
-    "shanba": 5,
-    "yakshanba": 6,
-}
-WEEKDAY_LABELS = [
-    "Dushanba",
-    "Seshanba",
-    "Chorshanba",
-    "Payshanba",
-    "Juma",
-    "Shanba",
-    "Yakshanba",
-]
-MONTH_LABELS = [
-    "Yanvar",
-    "Fevral",
-    "Mart",
-    "Aprel",
-    "May",
-    "Iyun",
-    "Iyul",
-    "Avgust",
-    "Sentabr",
-    "Oktabr",
-    "Noyabr",
-    "Dekabr",
-]
 
 
 def with_cancel_hint(text: str) -> str:
@@ -182,6 +150,41 @@ def _resolve_initial_self_state(seed: dict[str, str | None]) -> State:
     return UserState.waiting_for_fullname
 
 
+def _booking_draft(user_id: int, data: dict, current_state: str | None) -> dict:
+    service_id_raw = data.get("service_id")
+    barber_id_raw = data.get("barber_id")
+    return {
+        "user_id": user_id,
+        "current_state": current_state,
+        "is_for_other": bool(data.get("is_for_other")),
+        "selected_barber_locked": bool(data.get(LOCKED_BARBER_STATE_KEY)),
+        "fullname": data.get("fullname"),
+        "phonenumber": data.get("phonenumber"),
+        "service_id": str(service_id_raw) if service_id_raw is not None else None,
+        "barber_id": str(barber_id_raw) if barber_id_raw is not None else None,
+        "barber_service_id": (
+            int(data["barber_service_id"])
+            if data.get("barber_service_id") is not None
+            else None
+        ),
+        "service_name": data.get("service_name"),
+        "barber_name": data.get("barber_name"),
+        "booked_price": data.get("booked_price"),
+        "booked_duration_minutes": data.get("booked_duration_minutes"),
+        "date": data.get("date"),
+        "time": data.get("time"),
+    }
+
+
+async def _get_booking_draft(user_id: int, state: FSMContext) -> dict | None:
+    # Booking davom etayotgan bo'lsa, qoralama FSM ma'lumotlarida (umumiy storage) — u eng yangisi;
+    # aks holda (to'xtatilgan yoki yakunlangan) None: temporary_orders o'qiladi
+    current_state = await state.get_state()
+    if _booking_state_from_value(current_state) is None:
+        return None
+    return _booking_draft(user_id, await state.get_data(), current_state)
+
+
 async def _persist_booking_state(
     user_id: int,
     state: FSMContext,
@@ -197,32 +200,18 @@ async def _persist_booking_state(
     data = await state.get_data()
     current_state = _state_value(next_state) or await state.get_state()
 
-    service_id_raw = data.get("service_id")
-    barber_id_raw = data.get("barber_id")
-
-    await upsert_temporary_order(
-        {
-            "user_id": user_id,
-            "current_state": current_state,
-            "is_for_other": bool(data.get("is_for_other")),
-            "selected_barber_locked": bool(data.get(LOCKED_BARBER_STATE_KEY)),
-            "fullname": data.get("fullname"),
-            "phonenumber": data.get("phonenumber"),
-            "service_id": str(service_id_raw) if service_id_raw is not None else None,
-            "barber_id": str(barber_id_raw) if barber_id_raw is not None else None,
-            "barber_service_id": (
-                int(data["barber_service_id"])
-                if data.get("barber_service_id") is not None
-                else None
-            ),
-            "service_name": data.get("service_name"),
-            "barber_name": data.get("barber_name"),
-            "booked_price": data.get("booked_price"),
-            "booked_duration_minutes": data.get("booked_duration_minutes"),
-            "date": data.get("date"),
-            "time": data.get("time"),
-        }
-    )
+    # Qoralama FSM'da; temporary_orders (to'xtatilgan booking'ni davom ettirish uchun)
+    # TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS da ko'pi bilan bir marta yangilanadi
+    now = datetime.now().timestamp()
+    if not is_temporary_order_flush_due(data.get(TEMPORARY_ORDER_FLUSHED_AT_KEY), now):
+        return
+    try:
+        await upsert_temporary_order(_booking_draft(user_id, data, current_state))
+    except Exception:
+        # Qoralama FSM'da saqlangan: keyingi qadam yozishni qayta urinadi
+        logger.exception("Failed to flush booking draft for user_id=%s", user_id)
+        return
+    await state.update_data(**{TEMPORARY_ORDER_FLUSHED_AT_KEY: now})
 
 
 async def _delete_temporary_order_safely(user_id: int):
@@ -341,11 +330,9 @@ async def _finish_booking_cancel(message: Message, state: FSMContext):
         )
     else:
         try:
+            # To'xtatishda FSM'dagi qoralama to'liq yoziladi: keyingi davom ettirish shundan o'qiydi
             await upsert_temporary_order(
-                {
-                    "user_id": user_id,
-                    "current_state": current_state,
-                }
+                _booking_draft(user_id, await state.get_data(), current_state)
             )
         except Exception:
             logger.exception(
@@ -430,25 +417,6 @@ def _parse_duration_minutes(raw_duration: str | int | float | None) -> int | Non
     return None
 
 
-def _parse_work_time_bounds(raw_work_time: str | None) -> tuple[time, time] | None:
-    if not isinstance(raw_work_time, str):
-        return None
-
-    tokens = TIME_TOKEN_PATTERN.findall(raw_work_time)
-    if len(tokens) < 2:
-        return None
-
-    try:
-        start_time = datetime.strptime(tokens[0], HM_TIME_FORMAT).time()
-        end_time = datetime.strptime(tokens[1], HM_TIME_FORMAT).time()
-    except ValueError:
-        return None
-
-    if start_time >= end_time:
-        return None
-    return start_time, end_time
-
-
 def _parse_iso_date(value: str) -> date | None:
     try:
         return datetime.strptime(value, ISO_DATE_FORMAT).date()
@@ -490,105 +458,6 @@ def _time_to_hm(value: time | datetime | str | None) -> str | None:
     return normalized.strftime(HM_TIME_FORMAT)
 
 
-def _combine_local_datetime(target_date: date, target_time: time, tzinfo) -> datetime:
-    naive_value = datetime.combine(target_date, target_time)
-    return naive_value.replace(tzinfo=tzinfo) if tzinfo else naive_value
-
-
-def _normalize_work_days_text(raw_work_days: str | None) -> str:
-    return (
-        (raw_work_days or "")
-        .strip()
-        .lower()
-        .replace("\u2013", "-")
-        .replace("\u2014", "-")
-        .replace("\u2019", "'")
-    )
-
-
-def _weekday_from_token(token: str) -> int | None:
-    normalized = re.sub(r"[^a-z']", " ", token.lower())
-    for word in normalized.split():
-        if word in WEEKDAY_ALIASES:
-            return WEEKDAY_ALIASES[word]
-    return None
-
-
-def _parse_work_days(raw_work_days: str | None) -> set[int] | None:
-    text = _normalize_work_days_text(raw_work_days)
-    if not text:
-        return None
-
-    if "har kuni" in text or "xar kuni" in text or "every day" in text:
-        return set(range(7))
-
-    weekdays: set[int] = set()
-    matched_any = False
-    segments = [segment.strip() for segment in re.split(r"[,;]", text) if segment.strip()]
-    if not segments:
-        segments = [text]
-
-    for segment in segments:
-        if "-" in segment:
-            start_token, end_token = [part.strip() for part in segment.split("-", 1)]
-            start_day = _weekday_from_token(start_token)
-            end_day = _weekday_from_token(end_token)
-            if start_day is None or end_day is None:
-                continue
-
-            matched_any = True
-            if start_day <= end_day:
-                weekdays.update(range(start_day, end_day + 1))
-            else:
-                weekdays.update(range(start_day, 7))
-                weekdays.update(range(0, end_day + 1))
-            continue
-
-        segment_days = {
-            day
-            for token in segment.split()
-            for day in [_weekday_from_token(token)]
-            if day is not None
-        }
-        if segment_days:
-            matched_any = True
-            weekdays.update(segment_days)
-
-    return weekdays if matched_any else None
-
-
-def _barber_works_on_date(barber: Barbers, target_date: date) -> bool:
-    work_days = _parse_work_days(getattr(barber, "work_days", None))
-    if work_days is None:
-        logger.warning(
-            "Unable to parse barber work_days=%r barber_id=%s; allowing date=%s",
-            getattr(barber, "work_days", None),
-            getattr(barber, "id", None),
-            target_date,
-        )
-        return True
-    return target_date.weekday() in work_days
-
-
-def _merge_busy_intervals(
-    intervals: list[tuple[datetime, datetime]],
-) -> list[tuple[datetime, datetime]]:
-    if not intervals:
-        return []
-
-    sorted_intervals = sorted(intervals, key=lambda item: item[0])
-    merged: list[tuple[datetime, datetime]] = [sorted_intervals[0]]
-
-    for current_start, current_end in sorted_intervals[1:]:
-        last_start, last_end = merged[-1]
-        if current_start <= last_end:
-            merged[-1] = (last_start, max(last_end, current_end))
-        else:
-            merged.append((current_start, current_end))
-
-    return merged
-
-
 async def _calculate_available_slots(
     service_id: str,
     barber_id: str,
@@ -598,95 +467,7 @@ async def _calculate_available_slots(
     if target_date is None:
         return []
 
-    local_now = datetime.now().astimezone()
-    tzinfo = local_now.tzinfo
-
-    async with async_session() as session:
-        try:
-            service_db_id = int(service_id)
-            barber_db_id = int(barber_id)
-        except (TypeError, ValueError):
-            return []
-
-        barber = await session.get(Barbers, barber_db_id)
-        if not barber or barber.is_paused:
-            return []
-
-        barber_service = await get_barber_service_by_pair(barber_db_id, service_db_id)
-        if barber_service is None:
-            return []
-
-        work_bounds = _parse_work_time_bounds(barber.work_time)
-        service_duration = int(barber_service.duration_minutes or 0)
-        if not work_bounds or not service_duration:
-            return []
-
-        orders_result = await session.execute(
-            select(Order.time, Order.booked_duration_minutes).where(
-                Order.barber_id == barber_db_id,
-                Order.date == target_date,
-            )
-        )
-        booked_rows = orders_result.all()
-
-    start_time, end_time = work_bounds
-    work_start = _combine_local_datetime(target_date, start_time, tzinfo)
-    work_end = _combine_local_datetime(target_date, end_time, tzinfo)
-    slot_duration = timedelta(minutes=service_duration)
-
-    if work_start >= work_end or slot_duration <= timedelta(0):
-        return []
-
-    busy_intervals: list[tuple[datetime, datetime]] = []
-
-    # Barber tanaffus vaqtini (breakdown) busy intervalga qo'shish
-    breakdown_bounds = _parse_work_time_bounds(barber.breakdown)
-    if breakdown_bounds is not None:
-        break_start_time, break_end_time = breakdown_bounds
-        break_start = _combine_local_datetime(target_date, break_start_time, tzinfo)
-        break_end = _combine_local_datetime(target_date, break_end_time, tzinfo)
-        busy_intervals.append((break_start, break_end))
-
-    for booked_time_raw, booked_duration_raw in booked_rows:
-        booked_time = _normalize_time_value(booked_time_raw)
-        if booked_time is None:
-            continue
-
-        try:
-            booked_duration = int(booked_duration_raw or 0)
-        except (TypeError, ValueError):
-            booked_duration = 0
-        if booked_duration <= 0:
-            booked_duration = service_duration or DEFAULT_EXISTING_ORDER_DURATION_MINUTES
-
-        busy_start = _combine_local_datetime(target_date, booked_time, tzinfo)
-        busy_end = busy_start + timedelta(minutes=booked_duration)
-        busy_intervals.append((busy_start, busy_end))
-
-    merged_busy = _merge_busy_intervals(busy_intervals)
-
-    available_slots: list[str] = []
-    current_start = work_start
-    busy_index = 0
-
-    while current_start + slot_duration <= work_end:
-        current_end = current_start + slot_duration
-
-        while busy_index < len(merged_busy) and merged_busy[busy_index][1] <= current_start:
-            busy_index += 1
-
-        has_overlap = (
-            busy_index < len(merged_busy)
-            and merged_busy[busy_index][0] < current_end
-            and merged_busy[busy_index][1] > current_start
-        )
-
-        if current_start > local_now and not has_overlap:
-            available_slots.append(current_start.strftime(HM_TIME_FORMAT))
-
-        current_start += slot_duration
-
-    return available_slots
+    return await get_available_slots(service_id, barber_id, target_date)
 
 
 def _time_slot_row_count(slot_count: int) -> int:
@@ -835,7 +616,7 @@ def _barber_nav_keyboard(index: int, total: int, service_id: str, barber_id: str
 
 
 async def _fetch_services():
-    return await list_services_ordered()
+    return await get_catalog_services()
 
 
 async def _fetch_active_barber_services_by_service(service_id: str):
@@ -844,7 +625,7 @@ async def _fetch_active_barber_services_by_service(service_id: str):
     except (TypeError, ValueError):
         return []
 
-    return await get_barber_services_by_service(normalized_service_id)
+    return await get_catalog_offerings(normalized_service_id)
 
 
 async def _fetch_active_barbers_by_service(service_id: str):
@@ -1439,6 +1220,56 @@ async def _restore_temporary_order_to_state(
     await state.update_data(**payload)
 
 
+async def _reply_slot_taken(
+    user_id: int,
+    state: FSMContext,
+    callback: CallbackQuery,
+    temp_order,
+    date_str: str,
+) -> None:
+    time_result = await _build_time_keyboard(temp_order.service_id, temp_order.barber_id, date_str)
+    if time_result is None:
+        await _persist_booking_state(
+            user_id,
+            state,
+            next_state=UserState.waiting_for_date,
+            is_for_other=bool(temp_order.is_for_other),
+            fullname=temp_order.fullname,
+            phonenumber=temp_order.phonenumber,
+            service_id=temp_order.service_id,
+            barber_id=temp_order.barber_id,
+            date=date_str,
+            time=None,
+            **{LOCKED_BARBER_STATE_KEY: bool(temp_order.selected_barber_locked)},
+        )
+        await _edit_callback_message_text(
+            callback,
+            with_cancel_hint("⛔ Tanlangan vaqt endi mavjud emas.\n\nIltimos, boshqa sana tanlang:"),
+            await booking_keyboards.date_keyboard(temp_order.service_id, temp_order.barber_id),
+        )
+    else:
+        keyboard, page, total_pages = time_result
+        await _persist_booking_state(
+            user_id,
+            state,
+            next_state=UserState.waiting_for_time,
+            is_for_other=bool(temp_order.is_for_other),
+            fullname=temp_order.fullname,
+            phonenumber=temp_order.phonenumber,
+            service_id=temp_order.service_id,
+            barber_id=temp_order.barber_id,
+            date=date_str,
+            time=None,
+            **{LOCKED_BARBER_STATE_KEY: bool(temp_order.selected_barber_locked)},
+        )
+        await _edit_callback_message_text(
+            callback,
+            with_cancel_hint("⛔ Tanlangan vaqt endi mavjud emas.\n\nIltimos, boshqa vaqt tanlang:"),
+            keyboard,
+        )
+    await callback.answer("Avval tanlangan vaqt band bo'lib qolgan", show_alert=True)
+
+
 async def process_booking_confirmation(
     user_id: int,
     state: FSMContext,
@@ -1448,7 +1279,11 @@ async def process_booking_confirmation(
 ) -> bool:
     logger.info("Booking confirmation started for user_id=%s", user_id)
     try:
-        temp_order = await get_temporary_order(user_id)
+        draft = await _get_booking_draft(user_id, state)
+        if draft is not None:
+            temp_order = temporary_order_from_draft(draft)
+        else:
+            temp_order = await get_temporary_order(user_id)
         if temp_order is None:
             logger.error(
                 "Booking validation failed for user_id=%s: temporary order not found",
@@ -1490,62 +1325,6 @@ async def process_booking_confirmation(
             time_str,
         )
 
-        available_slots = await _calculate_available_slots(
-            temp_order.service_id,
-            temp_order.barber_id,
-            date_str,
-        )
-        if time_str not in available_slots:
-            logger.info(
-                "Selected slot is no longer available for user_id=%s barber_id=%s date=%s time=%s",
-                user_id,
-                temp_order.barber_id,
-                date_str,
-                time_str,
-            )
-            time_result = await _build_time_keyboard(temp_order.service_id, temp_order.barber_id, date_str)
-            if time_result is None:
-                await _persist_booking_state(
-                    user_id,
-                    state,
-                    next_state=UserState.waiting_for_date,
-                    is_for_other=bool(temp_order.is_for_other),
-                    fullname=temp_order.fullname,
-                    phonenumber=temp_order.phonenumber,
-                    service_id=temp_order.service_id,
-                    barber_id=temp_order.barber_id,
-                    date=date_str,
-                    time=None,
-                    **{LOCKED_BARBER_STATE_KEY: bool(temp_order.selected_barber_locked)},
-                )
-                await _edit_callback_message_text(
-                    callback,
-                    with_cancel_hint("⛔ Tanlangan vaqt endi mavjud emas.\n\nIltimos, boshqa sana tanlang:"),
-                    await booking_keyboards.date_keyboard(temp_order.service_id, temp_order.barber_id),
-                )
-            else:
-                keyboard, page, total_pages = time_result
-                await _persist_booking_state(
-                    user_id,
-                    state,
-                    next_state=UserState.waiting_for_time,
-                    is_for_other=bool(temp_order.is_for_other),
-                    fullname=temp_order.fullname,
-                    phonenumber=temp_order.phonenumber,
-                    service_id=temp_order.service_id,
-                    barber_id=temp_order.barber_id,
-                    date=date_str,
-                    time=None,
-                    **{LOCKED_BARBER_STATE_KEY: bool(temp_order.selected_barber_locked)},
-                )
-                await _edit_callback_message_text(
-                    callback,
-                    with_cancel_hint("⛔ Tanlangan vaqt endi mavjud emas.\n\nIltimos, boshqa vaqt tanlang:"),
-                    keyboard,
-                )
-            await callback.answer("Avval tanlangan vaqt band bo'lib qolgan", show_alert=True)
-            return False
-
         should_send_menu_updated = False
         existing_user = None
         if not temp_order.is_for_other:
@@ -1563,14 +1342,14 @@ async def process_booking_confirmation(
                 should_send_menu_updated = existing_user is None
 
         logger.info("Calling finalize_temporary_order for user_id=%s", user_id)
-        created = await finalize_temporary_order(user_id)
+        created = await finalize_temporary_order(user_id, draft)
         logger.info(
             "Booking confirmation finalized for user_id=%s order_id=%s",
             user_id,
             created.id,
         )
         try:
-            await notify_barber_realtime(callback.bot, created.id, int(created.barber_id))
+            await notify_barber_realtime(callback.bot, created)
         except Exception:
             logger.exception("notify_barber_realtime failed for order_id=%s", created.id)
 
@@ -1596,6 +1375,16 @@ async def process_booking_confirmation(
             reply_markup=get_main_menu(),
         )
         return True
+    except SlotUnavailableError:
+        logger.info(
+            "Selected slot is no longer available for user_id=%s barber_id=%s date=%s time=%s",
+            user_id,
+            temp_order.barber_id,
+            date_str,
+            time_str,
+        )
+        await _reply_slot_taken(user_id, state, callback, temp_order, date_str)
+        return False
     except TemporaryOrderIncompleteError as exc:
         logger.exception(
             "Temporary order became incomplete during finalization for user_id=%s. Missing fields: %s",
@@ -2337,7 +2126,10 @@ async def confirm(callback: types.CallbackQuery, state: FSMContext):
 
         _, service_id, barber_id, date_str, time_str = parts
         user_data = await state.get_data()
-        temp_order = await get_temporary_order(user_id)
+        draft = await _get_booking_draft(user_id, state)
+        temp_order = (
+            temporary_order_from_draft(draft) if draft is not None else await get_temporary_order(user_id)
+        )
         if temp_order is None:
             logger.error(
                 "Cannot persist confirmation for user_id=%s because temporary order is missing",
@@ -6,9 +6,13 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
-from sqlalchemy import case, func, select
+from sqlalchemy import case, select
 
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_day
+from sql.db_order_queries import phone_digits, phone_search_condition, weekday_condition
+from sql.db_order_rollup import apply_order_stats_delta
+from sql.db_pagination import fetch_keyset_page, invalidate_order_pages
 from sql.models import Order
 
 from .common import CANCEL_ORDERS_PER_PAGE, _format_dt, _prepare_order_cards
@@ -131,16 +135,6 @@ def _parse_prefixed_one_based_page(data: str, prefix: str):
     return _parse_one_based_page(parts[1])
 
 
-def _clamp_queue_all_page(page: int, total_pages: int) -> int:
-    if total_pages < 1:
-        return 1
-    if page < 1:
-        return 1
-    if page > total_pages:
-        return total_pages
-    return page
-
-
 def _normalize_weekday_token(value: str) -> str:
     return " ".join((value or "").strip().lower().split()).replace("’", "'")
 
@@ -161,10 +155,6 @@ def _search_type_label(search_type: str) -> str:
     return labels.get(search_type, "Qidiruv")
 
 
-def _escape_like(value: str) -> str:
-    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
-
-
 def _queue_status_label(order_date, today=None) -> str:
     today = today or datetime.now().date()
     if order_date == today:
@@ -323,7 +313,12 @@ async def _fetch_past_order_by_id(user_id: int, order_id: int):
         return result.scalars().first()
 
 
-async def _fetch_paginated_past_orders(user_id: int, page: int, extra_filters=None):
+async def _fetch_paginated_past_orders(
+    user_id: int,
+    page: int,
+    extra_filters=None,
+    search_key: tuple = (),
+):
     today = datetime.now().date()
     filters = [Order.user_id == user_id]
     if extra_filters:
@@ -336,23 +331,17 @@ async def _fetch_paginated_past_orders(user_id: int, page: int, extra_filters=No
     )
 
     async with async_session() as session:
-        total_orders = await session.scalar(select(func.count(Order.id)).where(*filters))
-        total_orders = int(total_orders or 0)
-        total_pages = (total_orders + QUEUE_ALL_ORDERS_PER_PAGE - 1) // QUEUE_ALL_ORDERS_PER_PAGE
-        total_pages = max(total_pages, 1)
-        page = _clamp_queue_all_page(page, total_pages)
-        offset = (page - 1) * QUEUE_ALL_ORDERS_PER_PAGE
-
-        result = await session.execute(
-            select(Order)
-            .where(*filters)
-            .order_by(status_rank.asc(), Order.date.asc(), Order.time.asc(), Order.id.asc())
-            .offset(offset)
-            .limit(QUEUE_ALL_ORDERS_PER_PAGE)
+        order_page = await fetch_keyset_page(
+            session,
+            select(Order).where(*filters),
+            [status_rank, Order.date, Order.time, Order.id],
+            # Holat tartibi bugungi sanaga bog'liq — kun almashsa kalitlar ham yangilanadi
+            scope=("queue_orders", user_id, today, *search_key),
+            page=page,
+            page_size=QUEUE_ALL_ORDERS_PER_PAGE,
         )
-        orders = result.scalars().all()
 
-    return orders, total_orders, total_pages, page
+    return order_page.items, order_page.total, order_page.total_pages, order_page.page
 
 
 def _build_search_filters(search_type: str, raw_value: str):
@@ -361,8 +350,10 @@ def _build_search_filters(search_type: str, raw_value: str):
         return None, None, "❗ Qidiruv qiymati bo'sh."
 
     if search_type == SEARCH_TYPE_PHONE:
-        escaped = _escape_like(value)
-        return [Order.phonenumber.ilike(f"%{escaped}%", escape="\\")], value, None
+        digits = phone_digits(value)
+        if not digits:
+            return None, None, "❗ Telefon raqamini raqamlar bilan kiriting."
+        return [phone_search_condition(digits)], value, None
 
     if search_type == SEARCH_TYPE_DATE:
         parsed = _parse_search_date(value)
@@ -375,14 +366,15 @@ def _build_search_filters(search_type: str, raw_value: str):
         dow = QUEUE_WEEKDAY_TO_DOW.get(normalized)
         if dow is None:
             return None, None, "❗ Kunni to'g'ri kiriting (masalan: Dushanba)."
-        return [func.extract("dow", Order.date) == dow], QUEUE_DOW_TO_WEEKDAY[dow], None
+        return [weekday_condition(dow)], QUEUE_DOW_TO_WEEKDAY[dow], None
 
     return None, None, "❗ Noma'lum qidiruv turi."
 
 
 def _matches_search(order, search_type: str, search_value: str) -> bool:
     if search_type == SEARCH_TYPE_PHONE:
-        return (search_value or "").strip() in str(order.phonenumber or "")
+        digits = phone_digits(search_value)
+        return bool(digits) and digits in phone_digits(order.phonenumber)
 
     if search_type == SEARCH_TYPE_DATE:
         parsed = _parse_search_date(search_value)
@@ -639,6 +631,7 @@ async def _get_queue_search_results_page(
             user_id=user_id,
             page=page,
             extra_filters=filters,
+            search_key=(search_type, normalized_value),
         )
     except Exception:
         return "❗ Navbatlar olishda xatolik yuz berdi.", _build_queue_search_results_keyboard(1, 1), 0, 1
@@ -1238,7 +1231,10 @@ async def delete_queue_order(callback: CallbackQuery, state: FSMContext):
             await callback.answer("Bu navbat faol emas.", show_alert=True)
         else:
             await session.delete(order)
+            await apply_order_stats_delta(session, [order], sign=-1)
             await session.commit()
+            invalidate_barber_day(order.barber_id, order.date)
+            invalidate_order_pages()
             deleted = True
 
     if deleted:
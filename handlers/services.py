@@ -3,7 +3,7 @@ from aiogram import Router, types
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from keyboards.booking_keyboards import back_button
-from sql.db_services import list_services_ordered
+from sql.db_catalog import get_catalog_services
 from utils.emoji_map import SERVICE_EMOJIS
 from utils.service_pricing import build_service_price_lines
 
@@ -84,7 +84,7 @@ async def send_service(callback: types.CallbackQuery, services, index: int):
 
 
 async def show_services(callback: types.CallbackQuery):
-    services = await list_services_ordered()
+    services = await get_catalog_services()
 
     if not services:
         await callback.message.edit_text(
@@ -98,7 +98,7 @@ async def show_services(callback: types.CallbackQuery):
 
 async def navigate_services(callback: types.CallbackQuery):
     action, index = callback.data.split("_")[1], int(callback.data.split("_")[2])
-    services = await list_services_ordered()
+    services = await get_catalog_services()
 
     if not services:
         await callback.answer("⚠️ Xizmatlar topilmadi.", show_alert=True)
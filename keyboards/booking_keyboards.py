@@ -1,13 +1,13 @@
 #keyboards/booking_keyboards.py
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.future import select
 from sqlalchemy import or_
 from sql.db import async_session
 from sql.models import Services, Barbers
 from utils.emoji_map import SERVICE_EMOJIS
-from sql.db_order_utils import get_booked_times
+from sql.db_availability import get_available_dates, get_available_slots
 
 def back_button() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
@@ -51,43 +51,6 @@ async def service_keyboard() -> InlineKeyboardMarkup:
         return builder.as_markup()
 
 
-def _default_time_slots():
-    return [f"{h:02d}:00" for h in range(9, 18)]
-
-
-def _build_time_slots(work_time):
-    start = None
-    end = None
-
-    if isinstance(work_time, str):
-        if "-" in work_time:
-            parts = [p.strip() for p in work_time.split("-", 1)]
-            if len(parts) == 2:
-                start, end = parts
-    elif isinstance(work_time, dict):
-        start = work_time.get("from")
-        end = work_time.get("to")
-
-    if not (isinstance(start, str) and isinstance(end, str)):
-        return _default_time_slots()
-
-    try:
-        start_dt = datetime.strptime(start, "%H:%M")
-        end_dt = datetime.strptime(end, "%H:%M")
-    except ValueError:
-        return _default_time_slots()
-
-    if start_dt >= end_dt:
-        return _default_time_slots()
-
-    slots = []
-    current = start_dt
-    while current < end_dt:
-        slots.append(current.strftime("%H:%M"))
-        current += timedelta(hours=1)
-    return slots or _default_time_slots()
-
-
 async def barber_keyboard(service_id: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     try:
@@ -118,38 +81,19 @@ async def barber_keyboard(service_id: str) -> InlineKeyboardMarkup:
 
 
 async def date_keyboard(service_id: str, barber_id: str) -> InlineKeyboardMarkup:
-    from sql.db_order_utils import get_booked_times
-
-    now = datetime.now()
     builder = InlineKeyboardBuilder()
 
-    async with async_session() as session:
-        barber = None
-        try:
-            barber = await session.get(Barbers, int(barber_id))
-        except (TypeError, ValueError):
-            barber = None
-
-    if barber and barber.is_paused:
+    # Butun 7 kunlik oyna bitta range query bilan hisoblanadi
+    available_dates = await get_available_dates(service_id, barber_id)
+    if not available_dates:
         return InlineKeyboardMarkup(
             inline_keyboard=[
-                [InlineKeyboardButton(text="ў?? Boў??sh sana yoў??q", callback_data="no_dates")]
+                [InlineKeyboardButton(text="❌ Bo‘sh sana yo‘q", callback_data="no_dates")]
             ]
         )
 
-    all_times = _build_time_slots(getattr(barber, "work_time", None))
-
-    for i in range(7):
-        current_day = now + timedelta(days=i)
+    for current_day in available_dates:
         date_str = current_day.strftime("%Y-%m-%d")
-
-        booked = await get_booked_times(barber_id, date_str)
-        available = [t for t in all_times if t not in booked]
-
-        # ❌ AGAR VAQT YO‘Q → SANANI HAM CHIQARMAYMIZ
-        if not available:
-            continue
-
         day = current_day.day
         month = MONTHS[current_day.month - 1]
         weekday = WEEKDAYS[current_day.weekday()]
@@ -160,33 +104,18 @@ async def date_keyboard(service_id: str, barber_id: str) -> InlineKeyboardMarkup
             callback_data=f"date_{service_id}_{barber_id}_{date_str}"
         )
 
-    if not builder.buttons:
-        return InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="❌ Bo‘sh sana yo‘q", callback_data="no_dates")]
-            ]
-        )
-
     builder.adjust(1)
     return builder.as_markup()
 
 
 async def time_keyboard(service_id: str, barber_id: str, date: str) -> InlineKeyboardMarkup | None:
-    async with async_session() as session:
-        barber = None
-        try:
-            barber = await session.get(Barbers, int(barber_id))
-        except (TypeError, ValueError):
-            barber = None
-
-    if barber and barber.is_paused:
+    # Vaqtlar sana tugmalari bilan bir xil dvigateldan: xizmat davomiyligi bo'yicha
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
         return None
 
-    all_times = _build_time_slots(getattr(barber, "work_time", None))
-
-    from sql.db_order_utils import get_booked_times
-    booked = await get_booked_times(barber_id, date)
-    available = [t for t in all_times if t not in booked]
+    available = await get_available_slots(service_id, barber_id, target_date)
 
     if not available:
         return None
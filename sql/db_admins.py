@@ -2,6 +2,7 @@
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from sql.db import async_session
+from sql.db_roles import invalidate_user_roles
 from sql.models import Admins
 
 
@@ -12,6 +13,7 @@ async def create_admin(data: dict):
             session.add(new_admin)
             await session.commit()
             await session.refresh(new_admin)
+            invalidate_user_roles(new_admin.tg_id)
             return new_admin
         except SQLAlchemyError:
             await session.rollback()
@@ -24,6 +26,11 @@ async def get_admins():
         return result.scalars().all()
 
 
+async def get_admin(admin_id: int):
+    async with async_session() as session:
+        return await session.get(Admins, int(admin_id))
+
+
 async def update_admin(admin_id: int, updates: dict):
     async with async_session() as session:
         admin = await session.get(Admins, admin_id)
@@ -32,6 +39,7 @@ async def update_admin(admin_id: int, updates: dict):
         for key, val in updates.items():
             setattr(admin, key, val)
         await session.commit()
+        invalidate_user_roles()
         return admin
 
 
@@ -42,4 +50,5 @@ async def delete_admin(admin_id: int):
             return False
         await session.delete(admin)
         await session.commit()
+        invalidate_user_roles(admin.tg_id)
         return True
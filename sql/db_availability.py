@@ -0,0 +1,600 @@
+import logging
+import re
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from time import monotonic
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql.db import async_session
+from sql.models import BarberServices, Barbers, Order
+
+logger = logging.getLogger(__name__)
+
+BOOKING_WINDOW_DAYS = 7
+DAY_SCHEDULE_CACHE_TTL_SECONDS = 30.0
+DEFAULT_EXISTING_ORDER_DURATION_MINUTES = 60
+HM_TIME_FORMAT = "%H:%M"
+TIME_TOKEN_PATTERN = re.compile(r"\d{1,2}:\d{2}")
+WEEKDAY_ALIASES = {
+    "dushanba": 0,
+    "seshanba": 1,
+    "chorshanba": 2,
+    "payshanba": 3,
+    "juma": 4,
+    "shanba": 5,
+    "yakshanba": 6,
+}
+
+ADVISORY_LOCK_KEY_MASK = 0x7FFFFFFF
+
+BookedRow = tuple[time | None, int | None]
+
+
+def _normalize_id(value: object) -> int | None:
+    try:
+        normalized = int(value)
+    except (TypeError, ValueError):
+        return None
+    return normalized if normalized > 0 else None
+
+
+def parse_work_time_bounds(raw_work_time: str | None) -> tuple[time, time] | None:
+    if not isinstance(raw_work_time, str):
+        return None
+
+    tokens = TIME_TOKEN_PATTERN.findall(raw_work_time)
+    if len(tokens) < 2:
+        return None
+
+    try:
+        start_time = datetime.strptime(tokens[0], HM_TIME_FORMAT).time()
+        end_time = datetime.strptime(tokens[1], HM_TIME_FORMAT).time()
+    except ValueError:
+        return None
+
+    if start_time >= end_time:
+        return None
+    return start_time, end_time
+
+
+def _normalize_work_days_text(raw_work_days: str | None) -> str:
+    return (
+        (raw_work_days or "")
+        .strip()
+        .lower()
+        .replace("\u2013", "-")
+        .replace("\u2014", "-")
+        .replace("\u2019", "'")
+    )
+
+
+def _weekday_from_token(token: str) -> int | None:
+    normalized = re.sub(r"[^a-z']", " ", token.lower())
+    for word in normalized.split():
+        if word in WEEKDAY_ALIASES:
+            return WEEKDAY_ALIASES[word]
+    return None
+
+
+def parse_work_days(raw_work_days: str | None) -> set[int] | None:
+    text = _normalize_work_days_text(raw_work_days)
+    if not text:
+        return None
+
+    if "har kuni" in text or "xar kuni" in text or "every day" in text:
+        return set(range(7))
+
+    weekdays: set[int] = set()
+    matched_any = False
+    segments = [segment.strip() for segment in re.split(r"[,;]", text) if segment.strip()]
+    if not segments:
+        segments = [text]
+
+    for segment in segments:
+        if "-" in segment:
+            start_token, end_token = [part.strip() for part in segment.split("-", 1)]
+            start_day = _weekday_from_token(start_token)
+            end_day = _weekday_from_token(end_token)
+            if start_day is None or end_day is None:
+                continue
+
+            matched_any = True
+            if start_day <= end_day:
+                weekdays.update(range(start_day, end_day + 1))
+            else:
+                weekdays.update(range(start_day, 7))
+                weekdays.update(range(0, end_day + 1))
+            continue
+
+        segment_days = {
+            day
+            for token in segment.split()
+            for day in [_weekday_from_token(token)]
+            if day is not None
+        }
+        if segment_days:
+            matched_any = True
+            weekdays.update(segment_days)
+
+    return weekdays if matched_any else None
+
+
+ALL_WEEKDAYS_MASK = (1 << 7) - 1
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledSchedule:
+    """Ish jadvali butun sonlarda: hafta kunlari bitmaskasi (bit 0 — dushanba)
+    va kun boshidan o'tgan daqiqalar. Matnli maydonlar faqat yozishda tahlil qilinadi."""
+
+    days_mask: int
+    work_start: int | None
+    work_end: int | None
+    break_start: int | None = None
+    break_end: int | None = None
+
+    def works_on(self, weekday: int) -> bool:
+        return bool(self.days_mask >> weekday & 1)
+
+    def column_values(self) -> dict[str, int | None]:
+        return {
+            "work_days_mask": self.days_mask,
+            "work_start_minute": self.work_start,
+            "work_end_minute": self.work_end,
+            "break_start_minute": self.break_start,
+            "break_end_minute": self.break_end,
+        }
+
+
+def _minute_bounds(raw_value: str | None) -> tuple[int | None, int | None]:
+    bounds = parse_work_time_bounds(raw_value)
+    if bounds is None:
+        return None, None
+    start_time, end_time = bounds
+    return start_time.hour * 60 + start_time.minute, end_time.hour * 60 + end_time.minute
+
+
+@lru_cache(maxsize=1024)
+def compile_schedule(
+    work_days: str | None,
+    work_time: str | None,
+    breakdown: str | None,
+) -> CompiledSchedule:
+    weekdays = parse_work_days(work_days)
+    if weekdays is None:
+        # Eski xatti-harakat saqlanadi: tushunarsiz ish kunlari — har kuni ishlaydi
+        logger.warning("Unable to parse barber work_days=%r; allowing every day", work_days)
+        days_mask = ALL_WEEKDAYS_MASK
+    else:
+        days_mask = sum(1 << weekday for weekday in weekdays)
+
+    work_start, work_end = _minute_bounds(work_time)
+    break_start, break_end = _minute_bounds(breakdown)
+    return CompiledSchedule(
+        days_mask=days_mask,
+        work_start=work_start,
+        work_end=work_end,
+        break_start=break_start,
+        break_end=break_end,
+    )
+
+
+def schedule_of(barber) -> CompiledSchedule:
+    """Snapshot, Barbers qatori yoki matnli maydonli istalgan obyekt uchun jadval."""
+    schedule = getattr(barber, "schedule", None)
+    if isinstance(schedule, CompiledSchedule):
+        return schedule
+
+    days_mask = getattr(barber, "work_days_mask", None)
+    if days_mask is not None:
+        return CompiledSchedule(
+            days_mask=int(days_mask),
+            work_start=getattr(barber, "work_start_minute", None),
+            work_end=getattr(barber, "work_end_minute", None),
+            break_start=getattr(barber, "break_start_minute", None),
+            break_end=getattr(barber, "break_end_minute", None),
+        )
+
+    # Hali kompilyatsiya qilinmagan (eski) qatorlar: matndan, lru_cache orqali
+    return compile_schedule(
+        getattr(barber, "work_days", None),
+        getattr(barber, "work_time", None),
+        getattr(barber, "breakdown", None),
+    )
+
+
+def apply_compiled_schedule(barber: Barbers) -> CompiledSchedule:
+    """Barbers obyektining matnli jadvalidan kompilyatsiya ustunlarini to'ldiradi."""
+    schedule = compile_schedule(barber.work_days, barber.work_time, barber.breakdown)
+    for column, value in schedule.column_values().items():
+        setattr(barber, column, value)
+    return schedule
+
+
+async def store_compiled_schedule(session, barber_id: int) -> Barbers | None:
+    """
+    UPDATE bilan matnli maydon o'zgartirilgandan keyin, commit'dan oldin chaqiriladi:
+    kompilyatsiya ustunlari shu tranzaksiyada yangilanadi.
+    """
+    barber = await session.get(Barbers, barber_id, populate_existing=True)
+    if barber is not None:
+        apply_compiled_schedule(barber)
+    return barber
+
+
+async def backfill_barber_schedules(session_factory=async_session) -> int:
+    """Kompilyatsiya ustunlari bo'sh bo'lgan (eski) barberlarni to'ldiradi."""
+    async with session_factory() as session:
+        try:
+            result = await session.execute(
+                select(Barbers).where(Barbers.work_days_mask.is_(None))
+            )
+            barbers = result.scalars().all()
+            for barber in barbers:
+                apply_compiled_schedule(barber)
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+    if barbers:
+        logger.info("barber schedules compiled: %s rows", len(barbers))
+    return len(barbers)
+
+
+def barber_works_on_date(barber, target_date: date) -> bool:
+    return schedule_of(barber).works_on(target_date.weekday())
+
+
+def merge_busy_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    if not intervals:
+        return []
+
+    sorted_intervals = sorted(intervals)
+    merged: list[tuple[int, int]] = [sorted_intervals[0]]
+
+    for current_start, current_end in sorted_intervals[1:]:
+        last_start, last_end = merged[-1]
+        if current_start <= last_end:
+            merged[-1] = (last_start, max(last_end, current_end))
+        else:
+            merged.append((current_start, current_end))
+
+    return merged
+
+
+def _format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def compute_available_slots(
+    barber,
+    service_duration: int,
+    target_date: date,
+    booked_rows: Iterable[BookedRow],
+    *,
+    now: datetime | None = None,
+) -> list[str]:
+    """Barberning bitta kundagi bo'sh vaqtlarini xotirada hisoblaydi.
+
+    Sana tugmalari ham, vaqt tugmalari ham shu funksiyadan foydalanadi —
+    shuning uchun ikkala ro'yxat doim bir-biriga mos keladi. Hisob kun boshidan
+    o'tgan daqiqalarda (butun sonlar) olib boriladi.
+    """
+    if barber is None or getattr(barber, "is_paused", False):
+        return []
+
+    schedule = schedule_of(barber)
+    work_start, work_end = schedule.work_start, schedule.work_end
+    if work_start is None or work_end is None or not service_duration:
+        return []
+    if service_duration <= 0 or work_start >= work_end:
+        return []
+    if not schedule.works_on(target_date.weekday()):
+        return []
+
+    local_now = now or datetime.now().astimezone()
+    today = local_now.date()
+    if target_date < today:
+        return []
+    # Bugun uchun: slot boshlanishi hozirgi vaqtdan qat'iy keyin bo'lishi kerak
+    now_seconds = None
+    if target_date == today:
+        now_seconds = local_now.hour * 3600 + local_now.minute * 60 + local_now.second
+
+    busy_intervals: list[tuple[int, int]] = []
+
+    # Barber tanaffus vaqtini (breakdown) busy intervalga qo'shish
+    if schedule.break_start is not None and schedule.break_end is not None:
+        busy_intervals.append((schedule.break_start, schedule.break_end))
+
+    for booked_time, booked_duration_raw in booked_rows:
+        if booked_time is None:
+            continue
+
+        try:
+            booked_duration = int(booked_duration_raw or 0)
+        except (TypeError, ValueError):
+            booked_duration = 0
+        if booked_duration <= 0:
+            booked_duration = service_duration or DEFAULT_EXISTING_ORDER_DURATION_MINUTES
+
+        busy_start = booked_time.hour * 60 + booked_time.minute
+        busy_intervals.append((busy_start, busy_start + booked_duration))
+
+    merged_busy = merge_busy_intervals(busy_intervals)
+
+    available_slots: list[str] = []
+    current_start = work_start
+    busy_index = 0
+
+    while current_start + service_duration <= work_end:
+        current_end = current_start + service_duration
+
+        while busy_index < len(merged_busy) and merged_busy[busy_index][1] <= current_start:
+            busy_index += 1
+
+        has_overlap = (
+            busy_index < len(merged_busy)
+            and merged_busy[busy_index][0] < current_end
+            and merged_busy[busy_index][1] > current_start
+        )
+
+        is_future = now_seconds is None or current_start * 60 > now_seconds
+        if is_future and not has_overlap:
+            available_slots.append(_format_minute(current_start))
+
+        current_start += service_duration
+
+    return available_slots
+
+
+@dataclass(frozen=True, slots=True)
+class BarberScheduleSnapshot:
+    id: int
+    schedule: CompiledSchedule
+    is_paused: bool
+    service_durations: Mapping[int, int]
+
+
+# Jarayon ichidagi kesh: barber jadvali va (barber_id, sana) bo'yicha band vaqtlar.
+# Buyurtma yoki jadvalni o'zgartiradigan joylar invalidate_* funksiyalarini chaqiradi,
+# TTL esa boshqa jarayonlardagi yozuvlar uchun zaxira.
+_schedule_cache: dict[int, tuple[float, BarberScheduleSnapshot]] = {}
+_day_cache: dict[tuple[int, date], tuple[float, tuple[BookedRow, ...]]] = {}
+_cache_generation: dict[int, int] = {}
+
+
+def _is_fresh(stored_at: float) -> bool:
+    return (monotonic() - stored_at) <= DAY_SCHEDULE_CACHE_TTL_SECONDS
+
+
+def _bump_generation(barber_id: int) -> None:
+    _cache_generation[barber_id] = _cache_generation.get(barber_id, 0) + 1
+
+
+def invalidate_barber_day(barber_id: object, day: date | None) -> None:
+    normalized_barber_id = _normalize_id(barber_id)
+    if normalized_barber_id is None:
+        return
+
+    _bump_generation(normalized_barber_id)
+    if day is None:
+        for key in [key for key in _day_cache if key[0] == normalized_barber_id]:
+            _day_cache.pop(key, None)
+        return
+    _day_cache.pop((normalized_barber_id, day), None)
+
+
+def invalidate_barber_schedule(barber_id: object) -> None:
+    normalized_barber_id = _normalize_id(barber_id)
+    if normalized_barber_id is None:
+        return
+
+    _schedule_cache.pop(normalized_barber_id, None)
+    invalidate_barber_day(normalized_barber_id, None)
+
+
+def clear_availability_cache() -> None:
+    for barber_id in list(_cache_generation):
+        _bump_generation(barber_id)
+    _schedule_cache.clear()
+    _day_cache.clear()
+
+
+async def _load_schedule_snapshot(session, barber_id: int) -> BarberScheduleSnapshot | None:
+    barber = await session.get(Barbers, barber_id)
+    if barber is None:
+        return None
+
+    result = await session.execute(
+        select(BarberServices.service_id, BarberServices.duration_minutes).where(
+            BarberServices.barber_id == barber_id
+        )
+    )
+    return BarberScheduleSnapshot(
+        id=int(barber.id),
+        schedule=schedule_of(barber),
+        is_paused=bool(barber.is_paused),
+        service_durations={
+            int(service_id): int(duration or 0)
+            for service_id, duration in result.all()
+        },
+    )
+
+
+async def _load_booked_rows(
+    session,
+    barber_id: int,
+    start_date: date,
+    end_date: date,
+) -> dict[date, list[BookedRow]]:
+    result = await session.execute(
+        select(Order.date, Order.time, Order.booked_duration_minutes).where(
+            Order.barber_id == barber_id,
+            Order.date.between(start_date, end_date),
+        )
+    )
+    rows_by_date: dict[date, list[BookedRow]] = {}
+    for order_date, order_time, duration in result.all():
+        rows_by_date.setdefault(order_date, []).append((order_time, duration))
+    return rows_by_date
+
+
+async def lock_barber_day(session, barber_id: int, target_date: date) -> None:
+    """
+    Barber + kun uchun tranzaksiya tugaguncha amal qiladigan advisory lock oladi.
+    Bir xil barber va kunga parallel bronlar shu yerda navbatga turadi.
+    """
+    await session.execute(
+        select(
+            func.pg_advisory_xact_lock(
+                int(barber_id) & ADVISORY_LOCK_KEY_MASK,
+                target_date.toordinal(),
+            )
+        )
+    )
+
+
+async def is_slot_available_locked(
+    session,
+    *,
+    barber_id: int,
+    service_id: int,
+    target_date: date,
+    target_time: time,
+) -> bool:
+    """
+    Lock ostida slotni keshsiz, to'g'ridan-to'g'ri bazadan qayta tekshiradi.
+    Natija shu tranzaksiya commit bo'lguncha o'zgarmaydi.
+    """
+    await lock_barber_day(session, barber_id, target_date)
+
+    snapshot = await _load_schedule_snapshot(session, barber_id)
+    if snapshot is None or service_id not in snapshot.service_durations:
+        return False
+
+    rows_by_date = await _load_booked_rows(session, barber_id, target_date, target_date)
+    slots = compute_available_slots(
+        snapshot,
+        snapshot.service_durations[service_id],
+        target_date,
+        rows_by_date.get(target_date, ()),
+    )
+    return target_time.strftime(HM_TIME_FORMAT) in slots
+
+
+async def _get_schedule_window(
+    barber_id: int,
+    start_date: date,
+    end_date: date,
+) -> tuple[BarberScheduleSnapshot | None, dict[date, tuple[BookedRow, ...]]]:
+    generation = _cache_generation.get(barber_id, 0)
+    days = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+    snapshot = None
+    cached_snapshot = _schedule_cache.get(barber_id)
+    if cached_snapshot is not None and _is_fresh(cached_snapshot[0]):
+        snapshot = cached_snapshot[1]
+
+    rows_by_date: dict[date, tuple[BookedRow, ...]] = {}
+    missing_days: list[date] = []
+    for day in days:
+        cached_day = _day_cache.get((barber_id, day))
+        if cached_day is not None and _is_fresh(cached_day[0]):
+            rows_by_date[day] = cached_day[1]
+        else:
+            missing_days.append(day)
+
+    if snapshot is not None and (snapshot.is_paused or not missing_days):
+        return snapshot, rows_by_date
+
+    async with async_session() as session:
+        if snapshot is None:
+            snapshot = await _load_schedule_snapshot(session, barber_id)
+            if snapshot is None:
+                return None, {}
+            if generation == _cache_generation.get(barber_id, 0):
+                _schedule_cache[barber_id] = (monotonic(), snapshot)
+
+        if snapshot.is_paused or not missing_days:
+            return snapshot, rows_by_date
+
+        loaded = await _load_booked_rows(session, barber_id, missing_days[0], missing_days[-1])
+
+    stored_at = monotonic()
+    can_store = generation == _cache_generation.get(barber_id, 0)
+    for day in missing_days:
+        day_rows = tuple(loaded.get(day, ()))
+        rows_by_date[day] = day_rows
+        if can_store:
+            _day_cache[(barber_id, day)] = (stored_at, day_rows)
+    return snapshot, rows_by_date
+
+
+async def get_available_slots(
+    service_id: int | str,
+    barber_id: int | str,
+    target_date: date,
+) -> list[str]:
+    barber_db_id = _normalize_id(barber_id)
+    service_db_id = _normalize_id(service_id)
+    if barber_db_id is None or service_db_id is None:
+        return []
+
+    snapshot, rows_by_date = await _get_schedule_window(barber_db_id, target_date, target_date)
+    if snapshot is None or service_db_id not in snapshot.service_durations:
+        return []
+
+    return compute_available_slots(
+        snapshot,
+        snapshot.service_durations[service_db_id],
+        target_date,
+        rows_by_date.get(target_date, ()),
+    )
+
+
+async def get_available_dates(
+    service_id: int | str,
+    barber_id: int | str,
+    *,
+    start_date: date | None = None,
+    days: int = BOOKING_WINDOW_DAYS,
+    now: datetime | None = None,
+) -> list[date]:
+    """Butun booking oynasi uchun bitta range query bilan bo'sh kunlarni qaytaradi."""
+    barber_db_id = _normalize_id(barber_id)
+    service_db_id = _normalize_id(service_id)
+    if barber_db_id is None or service_db_id is None:
+        return []
+
+    local_now = now or datetime.now().astimezone()
+    window_days = max(days, 1)
+    first_day = start_date or local_now.date()
+    last_day = first_day + timedelta(days=window_days - 1)
+
+    snapshot, rows_by_date = await _get_schedule_window(barber_db_id, first_day, last_day)
+    if snapshot is None or service_db_id not in snapshot.service_durations:
+        return []
+
+    service_duration = snapshot.service_durations[service_db_id]
+    available_dates: list[date] = []
+    for offset in range(window_days):
+        current_day = first_day + timedelta(days=offset)
+        slots = compute_available_slots(
+            snapshot,
+            service_duration,
+            current_day,
+            rows_by_date.get(current_day, ()),
+            now=local_now,
+        )
+        if slots:
+            available_dates.append(current_day)
+    return available_dates
@@ -1,61 +1,221 @@
 ﻿import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
 from typing import List, Optional
-from sqlalchemy import select, update
+from sqlalchemy import Integer, Text, any_, bindparam, case, cast, exists, func, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+import config
 from sql.db import async_session
-from sql.models import BarberOrderInbox
+from sql.models import BarberOrderInbox, BarberPresence, Barbers, Order
 
 logger = logging.getLogger(__name__)
 
-async def inbox_add(order_id: int, barber_tg_id: int) -> Optional[BarberOrderInbox]:
+# Yangi inbox qatorlari shu kanal orqali barcha worker'larga e'lon qilinadi (payload — barber tg_id)
+BARBER_INBOX_CHANNEL = "barber_inbox"
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class InboxEntry:
+    id: int
+    barber_tg_id: int
+    is_delivered: bool
+    # pg_notify yuborildimi (faqat Postgres'da)
+    published: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class ClaimedInboxRow:
+    id: int
+    order_id: int
+    # Xabar matni uchun buyurtma maydonlari (RETURNING ichida orders'dan)
+    fullname: str | None
+    service_name: str | None
+    order_date: date
+    order_time: time
+
+
+def _upsert_insert(session):
+    dialect_name = session.get_bind().dialect.name
+    try:
+        return _UPSERT_INSERTS[dialect_name]
+    except KeyError:
+        raise NotImplementedError(f"barber_order_inbox upsert is not supported on {dialect_name}")
+
+
+def _id_condition(session, ids: list[int]):
+    if session.get_bind().dialect.name == "postgresql":
+        # = ANY(massiv): paket o'lchamidan qat'i nazar bitta prepared statement
+        return BarberOrderInbox.id == any_(
+            bindparam("inbox_ids", ids, type_=postgresql.ARRAY(Integer))
+        )
+    return BarberOrderInbox.id.in_(ids)
+
+
+def _order_field(column):
+    # SQLite RETURNING'da faqat yangilanayotgan jadval bo'ladi: orders maydonlari PK bo'yicha subquery
+    return (
+        select(column)
+        .where(Order.id == BarberOrderInbox.order_id)
+        .scalar_subquery()
+        .label(column.key)
+    )
+
+
+async def inbox_upsert_for_order(order_id: int, barber_id: int) -> Optional[InboxEntry]:
+    """
+    Buyurtmani barber inbox'iga bitta so'rovda yozadi: barber tg_id'si barbers'dan
+    INSERT ... SELECT orqali olinadi, takror chaqiruv ON CONFLICT bilan mavjud qatorni qaytaradi.
+    Postgres'da RETURNING ichida pg_notify ham chaqiriladi (faqat yetkazilmagan qator uchun):
+    e'lon commit bilan birga ketadi.
+    Barber topilmasa (yoki tg_id bo'lmasa) None.
+    """
     async with async_session() as session:
         try:
-            existing = await session.execute(
-                select(BarberOrderInbox).where(
-                    BarberOrderInbox.order_id == int(order_id),
-                    BarberOrderInbox.barber_tg_id == int(barber_tg_id),
-                )
-                .order_by(BarberOrderInbox.id.desc())
+            upsert_insert = _upsert_insert(session)
+            publish = session.get_bind().dialect.name == "postgresql"
+            statement = upsert_insert(BarberOrderInbox).from_select(
+                ["order_id", "barber_tg_id"],
+                select(literal(int(order_id), Integer), Barbers.tg_id).where(
+                    Barbers.id == int(barber_id),
+                    Barbers.tg_id.is_not(None),
+                ),
             )
-            row = existing.scalars().first()
-            if row:
-                return row
-
-            row = BarberOrderInbox(order_id=order_id, barber_tg_id=barber_tg_id)
-            session.add(row)
+            returning = [
+                BarberOrderInbox.id,
+                BarberOrderInbox.barber_tg_id,
+                BarberOrderInbox.is_delivered,
+            ]
+            if publish:
+                # Allaqachon yetkazilgan qator (ON CONFLICT no-op) uchun e'lon yuborilmaydi
+                returning.append(
+                    case(
+                        (
+                            BarberOrderInbox.is_delivered.is_(False),
+                            func.pg_notify(
+                                BARBER_INBOX_CHANNEL, cast(BarberOrderInbox.barber_tg_id, Text)
+                            ),
+                        ),
+                    )
+                )
+            statement = statement.on_conflict_do_update(
+                index_elements=[BarberOrderInbox.order_id, BarberOrderInbox.barber_tg_id],
+                # No-op yangilash: RETURNING mavjud qatorni ham qaytarishi uchun
+                set_={"barber_tg_id": statement.excluded.barber_tg_id},
+            ).returning(*returning)
+            row = (await session.execute(statement)).first()
             await session.commit()
-            await session.refresh(row)
-            return row
         except Exception:
-            logger.exception("inbox_add failed")
+            logger.exception("inbox_upsert_for_order failed")
             try:
                 await session.rollback()
             except Exception:
                 pass
             return None
 
-async def inbox_get_undelivered(barber_tg_id: int) -> List[BarberOrderInbox]:
+    if row is None:
+        return None
+    return InboxEntry(
+        id=int(row.id),
+        barber_tg_id=int(row.barber_tg_id),
+        is_delivered=bool(row.is_delivered),
+        published=publish and not row.is_delivered,
+    )
+
+
+async def inbox_claim_undelivered(
+    barber_tg_id: int,
+    *,
+    claimed_by: str,
+    lease_seconds: float = config.BARBER_INBOX_CLAIM_LEASE_SECONDS,
+    active_since: datetime | None = None,
+) -> List[ClaimedInboxRow]:
+    """
+    Barberning yetkazilmagan qatorlarini bitta UPDATE ... RETURNING bilan lease_seconds
+    muddatga oladi (xabar uchun buyurtma maydonlari ham shu so'rovda keladi).
+    Bir nechta worker bir vaqtda chaqirsa ham har bir qatorni faqat bittasi oladi —
+    xabarni o'sha worker yuboradi va inbox_mark_delivered bilan belgilaydi. Olgan worker
+    yubormasdan o'lib qolsa, muddat tugagan qatorlar keyingi chaqiruvda qayta olinadi.
+    active_since berilsa, barber shu vaqtdan beri panelda ko'rinmagan bo'lsa hech narsa olinmaydi.
+    """
+    now = datetime.now(timezone.utc)
+    conditions = [
+        BarberOrderInbox.barber_tg_id == int(barber_tg_id),
+        BarberOrderInbox.is_delivered == False,
+        or_(BarberOrderInbox.claimed_until.is_(None), BarberOrderInbox.claimed_until < now),
+    ]
+    if active_since is not None:
+        conditions.append(
+            exists().where(
+                BarberPresence.barber_tg_id == BarberOrderInbox.barber_tg_id,
+                BarberPresence.last_seen >= active_since,
+            )
+        )
+
     async with async_session() as session:
         try:
-            res = await session.execute(
-                select(BarberOrderInbox)
-                .where(
-                    BarberOrderInbox.barber_tg_id == barber_tg_id,
-                    BarberOrderInbox.is_delivered == False
+            result = await session.execute(
+                update(BarberOrderInbox)
+                .where(*conditions)
+                .values(claimed_by=claimed_by, claimed_until=now + timedelta(seconds=lease_seconds))
+                .returning(
+                    BarberOrderInbox.id,
+                    BarberOrderInbox.order_id,
+                    *(_order_field(column) for column in (Order.fullname, Order.service_name, Order.date, Order.time)),
                 )
-                .order_by(BarberOrderInbox.id.asc())
             )
-            return list(res.scalars().all())
+            rows = result.all()
+            await session.commit()
         except Exception:
-            logger.exception("inbox_get_undelivered failed")
+            logger.exception("inbox_claim_undelivered failed")
+            try:
+                await session.rollback()
+            except Exception:
+                pass
             return []
 
-async def inbox_mark_delivered(inbox_id: int) -> bool:
+    claimed = [
+        ClaimedInboxRow(
+            id=int(row.id),
+            order_id=int(row.order_id),
+            fullname=row.fullname,
+            service_name=row.service_name,
+            order_date=row.date,
+            order_time=row.time,
+        )
+        for row in rows
+    ]
+    claimed.sort(key=lambda row: row.id)
+    return claimed
+
+
+async def inbox_mark_delivered(
+    inbox_ids: Iterable[int],
+    *,
+    delivered: bool = True,
+    claimed_by: str | None = None,
+) -> bool:
+    """
+    Bir nechta inbox qatorini bitta UPDATE bilan belgilaydi va olinganlik muddatini tozalaydi.
+    delivered=False — olingan, lekin yuborilmagan qatorlarni inbox'ga darhol qaytarish uchun;
+    claimed_by berilsa, faqat hali shu egada turgan qatorlar qaytariladi.
+    """
+    ids = sorted({int(inbox_id) for inbox_id in inbox_ids})
+    if not ids:
+        return True
+
     async with async_session() as session:
         try:
+            statement = update(BarberOrderInbox).where(_id_condition(session, ids))
+            if claimed_by is not None:
+                statement = statement.where(BarberOrderInbox.claimed_by == claimed_by)
             await session.execute(
-                update(BarberOrderInbox)
-                .where(BarberOrderInbox.id == inbox_id)
-                .values(is_delivered=True)
+                statement.values(is_delivered=delivered, claimed_by=None, claimed_until=None)
             )
             await session.commit()
             return True
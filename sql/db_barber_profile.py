@@ -1,8 +1,12 @@
-from sqlalchemy import select
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import select, true
 from sqlalchemy.exc import SQLAlchemyError
 
 from sql.db import async_session
-from sql.models import BarberProfileSettings
+from sql.db_catalog import bump_catalog_version
+from sql.models import BarberPhotos, BarberProfileSettings, Barbers
 
 
 ALLOWED_HIDDEN_FIELDS = {
@@ -22,7 +26,7 @@ def _normalize_barber_id(barber_id) -> int | None:
     return value if value > 0 else None
 
 
-def _normalize_hidden_fields(raw_value) -> list[str]:
+def normalize_hidden_fields(raw_value) -> list[str]:
     if not raw_value:
         return []
 
@@ -44,6 +48,69 @@ def _normalize_hidden_fields(raw_value) -> list[str]:
     return normalized
 
 
+@dataclass(frozen=True, slots=True)
+class BarberCardData:
+    barber: Barbers
+    photo: str | None
+    hidden_fields: frozenset[str]
+
+
+def _build_barber_cards_query(barber_ids: list[int] | None):
+    latest_photo = (
+        select(BarberPhotos.photo)
+        .where(BarberPhotos.barber_id == Barbers.id)
+        .order_by(BarberPhotos.id.desc())
+        .limit(1)
+        .lateral("latest_photo")
+    )
+    query = (
+        select(Barbers, latest_photo.c.photo, BarberProfileSettings.hidden_fields)
+        .select_from(Barbers)
+        .outerjoin(latest_photo, true())
+        .outerjoin(BarberProfileSettings, BarberProfileSettings.barber_id == Barbers.id)
+        .order_by(Barbers.id.asc())
+    )
+    if barber_ids is not None:
+        query = query.where(Barbers.id.in_(barber_ids))
+    return query
+
+
+async def load_barber_cards(
+    barber_ids: Iterable[object] | None = None,
+    *,
+    session=None,
+) -> dict[int, BarberCardData]:
+    """
+    Barberlarni oxirgi rasmi va profil sozlamalari bilan bitta so'rovda yuklaydi.
+    barber_ids berilmasa, barcha barberlar qaytariladi.
+    """
+    normalized_ids = None
+    if barber_ids is not None:
+        normalized_ids = sorted(
+            {item for item in (_normalize_barber_id(value) for value in barber_ids) if item}
+        )
+        if not normalized_ids:
+            return {}
+
+    query = _build_barber_cards_query(normalized_ids)
+    if session is None:
+        async with async_session() as own_session:
+            result = await own_session.execute(query)
+            rows = result.all()
+    else:
+        result = await session.execute(query)
+        rows = result.all()
+
+    return {
+        int(barber.id): BarberCardData(
+            barber=barber,
+            photo=photo,
+            hidden_fields=frozenset(normalize_hidden_fields(hidden_fields)),
+        )
+        for barber, photo, hidden_fields in rows
+    }
+
+
 async def get_barber_hidden_fields(barber_id) -> list[str]:
     normalized_barber_id = _normalize_barber_id(barber_id)
     if normalized_barber_id is None:
@@ -57,7 +124,7 @@ async def get_barber_hidden_fields(barber_id) -> list[str]:
         )
         hidden_fields = result.scalar_one_or_none()
 
-    return _normalize_hidden_fields(hidden_fields)
+    return normalize_hidden_fields(hidden_fields)
 
 
 async def set_barber_hidden_fields(barber_id, hidden_fields) -> list[str]:
@@ -65,7 +132,7 @@ async def set_barber_hidden_fields(barber_id, hidden_fields) -> list[str]:
     if normalized_barber_id is None:
         return []
 
-    normalized_hidden_fields = _normalize_hidden_fields(hidden_fields)
+    normalized_hidden_fields = normalize_hidden_fields(hidden_fields)
 
     async with async_session() as session:
         try:
@@ -80,6 +147,7 @@ async def set_barber_hidden_fields(barber_id, hidden_fields) -> list[str]:
                 settings.hidden_fields = normalized_hidden_fields
 
             await session.commit()
+            await bump_catalog_version()
             return normalized_hidden_fields
         except SQLAlchemyError:
             await session.rollback()
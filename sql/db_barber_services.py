@@ -1,14 +1,17 @@
 import asyncio
+import heapq
 import logging
 from collections.abc import Iterable, Mapping
 from datetime import date, datetime, time, timedelta
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy import and_, delete, func, not_, or_, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import selectinload
 
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_schedule
+from sql.db_catalog import bump_catalog_version
 from sql.models import BarberServiceDiscounts, BarberServices, Barbers, Services
 from utils.discounts import calculate_discounted_price, normalize_discount_percent
 from utils.service_pricing import attach_service_discount_snapshot
@@ -20,7 +23,7 @@ DISCOUNT_SCOPE_ALL = "all"
 DISCOUNT_SCOPE_SINGLE = "single"
 SERVICE_DISCOUNT_TIMEZONE = ZoneInfo("Asia/Tashkent")
 DEFAULT_SERVICE_DISCOUNT_DURATION = timedelta(hours=24)
-SERVICE_DISCOUNT_EXPIRY_CHECK_INTERVAL_SECONDS = 1.0
+SERVICE_DISCOUNT_EXPIRY_MAX_SLEEP_SECONDS = 300.0
 MAX_DURATION_MINUTES = 24 * 60
 
 
@@ -110,58 +113,156 @@ def _build_expired_discount_condition(current_at: datetime | None = None):
     )
 
 
-async def _expire_service_discounts_in_session(session) -> int:
-    result = await session.execute(
-        delete(BarberServiceDiscounts).where(_build_expired_discount_condition())
-    )
-    return int(result.rowcount or 0)
+def build_active_discount_condition(current_at: datetime | None = None):
+    return not_(_build_expired_discount_condition(current_at))
+
+
+def _discount_deadline(end_at: date, end_time: time) -> datetime:
+    return datetime.combine(end_at, end_time, tzinfo=SERVICE_DISCOUNT_TIMEZONE)
+
+
+class ServiceDiscountExpiryScheduler:
+    """
+    Chegirmalar tugash vaqtlarini min-heap'da saqlaydi va eng yaqin
+    muddatgacha uxlaydi. O'qish yo'llari muddati o'tganlarni WHERE bilan
+    filtrlaydi, shuning uchun bu yerda faqat jadval tozalanadi.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[datetime] = []
+        self._deadline_by_item: dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+
+    def _push(self, deadline: datetime) -> None:
+        if not self._heap or deadline < self._heap[0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, deadline)
+
+    def schedule(self, barber_service_id: int, end_at: date, end_time: time) -> None:
+        deadline = _discount_deadline(end_at, end_time)
+        self._deadline_by_item[int(barber_service_id)] = deadline
+        self._push(deadline)
+
+    def discard(self, barber_service_id: int) -> None:
+        # Heap'dagi eski muddat lazy tarzda tashlab yuboriladi
+        self._deadline_by_item.pop(int(barber_service_id), None)
+
+    def clear(self) -> None:
+        self._deadline_by_item.clear()
+        self._heap.clear()
+        self._wakeup.set()
+
+    def next_deadline(self) -> datetime | None:
+        live_deadlines = set(self._deadline_by_item.values())
+        while self._heap and self._heap[0] not in live_deadlines:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def pop_due(self, current_at: datetime) -> bool:
+        due_ids = [
+            item_id
+            for item_id, deadline in self._deadline_by_item.items()
+            if deadline <= current_at
+        ]
+        for item_id in due_ids:
+            del self._deadline_by_item[item_id]
+        while self._heap and self._heap[0] <= current_at:
+            heapq.heappop(self._heap)
+        return bool(due_ids)
+
+    async def load(self) -> int:
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    BarberServiceDiscounts.barber_service_id,
+                    BarberServiceDiscounts.end_at,
+                    BarberServiceDiscounts.end_time,
+                )
+            )
+            rows = result.all()
+
+        self._deadline_by_item = {
+            int(item_id): _discount_deadline(end_at, end_time)
+            for item_id, end_at, end_time in rows
+        }
+        self._heap = list(set(self._deadline_by_item.values()))
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        return len(rows)
+
+    async def run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            current_at = _get_discount_now()
+            if self.pop_due(current_at):
+                try:
+                    removed_count = await clear_expired_service_discounts()
+                    logger.info("Expired barber-service discounts removed: %s", removed_count)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Failed to clear expired barber-service discounts.")
+                continue
+
+            deadline = self.next_deadline()
+            timeout = None
+            if deadline is not None:
+                timeout = min(
+                    max((deadline - current_at).total_seconds(), 0.0),
+                    SERVICE_DISCOUNT_EXPIRY_MAX_SLEEP_SECONDS,
+                )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
 
 
-async def _sync_expired_service_discounts(session, *, commit: bool) -> int:
-    removed_count = await _expire_service_discounts_in_session(session)
-    if commit and removed_count:
-        await session.commit()
-    return removed_count
+discount_expiry_scheduler = ServiceDiscountExpiryScheduler()
 
 
 async def clear_expired_service_discounts() -> int:
     async with async_session() as session:
         try:
-            removed_count = await _expire_service_discounts_in_session(session)
+            result = await session.execute(
+                delete(BarberServiceDiscounts).where(_build_expired_discount_condition())
+            )
+            removed_count = int(result.rowcount or 0)
             if removed_count:
                 await session.commit()
+                await bump_catalog_version()
             return removed_count
         except SQLAlchemyError:
             await session.rollback()
             raise
 
 
-async def service_discount_expiry_worker(
-    poll_interval: float = SERVICE_DISCOUNT_EXPIRY_CHECK_INTERVAL_SECONDS,
-) -> None:
-    while True:
-        try:
-            await clear_expired_service_discounts()
-        except asyncio.CancelledError:
-            raise
-        except Exception:
-            logger.exception("Failed to clear expired barber-service discounts.")
-        await asyncio.sleep(poll_interval)
+async def service_discount_expiry_worker() -> None:
+    try:
+        await clear_expired_service_discounts()
+        await discount_expiry_scheduler.load()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Failed to load barber-service discount deadlines.")
+    await discount_expiry_scheduler.run()
 
 
 async def _load_discount_map(
     session,
     barber_service_ids: Iterable[int],
+    *,
+    include_expired: bool = False,
 ) -> dict[int, BarberServiceDiscounts]:
     normalized_ids = sorted({int(item_id) for item_id in barber_service_ids})
     if not normalized_ids:
         return {}
 
-    result = await session.execute(
-        select(BarberServiceDiscounts).where(
-            BarberServiceDiscounts.barber_service_id.in_(normalized_ids)
-        )
+    query = select(BarberServiceDiscounts).where(
+        BarberServiceDiscounts.barber_service_id.in_(normalized_ids)
     )
+    if not include_expired:
+        query = query.where(build_active_discount_condition())
+    result = await session.execute(query)
     return {
         int(discount.barber_service_id): discount
         for discount in result.scalars().all()
@@ -191,7 +292,6 @@ async def attach_discounts_to_barber_services(
         return items
 
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         discount_map = await _load_discount_map(
             session,
             (int(item.id) for item in items),
@@ -242,6 +342,8 @@ async def create_barber_service(
             session.add(item)
             await session.commit()
             await session.refresh(item)
+            invalidate_barber_schedule(normalized_barber_id)
+            await bump_catalog_version()
             attach_service_discount_snapshot(
                 item,
                 discount_percent=None,
@@ -266,7 +368,6 @@ async def update_barber_service(
 
     async with async_session() as session:
         try:
-            await _sync_expired_service_discounts(session, commit=False)
             item = await session.get(
                 BarberServices,
                 normalized_id,
@@ -303,6 +404,9 @@ async def update_barber_service(
             await session.refresh(item)
             if current_discount is not None:
                 await session.refresh(current_discount)
+            if "duration_minutes" in clean_updates:
+                invalidate_barber_schedule(int(item.barber_id))
+            await bump_catalog_version()
             attach_service_discount_snapshot(
                 item,
                 discount_percent=(current_discount.discount_percent if current_discount else None),
@@ -328,8 +432,11 @@ async def delete_barber_service(barber_service_id: int) -> bool:
             item = await session.get(BarberServices, normalized_id)
             if item is None:
                 return False
+            barber_id = int(item.barber_id)
             await session.delete(item)
             await session.commit()
+            invalidate_barber_schedule(barber_id)
+            await bump_catalog_version()
             return True
         except SQLAlchemyError:
             await session.rollback()
@@ -349,7 +456,6 @@ async def get_barber_service_by_id(barber_service_id: int) -> BarberServices | N
         return None
 
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         item = await session.get(
             BarberServices,
             normalized_id,
@@ -371,7 +477,6 @@ async def get_barber_service_by_pair(
         return None
 
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         result = await session.execute(
             select(BarberServices)
             .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
@@ -398,7 +503,6 @@ async def get_barber_services(barber_id: int | str) -> list[BarberServices]:
         return []
 
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         result = await session.execute(
             select(BarberServices)
             .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
@@ -412,7 +516,6 @@ async def get_barber_services(barber_id: int | str) -> list[BarberServices]:
 
 async def list_barber_services_ordered() -> list[BarberServices]:
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         result = await session.execute(
             select(BarberServices)
             .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
@@ -431,7 +534,6 @@ async def get_barber_services_by_service(service_id: int | str) -> list[BarberSe
         return []
 
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         result = await session.execute(
             select(BarberServices)
             .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
@@ -458,7 +560,6 @@ async def get_barber_ids_by_service(service_id: int | str) -> list[int]:
 
 async def list_discounted_barber_services_ordered() -> list[BarberServices]:
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         result = await session.execute(
             select(BarberServices)
             .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
@@ -468,6 +569,7 @@ async def list_discounted_barber_services_ordered() -> list[BarberServices]:
             )
             .join(Services, Services.id == BarberServices.service_id)
             .join(Barbers, Barbers.id == BarberServices.barber_id)
+            .where(build_active_discount_condition())
             .order_by(Services.name.asc(), Barbers.barber_first_name.asc(), BarberServices.id.asc())
         )
         items = list(result.scalars().all())
@@ -477,20 +579,24 @@ async def list_discounted_barber_services_ordered() -> list[BarberServices]:
 
 async def has_global_discount_on_all_services() -> bool:
     async with async_session() as session:
-        await _sync_expired_service_discounts(session, commit=True)
         total_items = await session.scalar(select(func.count(BarberServices.id)))
         total_items = int(total_items or 0)
         if total_items <= 0:
             return False
 
-        total_discounts = await session.scalar(select(func.count(BarberServiceDiscounts.id)))
+        total_discounts = await session.scalar(
+            select(func.count(BarberServiceDiscounts.id)).where(
+                build_active_discount_condition()
+            )
+        )
         total_discounts = int(total_discounts or 0)
         if total_discounts != total_items:
             return False
 
         non_global_count = await session.scalar(
             select(func.count(BarberServiceDiscounts.id)).where(
-                BarberServiceDiscounts.applied_scope != DISCOUNT_SCOPE_ALL
+                build_active_discount_condition(),
+                BarberServiceDiscounts.applied_scope != DISCOUNT_SCOPE_ALL,
             )
         )
         return int(non_global_count or 0) == 0
@@ -515,7 +621,6 @@ async def set_barber_service_discount(
 
     async with async_session() as session:
         try:
-            await _sync_expired_service_discounts(session, commit=False)
             item = await session.get(
                 BarberServices,
                 normalized_id,
@@ -524,7 +629,11 @@ async def set_barber_service_discount(
             if item is None:
                 return None
 
-            discount_map = await _load_discount_map(session, [int(item.id)])
+            discount_map = await _load_discount_map(
+                session,
+                [int(item.id)],
+                include_expired=True,
+            )
             discount = discount_map.get(int(item.id))
             discounted_price = calculate_discounted_price(int(item.price), percent)
 
@@ -546,6 +655,8 @@ async def set_barber_service_discount(
                 discount.end_time = end_time
 
             await session.commit()
+            discount_expiry_scheduler.schedule(int(item.id), end_at, end_time)
+            await bump_catalog_version()
             await session.refresh(item)
             await session.refresh(discount)
             attach_service_discount_snapshot(
@@ -580,14 +691,17 @@ async def bulk_set_barber_service_discount(
 
     async with async_session() as session:
         try:
-            await _sync_expired_service_discounts(session, commit=False)
             result = await session.execute(
                 select(BarberServices)
                 .where(BarberServices.id.in_(normalized_ids))
                 .order_by(BarberServices.id.asc())
             )
             items = list(result.scalars().all())
-            discount_map = await _load_discount_map(session, (int(item.id) for item in items))
+            discount_map = await _load_discount_map(
+                session,
+                (int(item.id) for item in items),
+                include_expired=True,
+            )
 
             for item in items:
                 discounted_price = calculate_discounted_price(int(item.price), percent)
@@ -611,6 +725,9 @@ async def bulk_set_barber_service_discount(
                     discount.end_time = end_time
 
             await session.commit()
+            for item in items:
+                discount_expiry_scheduler.schedule(int(item.id), end_at, end_time)
+            await bump_catalog_version()
             return len(items)
         except SQLAlchemyError:
             await session.rollback()
@@ -630,6 +747,8 @@ async def clear_barber_service_discount(barber_service_id: int) -> bool:
                 )
             )
             await session.commit()
+            discount_expiry_scheduler.discard(normalized_id)
+            await bump_catalog_version()
             return bool(result.rowcount)
         except SQLAlchemyError:
             await session.rollback()
@@ -641,6 +760,8 @@ async def clear_all_service_discounts() -> int:
         try:
             result = await session.execute(delete(BarberServiceDiscounts))
             await session.commit()
+            discount_expiry_scheduler.clear()
+            await bump_catalog_version()
             return int(result.rowcount or 0)
         except SQLAlchemyError:
             await session.rollback()
@@ -3,6 +3,9 @@
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from sql.db import async_session
+from sql.db_availability import apply_compiled_schedule, invalidate_barber_schedule
+from sql.db_catalog import bump_catalog_version
+from sql.db_roles import invalidate_user_roles
 from sql.models import Barbers
 
 
@@ -10,9 +13,12 @@ async def create_barber(data: dict):
     async with async_session() as session:
         try:
             new_barber = Barbers(**data)
+            apply_compiled_schedule(new_barber)
             session.add(new_barber)
             await session.commit()
             await session.refresh(new_barber)
+            invalidate_user_roles(new_barber.tg_id)
+            await bump_catalog_version()
             return new_barber
         except SQLAlchemyError:
             await session.rollback()
@@ -25,6 +31,11 @@ async def get_barbers():
         return result.scalars().all()
 
 
+async def get_barber(barber_id: int):
+    async with async_session() as session:
+        return await session.get(Barbers, int(barber_id))
+
+
 async def update_barber(barber_id: int, updates: dict):
     async with async_session() as session:
         barber = await session.get(Barbers, barber_id)
@@ -32,7 +43,11 @@ async def update_barber(barber_id: int, updates: dict):
             return None
         for key, val in updates.items():
             setattr(barber, key, val)
+        apply_compiled_schedule(barber)
         await session.commit()
+        invalidate_barber_schedule(barber_id)
+        invalidate_user_roles()
+        await bump_catalog_version()
         return barber
 
 
@@ -43,4 +58,6 @@ async def delete_barber(barber_id: int):
             return False
         await session.delete(barber)
         await session.commit()
+        invalidate_user_roles(barber.tg_id)
+        await bump_catalog_version()
         return True
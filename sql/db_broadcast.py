@@ -0,0 +1,322 @@
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exists, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql.db import async_session
+from sql.models import BroadcastJob, BroadcastRecipient
+
+BROADCAST_JOB_PENDING = "pending"
+BROADCAST_JOB_RUNNING = "running"
+BROADCAST_JOB_DONE = "done"
+
+RECIPIENT_PENDING = "pending"
+RECIPIENT_SENDING = "sending"
+RECIPIENT_SENT = "sent"
+RECIPIENT_FAILED = "failed"
+
+_UNFINISHED_RECIPIENT_STATUSES = (RECIPIENT_PENDING, RECIPIENT_SENDING)
+
+# Bitta INSERT'dagi qabul qiluvchilar soni
+RECIPIENT_INSERT_BATCH_SIZE = 1000
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_until(lease_seconds: float) -> datetime:
+    return _utcnow() + timedelta(seconds=lease_seconds)
+
+
+def _claimable_job_condition(owner: str, *, include_own: bool):
+    # Egasiz yoki egasining ijarasi tugagan tugallanmagan vazifa
+    available = [
+        BroadcastJob.owner.is_(None),
+        BroadcastJob.lease_until.is_(None),
+        BroadcastJob.lease_until < _utcnow(),
+    ]
+    if include_own:
+        available.append(BroadcastJob.owner == owner)
+    return BroadcastJob.status != BROADCAST_JOB_DONE, or_(*available)
+
+
+async def _insert_recipients(session, job_id: int, chat_ids: Iterable[int]) -> int:
+    inserted = 0
+    batch: list[dict] = []
+    for chat_id in chat_ids:
+        batch.append({"job_id": job_id, "chat_id": int(chat_id), "status": RECIPIENT_PENDING})
+        if len(batch) >= RECIPIENT_INSERT_BATCH_SIZE:
+            await session.execute(insert(BroadcastRecipient), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await session.execute(insert(BroadcastRecipient), batch)
+        inserted += len(batch)
+    return inserted
+
+
+async def create_broadcast_job(
+    *,
+    sender_tg_id: int,
+    text: str,
+    chat_ids: Iterable[int],
+    parse_mode: str | None = None,
+    progress_chat_id: int | None = None,
+    progress_message_id: int | None = None,
+    collecting: bool = False,
+    owner: str | None = None,
+    lease_seconds: float | None = None,
+) -> BroadcastJob:
+    """
+    Vazifa va uning qabul qiluvchilarini bitta tranzaksiyada saqlaydi.
+    collecting=True bo'lsa qolganlari add_broadcast_recipients bilan qo'shiladi.
+    owner berilsa vazifa yaratilishidanoq shu jarayon ijarasida: yig'ish davom
+    etayotganda boshqa worker uni yopib qo'ymaydi.
+    """
+    async with async_session() as session:
+        try:
+            job = BroadcastJob(
+                sender_tg_id=sender_tg_id,
+                text=text,
+                parse_mode=parse_mode,
+                status=BROADCAST_JOB_PENDING,
+                total=0,
+                sent=0,
+                failed=0,
+                is_collecting=collecting,
+                progress_chat_id=progress_chat_id,
+                progress_message_id=progress_message_id,
+                owner=owner,
+                lease_until=_lease_until(lease_seconds) if owner and lease_seconds else None,
+            )
+            session.add(job)
+            await session.flush()
+            job.total = await _insert_recipients(session, job.id, chat_ids)
+            await session.commit()
+            return job
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def add_broadcast_recipients(job_id: int, chat_ids: Iterable[int]) -> int:
+    async with async_session() as session:
+        try:
+            inserted = await _insert_recipients(session, job_id, chat_ids)
+            if inserted:
+                await session.execute(
+                    update(BroadcastJob)
+                    .where(BroadcastJob.id == job_id)
+                    .values(total=BroadcastJob.total + inserted)
+                )
+            await session.commit()
+            return inserted
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def finish_broadcast_collection(job_id: int) -> None:
+    async with async_session() as session:
+        try:
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(is_collecting=False)
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def get_broadcast_job(job_id: int) -> BroadcastJob | None:
+    async with async_session() as session:
+        return await session.get(BroadcastJob, job_id)
+
+
+async def list_unfinished_broadcast_job_ids() -> list[int]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(BroadcastJob.id)
+            .where(BroadcastJob.status != BROADCAST_JOB_DONE)
+            .order_by(BroadcastJob.id.asc())
+        )
+        return list(result.scalars().all())
+
+
+async def claim_broadcast_jobs(
+    owner: str,
+    lease_seconds: float,
+    *,
+    job_id: int | None = None,
+    exclude_ids: Iterable[int] = (),
+) -> list[int]:
+    """
+    Tugallanmagan vazifalarni shu jarayonga biriktiradi (UPDATE ... RETURNING).
+    Boshqa tirik worker ijarasidagi vazifalar olinmaydi; o'zimizdagisi faqat job_id
+    bilan aniq so'ralganda qaytadan olinadi. Olingan vazifalarda oldingi ega olib
+    qo'ygan (sending) qatorlar qayta navbatga qaytariladi.
+    """
+    exclude_ids = list(exclude_ids)
+    async with async_session() as session:
+        try:
+            statement = update(BroadcastJob).where(
+                *_claimable_job_condition(owner, include_own=job_id is not None)
+            )
+            if job_id is not None:
+                statement = statement.where(BroadcastJob.id == job_id)
+            if exclude_ids:
+                statement = statement.where(BroadcastJob.id.not_in(exclude_ids))
+            result = await session.execute(
+                statement.values(owner=owner, lease_until=_lease_until(lease_seconds)).returning(
+                    BroadcastJob.id
+                )
+            )
+            job_ids = sorted(result.scalars().all())
+            if job_ids:
+                await session.execute(
+                    update(BroadcastRecipient)
+                    .where(
+                        BroadcastRecipient.job_id.in_(job_ids),
+                        BroadcastRecipient.status == RECIPIENT_SENDING,
+                    )
+                    .values(status=RECIPIENT_PENDING)
+                )
+            await session.commit()
+            return job_ids
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def renew_broadcast_lease(job_id: int, owner: str, lease_seconds: float) -> bool:
+    """Ijarani uzaytiradi; vazifa boshqa egaga o'tgan bo'lsa False."""
+    async with async_session() as session:
+        try:
+            result = await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+                .values(lease_until=_lease_until(lease_seconds))
+            )
+            await session.commit()
+            return bool(result.rowcount)
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def claim_pending_recipients(job_id: int, owner: str, limit: int) -> list[int]:
+    """
+    Navbatdagi bo'lakni pending -> sending qilib oladi. Postgres'da SKIP LOCKED:
+    parallel tranzaksiyalar bir xil qatorlarni ololmaydi. Faqat vazifa egasi oladi.
+    """
+    pending_ids = (
+        select(BroadcastRecipient.id)
+        .where(
+            BroadcastRecipient.job_id == job_id,
+            BroadcastRecipient.status == RECIPIENT_PENDING,
+        )
+        .order_by(BroadcastRecipient.id.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    is_owner = exists().where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+    async with async_session() as session:
+        try:
+            result = await session.execute(
+                update(BroadcastRecipient)
+                .where(
+                    BroadcastRecipient.id.in_(pending_ids.scalar_subquery()),
+                    BroadcastRecipient.status == RECIPIENT_PENDING,
+                    is_owner,
+                )
+                .values(status=RECIPIENT_SENDING)
+                .returning(BroadcastRecipient.id, BroadcastRecipient.chat_id)
+            )
+            rows = sorted(result.all())
+            await session.commit()
+            return [chat_id for _, chat_id in rows]
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def set_broadcast_job_status(job_id: int, status: str) -> None:
+    values = {"status": status}
+    if status == BROADCAST_JOB_DONE:
+        values.update(finished_at=_utcnow(), owner=None, lease_until=None)
+    async with async_session() as session:
+        try:
+            await session.execute(
+                update(BroadcastJob).where(BroadcastJob.id == job_id).values(**values)
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def record_broadcast_results(
+    job_id: int,
+    *,
+    sent_chat_ids: Iterable[int] = (),
+    failed: dict[int, str] | None = None,
+) -> BroadcastJob | None:
+    """
+    Natijalarni yozadi va hisoblagichlarni oshiradi.
+    Faqat hali yakunlanmagan (pending/sending) qatorlar sanaladi, shuning uchun
+    qayta yozish xavfsiz.
+    """
+    sent_chat_ids = list(sent_chat_ids)
+    failed = failed or {}
+
+    failed_by_error: dict[str, list[int]] = {}
+    for chat_id, error in failed.items():
+        failed_by_error.setdefault((error or "")[:255], []).append(chat_id)
+
+    async with async_session() as session:
+        try:
+            sent_count = 0
+            if sent_chat_ids:
+                result = await session.execute(
+                    update(BroadcastRecipient)
+                    .where(
+                        BroadcastRecipient.job_id == job_id,
+                        BroadcastRecipient.chat_id.in_(sent_chat_ids),
+                        BroadcastRecipient.status.in_(_UNFINISHED_RECIPIENT_STATUSES),
+                    )
+                    .values(status=RECIPIENT_SENT)
+                )
+                sent_count = int(result.rowcount or 0)
+
+            failed_count = 0
+            for error, chat_ids in failed_by_error.items():
+                result = await session.execute(
+                    update(BroadcastRecipient)
+                    .where(
+                        BroadcastRecipient.job_id == job_id,
+                        BroadcastRecipient.chat_id.in_(chat_ids),
+                        BroadcastRecipient.status.in_(_UNFINISHED_RECIPIENT_STATUSES),
+                    )
+                    .values(status=RECIPIENT_FAILED, error=error or None)
+                )
+                failed_count += int(result.rowcount or 0)
+
+            if sent_count or failed_count:
+                await session.execute(
+                    update(BroadcastJob)
+                    .where(BroadcastJob.id == job_id)
+                    .values(
+                        sent=BroadcastJob.sent + sent_count,
+                        failed=BroadcastJob.failed + failed_count,
+                    )
+                )
+            await session.commit()
+            return await session.get(BroadcastJob, job_id, populate_existing=True)
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
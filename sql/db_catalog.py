@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from time import monotonic
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+
+from sql.db import async_session
+from sql.models import (
+    BarberServiceDiscounts,
+    BarberServices,
+    Barbers,
+    CatalogVersion,
+    Services,
+)
+from utils.service_pricing import ServicePriceSnapshot, build_price_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Versiya oshirilmay qolgan (bazaga yozib bo'lmagan) holatlar uchun xavfsizlik muddati
+CATALOG_CACHE_TTL_SECONDS = 300.0
+CATALOG_VERSION_ROW_ID = 1
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogOffering:
+    """Barber xizmati nusxasi: so'rovlar orasida umumiy, shuning uchun o'zgarmas."""
+
+    id: int
+    barber_id: int
+    service_id: int
+    price: int
+    duration_minutes: int | None
+    barber: Barbers | None
+    service: Services | None
+    price_snapshot: ServicePriceSnapshot
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    version: int
+    loaded_at: float
+    services: tuple[Services, ...]
+    barbers: tuple[Barbers, ...]
+    barbers_by_id: Mapping[int, Barbers]
+    offerings_by_service: Mapping[int, tuple[CatalogOffering, ...]]
+    photo_by_barber: Mapping[int, str]
+    hidden_fields_by_barber: Mapping[int, frozenset[str]]
+    valid_until: datetime | None = None
+
+
+_catalog: CatalogSnapshot | None = None
+_catalog_lock = asyncio.Lock()
+
+
+async def get_catalog_version() -> int | None:
+    """Umumiy katalog versiyasi (bitta qator, primary key bo'yicha); o'qib bo'lmasa None."""
+    async with async_session() as session:
+        try:
+            version = await session.scalar(
+                select(CatalogVersion.version).where(CatalogVersion.id == CATALOG_VERSION_ROW_ID)
+            )
+        except Exception:
+            logger.exception("get_catalog_version failed")
+            return None
+    return int(version or 0)
+
+
+async def bump_catalog_version() -> int | None:
+    """
+    Admin yozuvlaridan keyin chaqiriladi: versiya bazada oshiriladi, shuning uchun
+    barcha worker'lar keyingi o'qishda katalogni qayta yuklaydi.
+    """
+    global _catalog
+    # Shu jarayonda baza yozuvi muvaffaqiyatsiz bo'lsa ham eski nusxa ishlatilmaydi
+    _catalog = None
+    async with async_session() as session:
+        try:
+            result = await session.execute(
+                update(CatalogVersion)
+                .where(CatalogVersion.id == CATALOG_VERSION_ROW_ID)
+                .values(version=CatalogVersion.version + 1)
+                .returning(CatalogVersion.version)
+            )
+            version = result.scalar_one_or_none()
+            if version is None:
+                version = 1
+                session.add(CatalogVersion(id=CATALOG_VERSION_ROW_ID, version=version))
+            await session.commit()
+        except Exception:
+            logger.exception("bump_catalog_version failed")
+            try:
+                await session.rollback()
+            except Exception:
+                pass
+            return None
+    return int(version)
+
+
+def _is_current(snapshot: CatalogSnapshot | None, version: int | None) -> bool:
+    if snapshot is None:
+        return False
+    if version is not None and snapshot.version != version:
+        return False
+    if monotonic() - snapshot.loaded_at >= CATALOG_CACHE_TTL_SECONDS:
+        return False
+    if snapshot.valid_until is not None:
+        # Eng yaqin chegirma tugagach narxlar eskiradi
+        if datetime.now(snapshot.valid_until.tzinfo) >= snapshot.valid_until:
+            return False
+    return True
+
+
+async def _load_catalog_snapshot(version: int) -> CatalogSnapshot:
+    # db_barber_services va db_barber_profile versiyani oshirish uchun shu
+    # modulni import qiladi, shuning uchun ular bu yerda kech import qilinadi
+    from sql.db_barber_profile import load_barber_cards
+    from sql.db_barber_services import (
+        SERVICE_DISCOUNT_TIMEZONE,
+        build_active_discount_condition,
+    )
+
+    async with async_session() as session:
+        services_result = await session.execute(select(Services).order_by(Services.id.asc()))
+        services = tuple(services_result.scalars().all())
+
+        barber_cards = await load_barber_cards(session=session)
+
+        offerings_result = await session.execute(
+            select(BarberServices)
+            .options(selectinload(BarberServices.service), selectinload(BarberServices.barber))
+            .order_by(BarberServices.service_id.asc(), BarberServices.barber_id.asc())
+        )
+        offerings = list(offerings_result.scalars().all())
+
+        discounts_result = await session.execute(
+            select(BarberServiceDiscounts).where(build_active_discount_condition())
+        )
+        discount_map = {
+            int(discount.barber_service_id): discount
+            for discount in discounts_result.scalars().all()
+        }
+
+    offerings_by_service: dict[int, list[CatalogOffering]] = {}
+    for item in offerings:
+        discount = discount_map.get(int(item.id))
+        offerings_by_service.setdefault(int(item.service_id), []).append(
+            CatalogOffering(
+                id=int(item.id),
+                barber_id=int(item.barber_id),
+                service_id=int(item.service_id),
+                price=int(item.price or 0),
+                duration_minutes=item.duration_minutes,
+                barber=item.barber,
+                service=item.service,
+                price_snapshot=build_price_snapshot(
+                    item.price,
+                    discount_percent=(discount.discount_percent if discount else None),
+                    discounted_price=(int(discount.discounted_price) if discount else None),
+                ),
+            )
+        )
+
+    barbers = tuple(card.barber for card in barber_cards.values())
+    deadlines = [
+        datetime.combine(discount.end_at, discount.end_time, tzinfo=SERVICE_DISCOUNT_TIMEZONE)
+        for discount in discount_map.values()
+    ]
+    return CatalogSnapshot(
+        version=version,
+        loaded_at=monotonic(),
+        services=services,
+        barbers=barbers,
+        barbers_by_id={barber_id: card.barber for barber_id, card in barber_cards.items()},
+        offerings_by_service={
+            service_id: tuple(items) for service_id, items in offerings_by_service.items()
+        },
+        photo_by_barber={
+            barber_id: card.photo for barber_id, card in barber_cards.items() if card.photo
+        },
+        hidden_fields_by_barber={
+            barber_id: card.hidden_fields for barber_id, card in barber_cards.items()
+        },
+        valid_until=min(deadlines) if deadlines else None,
+    )
+
+
+async def get_catalog() -> CatalogSnapshot:
+    """
+    Navigatsiya uchun katalog nusxasi. Har chaqiruvda faqat versiya qatori o'qiladi;
+    boshqa worker versiyani oshirgan bo'lsa katalog qayta yuklanadi.
+    """
+    global _catalog
+    version = await get_catalog_version()
+    snapshot = _catalog
+    if _is_current(snapshot, version):
+        return snapshot
+
+    async with _catalog_lock:
+        snapshot = _catalog
+        if _is_current(snapshot, version):
+            return snapshot
+
+        # Versiyani o'qib bo'lmasa (-1), nusxa keyingi muvaffaqiyatli o'qishda yangilanadi
+        snapshot = await _load_catalog_snapshot(version if version is not None else -1)
+        _catalog = snapshot
+        logger.debug("Catalog loaded: version=%s", version)
+        return snapshot
+
+
+async def get_catalog_services() -> list[Services]:
+    return list((await get_catalog()).services)
+
+
+async def get_catalog_barbers() -> list[Barbers]:
+    return list((await get_catalog()).barbers)
+
+
+async def get_catalog_offerings(
+    service_id: int | str,
+    *,
+    include_paused: bool = False,
+) -> list[CatalogOffering]:
+    try:
+        normalized_service_id = int(service_id)
+    except (TypeError, ValueError):
+        return []
+
+    offerings = (await get_catalog()).offerings_by_service.get(normalized_service_id, ())
+    if include_paused:
+        return list(offerings)
+    return [
+        item
+        for item in offerings
+        if item.barber is not None and not item.barber.is_paused
+    ]
+
+
+async def get_catalog_barber_extras(barber_id: int) -> tuple[str | None, set[str]] | None:
+    """Barber kartasi uchun (oxirgi rasm, yashirin maydonlar); katalogda bo'lmasa None."""
+    snapshot = await get_catalog()
+    normalized_barber_id = int(barber_id)
+    if normalized_barber_id not in snapshot.barbers_by_id:
+        return None
+    return (
+        snapshot.photo_by_barber.get(normalized_barber_id),
+        set(snapshot.hidden_fields_by_barber.get(normalized_barber_id, ())),
+    )
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import AsyncGenerator, Mapping
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseEventIsolation,
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import case, cast, delete, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql.db import async_session
+from sql.models import FsmEventLock, FsmStorageRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FSM_TTL = timedelta(days=3)
+DEFAULT_EVENT_LOCK_TIMEOUT = timedelta(seconds=30)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _state_value(state: StateType) -> str | None:
+    if isinstance(state, State):
+        return state.state
+    return state
+
+
+def _insert_for(dialect_name: str):
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"FSM storage does not support dialect: {dialect_name}")
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    aiogram FSM holatini umumiy PostgreSQL bazasida saqlaydi.
+    Har bir kalit bitta qator: state + data, TTL bilan.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        *,
+        key_builder: KeyBuilder | None = None,
+        ttl: timedelta | None = DEFAULT_FSM_TTL,
+    ) -> None:
+        self._session_factory = session_factory
+        self._key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._ttl = ttl
+
+    def _dialect_name(self) -> str:
+        return self._session_factory.kw["bind"].dialect.name
+
+    def _expires_at(self) -> datetime | None:
+        return _utcnow() + self._ttl if self._ttl is not None else None
+
+    def _alive_condition(self):
+        return or_(
+            FsmStorageRecord.expires_at.is_(None),
+            FsmStorageRecord.expires_at > _utcnow(),
+        )
+
+    async def _upsert(self, storage_key: str, values: dict) -> None:
+        async with self._session_factory() as session:
+            try:
+                insert = _insert_for(self._dialect_name())
+                statement = insert(FsmStorageRecord).values(
+                    key=storage_key,
+                    expires_at=self._expires_at(),
+                    **values,
+                )
+                update_values = {"expires_at": statement.excluded.expires_at}
+                for column_name in values:
+                    update_values[column_name] = statement.excluded[column_name]
+                # Muddati o'tgan qatorning eski qismi qayta tirilmasligi kerak
+                if "state" not in values:
+                    update_values["state"] = case(
+                        (self._alive_condition(), FsmStorageRecord.state),
+                        else_=None,
+                    )
+                if "data" not in values:
+                    update_values["data"] = case(
+                        (self._alive_condition(), FsmStorageRecord.data),
+                        else_=statement.excluded.data,
+                    )
+                await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[FsmStorageRecord.key],
+                        set_=update_values,
+                    )
+                )
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                raise
+
+    async def _get_record(self, storage_key: str) -> tuple[str | None, dict] | None:
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(FsmStorageRecord.state, FsmStorageRecord.data).where(
+                    FsmStorageRecord.key == storage_key,
+                    self._alive_condition(),
+                )
+            )
+            return result.first()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._upsert(self._key_builder.build(key), {"state": _state_value(state)})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._get_record(self._key_builder.build(key))
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._upsert(self._key_builder.build(key), {"data": dict(data)})
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = await self._get_record(self._key_builder.build(key))
+        if not record or not record[1]:
+            return {}
+        return dict(record[1])
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        if self._dialect_name() != "postgresql":
+            return await super().update_data(key, data)
+
+        storage_key = self._key_builder.build(key)
+        async with self._session_factory() as session:
+            try:
+                statement = postgresql.insert(FsmStorageRecord).values(
+                    key=storage_key,
+                    data=dict(data),
+                    expires_at=self._expires_at(),
+                )
+                # jsonb || — bitta so'rovda atomik birlashtirish (dict.update kabi)
+                merged_data = cast(
+                    cast(FsmStorageRecord.data, JSONB).op("||")(
+                        cast(statement.excluded.data, JSONB)
+                    ),
+                    FsmStorageRecord.data.type,
+                )
+                result = await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[FsmStorageRecord.key],
+                        set_={
+                            "data": case(
+                                (self._alive_condition(), merged_data),
+                                else_=statement.excluded.data,
+                            ),
+                            "state": case(
+                                (self._alive_condition(), FsmStorageRecord.state),
+                                else_=None,
+                            ),
+                            "expires_at": statement.excluded.expires_at,
+                        },
+                    ).returning(FsmStorageRecord.data)
+                )
+                merged = result.scalar_one()
+                await session.commit()
+                return dict(merged or {})
+            except SQLAlchemyError:
+                await session.rollback()
+                raise
+
+    async def purge_expired(self) -> int:
+        async with self._session_factory() as session:
+            try:
+                result = await session.execute(
+                    delete(FsmStorageRecord).where(FsmStorageRecord.expires_at <= _utcnow())
+                )
+                await session.commit()
+                return int(result.rowcount or 0)
+            except SQLAlchemyError:
+                await session.rollback()
+                raise
+
+    async def close(self) -> None:
+        return None
+
+
+class DatabaseEventIsolation(BaseEventIsolation):
+    """
+    Bitta foydalanuvchi update'larini barcha worker'lar bo'yicha ketma-ket ishlatadi.
+    Jarayon ichida kutuvchilar asyncio.Lock'da navbatga turadi; jarayonlararo lock —
+    fsm_event_locks jadvalidagi muddatli qator (bitta INSERT ... ON CONFLICT bilan olinadi).
+    Handler davomida bazadan ulanish ushlab turilmaydi; lock band bo'lsa poll_interval
+    bilan qayta uriniladi. Egasi o'lib qolsa yoki handler timeout'dan uzoq ishlasa,
+    lock muddat tugagach keyingi kutuvchiga o'tadi — shuning uchun kutish ham timeout
+    bilan cheklangan.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        *,
+        key_builder: KeyBuilder | None = None,
+        timeout: timedelta = DEFAULT_EVENT_LOCK_TIMEOUT,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self._session_factory = session_factory
+        self._key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Kalit bo'yicha lock'ni kutayotgan/ushlab turgan handlerlar soni
+        self._users: dict[str, int] = {}
+
+    def _dialect_name(self) -> str:
+        return self._session_factory.kw["bind"].dialect.name
+
+    async def _try_acquire(self, lock_key: str, owner: str) -> bool:
+        now = _utcnow()
+        insert = _insert_for(self._dialect_name())
+        statement = insert(FsmEventLock).values(
+            key=lock_key,
+            owner=owner,
+            locked_until=now + self._timeout,
+        )
+        async with self._session_factory() as session:
+            try:
+                # Qator bo'lsa, faqat muddati o'tgan lock olinadi
+                result = await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[FsmEventLock.key],
+                        set_={
+                            "owner": statement.excluded.owner,
+                            "locked_until": statement.excluded.locked_until,
+                        },
+                        where=FsmEventLock.locked_until <= now,
+                    ).returning(FsmEventLock.owner)
+                )
+                acquired = result.scalar_one_or_none() == owner
+                await session.commit()
+                return acquired
+            except SQLAlchemyError:
+                await session.rollback()
+                raise
+
+    async def _release(self, lock_key: str, owner: str) -> None:
+        async with self._session_factory() as session:
+            try:
+                await session.execute(
+                    delete(FsmEventLock).where(
+                        FsmEventLock.key == lock_key,
+                        FsmEventLock.owner == owner,
+                    )
+                )
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                # Bo'shatilmagan lock muddat tugagach o'z-o'zidan o'tadi
+                logger.exception("FSM event lock release failed for %s", lock_key)
+
+    async def _acquire(self, lock_key: str, owner: str) -> None:
+        deadline = time.monotonic() + self._timeout.total_seconds()
+        while not await self._try_acquire(lock_key, owner):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"FSM event lock timed out: {lock_key}")
+            await asyncio.sleep(self._poll_interval)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        lock_key = self._key_builder.build(key, "lock")
+        lock = self._locks.get(lock_key)
+        if lock is None:
+            lock = self._locks[lock_key] = asyncio.Lock()
+        self._users[lock_key] = self._users.get(lock_key, 0) + 1
+        try:
+            async with lock:
+                owner = uuid.uuid4().hex
+                acquire = asyncio.ensure_future(self._acquire(lock_key, owner))
+                try:
+                    await asyncio.shield(acquire)
+                except asyncio.CancelledError:
+                    # Bekor qilish lock olingandan keyin kelgan bo'lishi mumkin
+                    acquire.cancel()
+                    await asyncio.gather(acquire, return_exceptions=True)
+                    await asyncio.shield(self._release(lock_key, owner))
+                    raise
+                try:
+                    yield
+                finally:
+                    await asyncio.shield(self._release(lock_key, owner))
+        finally:
+            # Bo'sh qolgan kalitlar o'chiriladi: _locks har bir chat bilan o'sib bormaydi
+            self._users[lock_key] -= 1
+            if not self._users[lock_key]:
+                del self._users[lock_key]
+                del self._locks[lock_key]
+
+    async def purge_expired(self) -> int:
+        async with self._session_factory() as session:
+            try:
+                result = await session.execute(
+                    delete(FsmEventLock).where(FsmEventLock.locked_until <= _utcnow())
+                )
+                await session.commit()
+                return int(result.rowcount or 0)
+            except SQLAlchemyError:
+                await session.rollback()
+                raise
+
+    async def close(self) -> None:
+        self._locks.clear()
+        self._users.clear()
+
+
+async def fsm_purge_worker(
+    storage: DatabaseStorage,
+    isolation: DatabaseEventIsolation | None,
+    *,
+    interval_seconds: float,
+) -> None:
+    """Muddati o'tgan FSM qatorlari va tashlab ketilgan lock'larni vaqti-vaqti bilan o'chiradi."""
+    while True:
+        try:
+            purged = await storage.purge_expired()
+            if isolation is not None:
+                purged += await isolation.purge_expired()
+            if purged:
+                logger.info("Purged %s expired FSM rows", purged)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("FSM purge failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from sql.db import async_session
+from sql.models import Order
+
+# Barber panellari uchun umumiy, tiplangan filtrlar: barber_id har doim int
+# bo'lib bog'lanadi, shuning uchun (barber_id, date, time) indeksi ishlatiladi.
+
+
+def _barber_pk(barber_id: int | str) -> int:
+    return int(barber_id)
+
+
+def barber_orders_filter(barber_id: int | str) -> ColumnElement[bool]:
+    return Order.barber_id == _barber_pk(barber_id)
+
+
+def today_condition(today: date) -> ColumnElement[bool]:
+    return Order.date == today
+
+
+def upcoming_condition(now: datetime) -> ColumnElement[bool]:
+    """Hali boshlanmagan navbatlar: keyingi kunlar yoki bugun hozirgi vaqtdan keyin."""
+    today = now.date()
+    return or_(
+        Order.date > today,
+        and_(Order.date == today, Order.time >= now.time()),
+    )
+
+
+def completed_condition(now: datetime) -> ColumnElement[bool]:
+    """Vaqti o'tgan navbatlar: oldingi kunlar yoki bugun hozirgi vaqtdan oldin."""
+    today = now.date()
+    return or_(
+        Order.date < today,
+        and_(Order.date == today, Order.time < now.time()),
+    )
+
+
+def today_completed_condition(now: datetime) -> ColumnElement[bool]:
+    return and_(Order.date == now.date(), Order.time < now.time())
+
+
+def today_upcoming_condition(now: datetime) -> ColumnElement[bool]:
+    return and_(Order.date == now.date(), Order.time >= now.time())
+
+
+def phone_digits(value: str | None) -> str:
+    return "".join(char for char in str(value or "") if char.isdigit())
+
+
+def phone_search_condition(digits: str) -> ColumnElement[bool]:
+    """Raqamlar bo'yicha qism-qidiruv; user_id bilan birga ix_orders_phone_digits_trgm (btree_gin + pg_trgm) ishlatiladi."""
+    return Order.phone_digits.like(f"%{digits}%")
+
+
+def weekday_condition(dow: int) -> ColumnElement[bool]:
+    """0 = yakshanba ... 6 = shanba; ifoda ix_orders_user_weekday bilan bir xil."""
+    return func.extract("dow", Order.date) == dow
+
+
+def barber_day_orders_query(barber_id: int | str, day: date):
+    return (
+        select(Order)
+        .where(barber_orders_filter(barber_id), today_condition(day))
+        .order_by(Order.time.asc(), Order.id.asc())
+    )
+
+
+def barber_orders_query(barber_id: int | str):
+    return (
+        select(Order)
+        .where(barber_orders_filter(barber_id))
+        .order_by(Order.date.asc(), Order.time.asc(), Order.id.asc())
+    )
+
+
+def barber_client_ids_query(barber_id: int | str):
+    return select(Order.user_id).where(barber_orders_filter(barber_id)).distinct()
+
+
+async def get_barber_day_orders(barber_id: int | str, day: date | None = None) -> list[Order]:
+    async with async_session() as session:
+        result = await session.execute(barber_day_orders_query(barber_id, day or date.today()))
+        return list(result.scalars().all())
+
+
+async def get_barber_orders(barber_id: int | str) -> list[Order]:
+    async with async_session() as session:
+        result = await session.execute(barber_orders_query(barber_id))
+        return list(result.scalars().all())
+
+
+async def get_barber_client_ids(barber_id: int | str) -> list[int]:
+    async with async_session() as session:
+        result = await session.execute(barber_client_ids_query(barber_id))
+        return [int(user_id) for user_id in result.scalars().all()]
+
+
+async def count_barber_clients(barber_id: int | str) -> int:
+    async with async_session() as session:
+        count = await session.scalar(
+            select(func.count(func.distinct(Order.user_id))).where(barber_orders_filter(barber_id))
+        )
+        return int(count or 0)
@@ -0,0 +1,162 @@
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql.db import async_session
+from sql.models import DailyOrderStat, Order, OrderUserStat
+
+logger = logging.getLogger(__name__)
+
+# daily_order_stats — orders jadvalining (kun, barber, xizmat) bo'yicha yig'masi.
+# Buyurtma yaratilganda +1, o'chirilganda -1 shu tranzaksiyaning o'zida qo'shiladi,
+# shuning uchun yig'ma orders bilan birga commit/rollback bo'ladi.
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _dimension_id(value: Any) -> int:
+    return int(value) if value is not None else 0
+
+
+def _upsert_insert(session):
+    dialect_name = session.get_bind().dialect.name
+    try:
+        return _UPSERT_INSERTS[dialect_name]
+    except KeyError:
+        raise NotImplementedError(f"daily_order_stats upsert is not supported on {dialect_name}")
+
+
+async def apply_order_stats_delta(session, orders: Iterable[Any], *, sign: int) -> None:
+    """
+    Buyurtmalarni yig'maga qo'shadi (sign=1) yoki ayiradi (sign=-1).
+    orders — Order obyektlari yoki shu nomdagi ustunlari bor RETURNING qatorlari.
+    Commit chaqiruvchining tranzaksiyasida qilinadi.
+    """
+    day_rows: dict[tuple[date, int, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+    user_rows: dict[int, int] = defaultdict(int)
+    for order in orders:
+        key = (order.date, _dimension_id(order.barber_id), _dimension_id(order.service_id))
+        totals = day_rows[key]
+        totals[0] += sign
+        totals[1] += sign * int(order.booked_price or 0)
+        totals[2] += sign * int(order.booked_duration_minutes or 0)
+        user_rows[int(order.user_id)] += sign
+
+    if not day_rows:
+        return
+
+    upsert_insert = _upsert_insert(session)
+
+    statement = upsert_insert(DailyOrderStat).values(
+        [
+            {
+                "day": day,
+                "barber_id": barber_id,
+                "service_id": service_id,
+                "order_count": order_count,
+                "revenue": revenue,
+                "minutes_booked": minutes_booked,
+            }
+            for (day, barber_id, service_id), (order_count, revenue, minutes_booked) in sorted(
+                day_rows.items()
+            )
+        ]
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                DailyOrderStat.day,
+                DailyOrderStat.barber_id,
+                DailyOrderStat.service_id,
+            ],
+            set_={
+                "order_count": DailyOrderStat.order_count + statement.excluded.order_count,
+                "revenue": DailyOrderStat.revenue + statement.excluded.revenue,
+                "minutes_booked": DailyOrderStat.minutes_booked + statement.excluded.minutes_booked,
+            },
+        )
+    )
+
+    statement = upsert_insert(OrderUserStat).values(
+        [
+            {"user_id": user_id, "order_count": order_count}
+            for user_id, order_count in sorted(user_rows.items())
+        ]
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[OrderUserStat.user_id],
+            set_={"order_count": OrderUserStat.order_count + statement.excluded.order_count},
+        )
+    )
+
+
+async def backfill_order_stats(session_factory=async_session) -> int:
+    """
+    Yig'mani orders'dan qaytadan hisoblaydi (birinchi ishga tushirish yoki tuzatish uchun).
+    Postgres'da orders SHARE rejimida bloklanadi: hisoblash vaqtida yozuvlar kutib turadi.
+    Qaytaradi: daily_order_stats qatorlari soni.
+    """
+    barber_key = func.coalesce(Order.barber_id, 0)
+    service_key = func.coalesce(Order.service_id, 0)
+
+    async with session_factory() as session:
+        try:
+            if session.get_bind().dialect.name == "postgresql":
+                await session.execute(text("LOCK TABLE orders IN SHARE MODE"))
+
+            await session.execute(delete(DailyOrderStat))
+            await session.execute(delete(OrderUserStat))
+            result = await session.execute(
+                insert(DailyOrderStat).from_select(
+                    [
+                        "day",
+                        "barber_id",
+                        "service_id",
+                        "order_count",
+                        "revenue",
+                        "minutes_booked",
+                    ],
+                    select(
+                        Order.date,
+                        barber_key,
+                        service_key,
+                        func.count(Order.id),
+                        func.coalesce(func.sum(Order.booked_price), 0),
+                        func.coalesce(func.sum(Order.booked_duration_minutes), 0),
+                    ).group_by(Order.date, barber_key, service_key),
+                )
+            )
+            await session.execute(
+                insert(OrderUserStat).from_select(
+                    ["user_id", "order_count"],
+                    select(Order.user_id, func.count(Order.id)).group_by(Order.user_id),
+                )
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+    logger.info("daily_order_stats backfilled: %s rows", result.rowcount)
+    return int(result.rowcount or 0)
+
+
+async def ensure_order_stats_backfilled(session_factory=async_session) -> bool:
+    """Yig'ma bo'sh, orders esa bo'sh bo'lmasa (birinchi joylashtirish) — backfill qiladi."""
+    async with session_factory() as session:
+        has_rollup = await session.scalar(select(DailyOrderStat.day).limit(1))
+        has_orders = await session.scalar(select(Order.id).limit(1))
+    if has_rollup is not None or has_orders is None:
+        return False
+    await backfill_order_stats(session_factory)
+    return True
@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, select, true
+
+from sql.db import async_session
+from sql.db_order_queries import (
+    barber_orders_filter,
+    today_completed_condition,
+    today_upcoming_condition,
+    upcoming_condition,
+)
+from sql.models import DailyOrderStat, Order, OrderUserStat, Services
+
+
+@dataclass(frozen=True, slots=True)
+class BarberOrderStats:
+    total: int = 0
+    # Order.date == bugun (navbat kuni)
+    today: int = 0
+    # Order.booked_date == bugun (bugun olingan navbatlar)
+    booked_today: int = 0
+    today_completed: int = 0
+    today_upcoming: int = 0
+    upcoming: int = 0
+    # Kun bo'yicha: bugun va keyingi kunlar / oldingi kunlar
+    pending_days: int = 0
+    past_days: int = 0
+    last_7_days: int = 0
+    last_30_days: int = 0
+    unique_users: int = 0
+    top_service_id: int | None = None
+    top_service_name: str | None = None
+    top_service_count: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class OverallOrderStats:
+    total: int = 0
+    queue_users: int = 0
+    booked_today: int = 0
+    today_completed: int = 0
+    today_upcoming: int = 0
+    upcoming: int = 0
+    revenue: int = 0
+
+
+def build_barber_stats_query(barber_id: int | str, now: datetime):
+    """Barcha hisoblagichlar va eng ko'p olingan xizmat — bitta so'rovda."""
+    today = now.date()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+    barber_filter = barber_orders_filter(barber_id)
+
+    counters = (
+        select(
+            func.count(Order.id).label("total"),
+            func.count(Order.id).filter(Order.date == today).label("today"),
+            func.count(Order.id).filter(Order.booked_date == today).label("booked_today"),
+            func.count(Order.id).filter(today_completed_condition(now)).label("today_completed"),
+            func.count(Order.id).filter(today_upcoming_condition(now)).label("today_upcoming"),
+            func.count(Order.id).filter(upcoming_condition(now)).label("upcoming"),
+            func.count(Order.id).filter(Order.date >= today).label("pending_days"),
+            func.count(Order.id).filter(Order.date < today).label("past_days"),
+            func.count(Order.id)
+            .filter(and_(Order.date >= week_ago, Order.date <= today))
+            .label("last_7_days"),
+            func.count(Order.id)
+            .filter(and_(Order.date >= month_ago, Order.date <= today))
+            .label("last_30_days"),
+            func.count(func.distinct(Order.user_id)).label("unique_users"),
+        )
+        .where(barber_filter)
+        .subquery("counters")
+    )
+
+    service_count = func.count(Order.id)
+    top_service = (
+        select(
+            Order.service_id.label("service_id"),
+            service_count.label("service_count"),
+        )
+        .where(barber_filter)
+        .group_by(Order.service_id)
+        .order_by(service_count.desc(), Order.service_id.asc())
+        .limit(1)
+        .subquery("top_service")
+    )
+
+    return select(
+        counters,
+        top_service.c.service_id.label("top_service_id"),
+        Services.name.label("top_service_name"),
+        top_service.c.service_count.label("top_service_count"),
+    ).select_from(
+        counters.outerjoin(top_service, true()).outerjoin(
+            Services, Services.id == top_service.c.service_id
+        )
+    )
+
+
+async def get_barber_order_stats(
+    barber_id: int | str,
+    *,
+    now: datetime | None = None,
+    session=None,
+) -> BarberOrderStats:
+    statement = build_barber_stats_query(barber_id, now or datetime.now())
+    if session is None:
+        async with async_session() as own_session:
+            row = (await own_session.execute(statement)).mappings().one()
+    else:
+        row = (await session.execute(statement)).mappings().one()
+
+    return BarberOrderStats(
+        total=int(row["total"] or 0),
+        today=int(row["today"] or 0),
+        booked_today=int(row["booked_today"] or 0),
+        today_completed=int(row["today_completed"] or 0),
+        today_upcoming=int(row["today_upcoming"] or 0),
+        upcoming=int(row["upcoming"] or 0),
+        pending_days=int(row["pending_days"] or 0),
+        past_days=int(row["past_days"] or 0),
+        last_7_days=int(row["last_7_days"] or 0),
+        last_30_days=int(row["last_30_days"] or 0),
+        unique_users=int(row["unique_users"] or 0),
+        top_service_id=(
+            int(row["top_service_id"]) if row["top_service_id"] is not None else None
+        ),
+        top_service_name=row["top_service_name"],
+        top_service_count=int(row["top_service_count"] or 0),
+    )
+
+
+def build_overall_stats_query(now: datetime):
+    """
+    Umumiy panel: tarix daily_order_stats yig'masidan, bugungi vaqtga bog'liq qism
+    esa orders'dan (date / booked_date indekslari bo'yicha faqat bugungi qatorlar).
+    """
+    today = now.date()
+
+    rollup = select(
+        func.coalesce(func.sum(DailyOrderStat.order_count), 0).label("total"),
+        func.coalesce(
+            func.sum(DailyOrderStat.order_count).filter(DailyOrderStat.day > today), 0
+        ).label("future"),
+        func.coalesce(func.sum(DailyOrderStat.revenue), 0).label("revenue"),
+    ).subquery("rollup")
+
+    today_delta = (
+        select(
+            func.count(Order.id).filter(today_completed_condition(now)).label("today_completed"),
+            func.count(Order.id).filter(today_upcoming_condition(now)).label("today_upcoming"),
+        )
+        .where(Order.date == today)
+        .subquery("today_delta")
+    )
+
+    booked_today = (
+        select(func.count(Order.id)).where(Order.booked_date == today).scalar_subquery()
+    )
+    queue_users = (
+        select(func.count()).where(OrderUserStat.order_count > 0).scalar_subquery()
+    )
+
+    return select(
+        rollup.c.total,
+        rollup.c.revenue,
+        (rollup.c.future + today_delta.c.today_upcoming).label("upcoming"),
+        today_delta.c.today_completed,
+        today_delta.c.today_upcoming,
+        booked_today.label("booked_today"),
+        queue_users.label("queue_users"),
+    ).select_from(rollup.join(today_delta, true()))
+
+
+async def get_overall_order_stats(
+    *,
+    now: datetime | None = None,
+    session=None,
+) -> OverallOrderStats:
+    statement = build_overall_stats_query(now or datetime.now())
+    if session is None:
+        async with async_session() as own_session:
+            row = (await own_session.execute(statement)).mappings().one()
+    else:
+        row = (await session.execute(statement)).mappings().one()
+
+    return OverallOrderStats(
+        total=int(row["total"] or 0),
+        queue_users=int(row["queue_users"] or 0),
+        booked_today=int(row["booked_today"] or 0),
+        today_completed=int(row["today_completed"] or 0),
+        today_upcoming=int(row["today_upcoming"] or 0),
+        upcoming=int(row["upcoming"] or 0),
+        revenue=int(row["revenue"] or 0),
+    )
@@ -1,16 +1,32 @@
 # sql/db_order_utils.py
+from dataclasses import dataclass
 from datetime import date, datetime, time
 import logging
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import selectinload
 
 from .db import async_session
-from .models import BarberServiceDiscounts, BarberServices, Order
+from .db_availability import invalidate_barber_day, invalidate_barber_schedule
+from .db_barber_services import build_active_discount_condition
+from .db_catalog import bump_catalog_version
+from .db_order_rollup import apply_order_stats_delta
+from .db_pagination import invalidate_order_pages
+from .models import BarberServiceDiscounts, BarberServices, Barbers, Order
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class CancelledOrder:
+    order_id: int
+    user_id: int
+    order_date: date
+    order_time: time
+    service_name: str
+
+
 def _parse_date(value):
     if value is None:
         raise ValueError("date is required")
@@ -90,7 +106,8 @@ async def _resolve_barber_service(session, order: dict) -> BarberServices | None
 async def _current_price(session, barber_service: BarberServices) -> int:
     discounted_price = await session.scalar(
         select(BarberServiceDiscounts.discounted_price).where(
-            BarberServiceDiscounts.barber_service_id == int(barber_service.id)
+            BarberServiceDiscounts.barber_service_id == int(barber_service.id),
+            build_active_discount_condition(),
         )
     )
     return int(discounted_price if discounted_price is not None else barber_service.price)
@@ -145,8 +162,12 @@ async def save_order(order: dict):
                 booked_time=now.time(),
             )
             session.add(new_order)
+            await session.flush()
+            await apply_order_stats_delta(session, [new_order], sign=1)
             await session.commit()
             await session.refresh(new_order)
+            invalidate_barber_day(new_order.barber_id, new_order.date)
+            invalidate_order_pages()
             return new_order
 
         except Exception as exc:
@@ -192,5 +213,71 @@ async def delete_last_order_by_user(user_id: int, order_date: date = None):
             return None
 
         await session.delete(order)
+        await apply_order_stats_delta(session, [order], sign=-1)
         await session.commit()
+        invalidate_barber_day(order.barber_id, order.date)
+        invalidate_order_pages()
         return order
+
+
+async def cancel_barber_day_orders(
+    barber_id: int,
+    order_date: date,
+    *,
+    pause_barber: bool = False,
+) -> list[CancelledOrder]:
+    """
+    Barberning bir kunlik buyurtmalarini bitta DELETE ... RETURNING bilan o'chiradi.
+    Qatorlar qisqa tranzaksiyada bloklanadi; mijozlarga xabar keyin yuboriladi.
+    """
+    async with async_session() as session:
+        try:
+            result = await session.execute(
+                delete(Order)
+                .where(
+                    Order.barber_id == int(barber_id),
+                    Order.date == order_date,
+                )
+                .returning(
+                    Order.id,
+                    Order.user_id,
+                    Order.date,
+                    Order.time,
+                    Order.service_name,
+                    Order.barber_id,
+                    Order.service_id,
+                    Order.booked_price,
+                    Order.booked_duration_minutes,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await apply_order_stats_delta(session, rows, sign=-1)
+            cancelled = [
+                CancelledOrder(
+                    order_id=int(row.id),
+                    user_id=int(row.user_id),
+                    order_date=row.date,
+                    order_time=row.time,
+                    service_name=row.service_name,
+                )
+                for row in rows
+            ]
+            if pause_barber:
+                await session.execute(
+                    update(Barbers)
+                    .where(Barbers.id == int(barber_id))
+                    .values(is_paused=True)
+                )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+    if pause_barber:
+        invalidate_barber_schedule(barber_id)
+        await bump_catalog_version()
+    else:
+        invalidate_barber_day(barber_id, order_date)
+    invalidate_order_pages()
+    return sorted(cancelled, key=lambda order: (order.order_time, order.order_id))
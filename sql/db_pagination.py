@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from dataclasses import dataclass, field
+from time import monotonic
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+# Keyset (seek) pagination: sahifa OFFSET bilan emas, oldin ko'rilgan sahifaning
+# birinchi qatori kaliti (masalan (date, time, id)) dan boshlab o'qiladi.
+# Kalitlar va jami soni jarayon ichida qisqa muddat saqlanadi; buyurtma yozilganda
+# invalidate_order_pages() chaqiriladi, TTL esa boshqa jarayonlardagi yozuvlar uchun zaxira.
+
+ORDER_PAGE_CACHE_TTL_SECONDS = 60.0
+ORDER_PAGE_CACHE_MAX_SCOPES = 2048
+
+
+@dataclass(frozen=True, slots=True)
+class KeysetPage:
+    items: list
+    page: int
+    page_size: int
+    total: int
+    total_pages: int
+
+    @property
+    def first_position(self) -> int:
+        """Sahifadagi birinchi elementning umumiy ro'yxatdagi tartib raqami (1 dan)."""
+        return (self.page - 1) * self.page_size + 1
+
+
+@dataclass(slots=True)
+class _ScopeState:
+    stored_at: float
+    total: int
+    # sahifa raqami -> shu sahifa birinchi qatorining saralash kaliti
+    anchors: dict[int, tuple] = field(default_factory=dict)
+
+
+_scopes: OrderedDict[Hashable, _ScopeState] = OrderedDict()
+
+
+def invalidate_order_pages() -> None:
+    _scopes.clear()
+
+
+def _get_scope(scope: Hashable) -> _ScopeState | None:
+    state = _scopes.get(scope)
+    if state is None:
+        return None
+    if monotonic() - state.stored_at > ORDER_PAGE_CACHE_TTL_SECONDS:
+        _scopes.pop(scope, None)
+        return None
+    _scopes.move_to_end(scope)
+    return state
+
+
+def _store_scope(scope: Hashable, state: _ScopeState) -> None:
+    _scopes[scope] = state
+    _scopes.move_to_end(scope)
+    while len(_scopes) > ORDER_PAGE_CACHE_MAX_SCOPES:
+        _scopes.popitem(last=False)
+
+
+def _page_count(total: int, page_size: int) -> int:
+    return max((total + page_size - 1) // page_size, 1)
+
+
+def _from_anchor(keys: ColumnElement, anchor: tuple, descending: bool):
+    # Python tuple bilan solishtirish: qiymatlar ustunlarning o'z turlari bilan bog'lanadi
+    return keys <= anchor if descending else keys >= anchor
+
+
+def _before_anchor(keys: ColumnElement, anchor: tuple, descending: bool):
+    return keys > anchor if descending else keys < anchor
+
+
+def _plan(page: int, page_size: int, total: int, total_pages: int, anchors: dict[int, tuple]):
+    """
+    Eng yaqin tayanch nuqtani tanlaydi: ro'yxat boshi, oxiri yoki ma'lum sahifa kaliti.
+    Qaytaradi: (yo'nalish, kalit yoki None, o'tkazib yuboriladigan qatorlar soni).
+    """
+    start = (page - 1) * page_size
+    end = min(page * page_size, total)
+    candidates = [("forward", None, start), ("backward", None, total - end)]
+    for anchor_page, anchor_key in anchors.items():
+        anchor_start = (anchor_page - 1) * page_size
+        if anchor_page <= page:
+            candidates.append(("forward", anchor_key, start - anchor_start))
+        elif anchor_page <= total_pages:
+            candidates.append(("backward", anchor_key, anchor_start - end))
+    return min(candidates, key=lambda candidate: candidate[2])
+
+
+async def fetch_keyset_page(
+    session,
+    query,
+    sort_keys: Sequence[ColumnElement],
+    *,
+    scope: Hashable,
+    page: int,
+    page_size: int,
+    descending: bool = False,
+) -> KeysetPage:
+    """
+    query — select(Model).where(...) (saralashsiz); sort_keys — yagona tartib beruvchi
+    ustunlar (oxirgisi odatda id). ±1/±5/±10 sahifa o'tishlari ma'lum kalitdan
+    boshlab o'qiladi, shuning uchun narx sahifa o'lchami va sakrash masofasiga bog'liq,
+    umumiy qatorlar soniga emas.
+    """
+    query = query.order_by(None)
+    state = _get_scope(scope)
+    if state is not None:
+        page_result = await _read_page(session, query, sort_keys, state, page, page_size, descending)
+        if page_result is not None:
+            return page_result
+        # Keshdagi son/kalitlar eskirgan (boshqa jarayonda qatorlar o'chirilgan):
+        # scope tashlanadi va bir marta qayta sanaladi
+        _scopes.pop(scope, None)
+
+    total = await session.scalar(select(func.count()).select_from(query.subquery()))
+    state = _ScopeState(stored_at=monotonic(), total=int(total or 0))
+    _store_scope(scope, state)
+    return await _read_page(
+        session, query, sort_keys, state, page, page_size, descending, allow_short=True
+    )
+
+
+async def _read_page(
+    session,
+    query,
+    sort_keys: Sequence[ColumnElement],
+    state: _ScopeState,
+    page: int,
+    page_size: int,
+    descending: bool,
+    *,
+    allow_short: bool = False,
+) -> KeysetPage | None:
+    """Sahifani state bo'yicha o'qiydi; allow_short=False bo'lsa kutilganidan kam qatorda None."""
+    total = state.total
+    total_pages = _page_count(total, page_size)
+    page = max(1, min(page, total_pages))
+    if total == 0:
+        if not allow_short:
+            return None
+        return KeysetPage(items=[], page=1, page_size=page_size, total=0, total_pages=1)
+
+    labeled_keys = [key.label(f"_keyset_{index}") for index, key in enumerate(sort_keys)]
+    keys = tuple_(*sort_keys)
+    direction, anchor, skip = _plan(page, page_size, total, total_pages, state.anchors)
+    limit = min(page * page_size, total) - (page - 1) * page_size
+
+    statement = query.add_columns(*labeled_keys)
+    if direction == "forward":
+        if anchor is not None:
+            statement = statement.where(_from_anchor(keys, anchor, descending))
+        ordering = [key.desc() if descending else key.asc() for key in sort_keys]
+        # +1: keyingi sahifaning birinchi kaliti ham ma'lum bo'ladi
+        statement = statement.order_by(*ordering).offset(skip).limit(limit + 1)
+    else:
+        if anchor is not None:
+            statement = statement.where(_before_anchor(keys, anchor, descending))
+        ordering = [key.asc() if descending else key.desc() for key in sort_keys]
+        statement = statement.order_by(*ordering).offset(skip).limit(limit)
+
+    rows = (await session.execute(statement)).all()
+    key_width = len(sort_keys)
+    if direction == "forward":
+        if len(rows) > limit:
+            state.anchors[page + 1] = tuple(rows[limit][-key_width:])
+        rows = rows[:limit]
+    else:
+        rows.reverse()
+
+    if len(rows) < limit and not allow_short:
+        return None
+
+    if rows:
+        state.anchors[page] = tuple(rows[0][-key_width:])
+    items = [row[0] for row in rows]
+    return KeysetPage(
+        items=items,
+        page=page,
+        page_size=page_size,
+        total=total,
+        total_pages=total_pages,
+    )
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from time import monotonic
+
+from sqlalchemy import select
+
+import config
+from sql.db import async_session
+from sql.models import Admins, Barbers, User
+
+# Foydalanuvchi rollari (admin/barber id'si, ro'yxatdan o'tgan) jarayon ichida
+# qisqa muddat saqlanadi. Admin/barber qo'shilganda yoki o'chirilganda
+# invalidate_user_roles() chaqiriladi; TTL esa boshqa jarayonlardagi yozuvlar
+# uchun zaxira. Admins/Barbers qatorlari keshlanmaydi: ular (is_paused, jadval,
+# profil) boshqa worker'da o'zgarishi mumkin, shuning uchun id bo'yicha bazadan
+# yangi o'qiladi.
+
+
+@dataclass(frozen=True, slots=True)
+class UserRoles:
+    tg_id: int
+    admin_id: int | None = None
+    barber_id: int | None = None
+    is_registered: bool = False
+
+    @property
+    def is_admin(self) -> bool:
+        return self.admin_id is not None
+
+    @property
+    def is_barber(self) -> bool:
+        return self.barber_id is not None
+
+
+class RoleCache:
+    def __init__(
+        self,
+        session_factory=async_session,
+        *,
+        ttl: float = config.ROLE_CACHE_TTL_SECONDS,
+        clock=monotonic,
+    ):
+        self._session_factory = session_factory
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: dict[int, tuple[float, UserRoles]] = {}
+        self._generation = 0
+        self._next_sweep = 0.0
+
+    async def _load(self, tg_id: int) -> UserRoles:
+        async with self._session_factory() as session:
+            admin_id = await session.scalar(select(Admins.id).where(Admins.tg_id == tg_id).limit(1))
+            barber_id = await session.scalar(select(Barbers.id).where(Barbers.tg_id == tg_id).limit(1))
+            user_id = await session.scalar(select(User.id).where(User.tg_id == tg_id))
+        return UserRoles(
+            tg_id=tg_id,
+            admin_id=admin_id,
+            barber_id=barber_id,
+            is_registered=user_id is not None,
+        )
+
+    def _evict_expired(self, now: float) -> None:
+        # Har TTL'da bir marta: qaytib kelmagan foydalanuvchilar yozuvlari to'planib qolmaydi
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self._ttl
+        expired = [tg_id for tg_id, (loaded_at, _) in self._entries.items() if now - loaded_at > self._ttl]
+        for tg_id in expired:
+            del self._entries[tg_id]
+
+    async def resolve(self, tg_id: int) -> UserRoles:
+        tg_id = int(tg_id)
+        entry = self._entries.get(tg_id)
+        if entry is not None and self._clock() - entry[0] <= self._ttl:
+            return entry[1]
+
+        generation = self._generation
+        roles = await self._load(tg_id)
+        # O'qish paytida invalidatsiya bo'lgan bo'lsa, eski natijani saqlamaymiz
+        if generation == self._generation:
+            now = self._clock()
+            self._evict_expired(now)
+            self._entries[tg_id] = (now, roles)
+        return roles
+
+    def invalidate(self, tg_id: int | None = None) -> None:
+        self._generation += 1
+        if tg_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(int(tg_id), None)
+
+
+role_cache = RoleCache()
+
+
+async def resolve_user_roles(tg_id: int) -> UserRoles:
+    return await role_cache.resolve(tg_id)
+
+
+def invalidate_user_roles(tg_id: int | None = None) -> None:
+    role_cache.invalidate(tg_id)
@@ -3,6 +3,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from sql.db import async_session
 from sql.db_barber_services import service_discount_expiry_worker
+from sql.db_catalog import bump_catalog_version
 from sql.models import Services
 
 
@@ -20,6 +21,7 @@ async def create_service(data: dict) -> Services | None:
             session.add(service)
             await session.commit()
             await session.refresh(service)
+            await bump_catalog_version()
             return service
         except SQLAlchemyError:
             await session.rollback()
@@ -85,6 +87,7 @@ async def update_service(service_id: int, updates: dict) -> Services | None:
 
             await session.commit()
             await session.refresh(service)
+            await bump_catalog_version()
             return service
         except SQLAlchemyError:
             await session.rollback()
@@ -99,6 +102,7 @@ async def delete_service(service_id: int) -> bool:
                 return False
             await session.delete(service)
             await session.commit()
+            await bump_catalog_version()
             return True
         except SQLAlchemyError:
             await session.rollback()
@@ -5,6 +5,10 @@ from sqlalchemy import delete, select
 from sqlalchemy.orm import selectinload
 
 from .db import async_session
+from .db_availability import invalidate_barber_day, is_slot_available_locked
+from .db_order_rollup import apply_order_stats_delta
+from .db_pagination import invalidate_order_pages
+from .db_barber_services import build_active_discount_condition
 from .models import (
     BarberServiceDiscounts,
     BarberServices,
@@ -17,6 +21,10 @@ from .models import (
 
 logger = logging.getLogger(__name__)
 
+# Joriy qoralama FSM ma'lumotlarida (umumiy FSM storage) turadi; temporary_orders'ga
+# shu oraliqda ko'pi bilan bir marta, shuningdek to'xtatish va yakunlashda yoziladi
+TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS = 5.0
+
 REQUIRED_TEMPORARY_ORDER_FIELDS = (
     "fullname",
     "phonenumber",
@@ -33,6 +41,18 @@ class TemporaryOrderNotFoundError(TemporaryOrderError):
     """Raised when a booking confirmation has no temporary order to finalize."""
 
 
+class SlotUnavailableError(TemporaryOrderError):
+    """Raised when the selected slot was taken by a concurrent booking."""
+
+    def __init__(self, barber_id: int, order_date: date, order_time: time):
+        self.barber_id = barber_id
+        self.order_date = order_date
+        self.order_time = order_time
+        super().__init__(
+            f"slot is not available: barber_id={barber_id} date={order_date} time={order_time}"
+        )
+
+
 class TemporaryOrderIncompleteError(TemporaryOrderError):
     def __init__(self, missing_fields: list[str]):
         self.missing_fields = tuple(missing_fields)
@@ -155,7 +175,8 @@ async def _resolve_barber_service(
 async def _current_price(session, barber_service: BarberServices) -> int:
     discount = await session.scalar(
         select(BarberServiceDiscounts.discounted_price).where(
-            BarberServiceDiscounts.barber_service_id == int(barber_service.id)
+            BarberServiceDiscounts.barber_service_id == int(barber_service.id),
+            build_active_discount_condition(),
         )
     )
     return int(discount if discount is not None else barber_service.price)
@@ -227,6 +248,36 @@ def is_temporary_order_complete(order: TemporaryOrder | None) -> bool:
     return not get_missing_temporary_order_fields(order)
 
 
+def temporary_order_from_draft(draft: dict) -> TemporaryOrder:
+    """
+    FSM ma'lumotlaridagi qoralamadan sessiyaga qo'shilmagan TemporaryOrder:
+    tekshirish va yakunlash bazadagi (kechikkan bo'lishi mumkin) yozuvni o'qimaydi.
+    """
+    barber_service_id = draft.get("barber_service_id")
+    return TemporaryOrder(
+        user_id=int(draft["user_id"]),
+        is_for_other=bool(draft.get("is_for_other")),
+        current_state=draft.get("current_state"),
+        selected_barber_locked=bool(draft.get("selected_barber_locked")),
+        fullname=draft.get("fullname"),
+        phonenumber=draft.get("phonenumber"),
+        service_id=draft.get("service_id"),
+        barber_id=draft.get("barber_id"),
+        barber_service_id=int(barber_service_id) if barber_service_id is not None else None,
+        service_name=draft.get("service_name"),
+        barber_name=draft.get("barber_name"),
+        booked_price=draft.get("booked_price"),
+        booked_duration_minutes=draft.get("booked_duration_minutes"),
+        date=_parse_date(draft.get("date")),
+        time=_parse_time(draft.get("time")),
+    )
+
+
+def is_temporary_order_flush_due(last_flushed_at: float | None, now: float) -> bool:
+    """Qoralama temporary_orders'ga TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS da ko'pi bilan bir marta yoziladi."""
+    return last_flushed_at is None or now - float(last_flushed_at) >= TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS
+
+
 async def get_temporary_order(user_id: int) -> TemporaryOrder | None:
     try:
         normalized_user_id = int(user_id)
@@ -357,7 +408,12 @@ async def delete_temporary_order(user_id: int) -> bool:
             raise
 
 
-async def finalize_temporary_order(user_id: int) -> Order:
+async def finalize_temporary_order(user_id: int, draft: dict | None = None) -> Order:
+    """
+    draft — FSM ma'lumotlaridagi joriy qoralama (temporary_order_from_draft bilan bir xil kalitlar).
+    Berilmasa (masalan, to'xtatilgan booking davom ettirilganda) temporary_orders yozuvi o'qiladi.
+    Ikkala holatda ham foydalanuvchining temporary_orders yozuvi shu tranzaksiyada o'chiriladi.
+    """
     try:
         normalized_user_id = int(user_id)
     except (TypeError, ValueError) as exc:
@@ -367,13 +423,16 @@ async def finalize_temporary_order(user_id: int) -> Order:
         commit_failed = False
         try:
             logger.info("Finalizing temporary order for user_id=%s", normalized_user_id)
-            result = await session.execute(
-                select(TemporaryOrder)
-                .where(TemporaryOrder.user_id == normalized_user_id)
-                .order_by(TemporaryOrder.id.desc())
-                .with_for_update()
-            )
-            temp_order = result.scalars().first()
+            if draft is not None:
+                temp_order = temporary_order_from_draft({**draft, "user_id": normalized_user_id})
+            else:
+                result = await session.execute(
+                    select(TemporaryOrder)
+                    .where(TemporaryOrder.user_id == normalized_user_id)
+                    .order_by(TemporaryOrder.id.desc())
+                    .with_for_update()
+                )
+                temp_order = result.scalars().first()
             if temp_order is None:
                 logger.error(
                     "Temporary order not found during finalization for user_id=%s",
@@ -401,6 +460,27 @@ async def finalize_temporary_order(user_id: int) -> Order:
 
             await _apply_barber_service_snapshot(session, temp_order, barber_service)
 
+            slot_available = await is_slot_available_locked(
+                session,
+                barber_id=int(barber_service.barber_id),
+                service_id=int(barber_service.service_id),
+                target_date=temp_order.date,
+                target_time=temp_order.time,
+            )
+            if not slot_available:
+                logger.info(
+                    "Slot is no longer available for user_id=%s barber_id=%s date=%s time=%s",
+                    normalized_user_id,
+                    barber_service.barber_id,
+                    temp_order.date,
+                    temp_order.time,
+                )
+                raise SlotUnavailableError(
+                    int(barber_service.barber_id),
+                    temp_order.date,
+                    temp_order.time,
+                )
+
             now = datetime.now()
             snapshot = _order_snapshot_from_temporary_order(temp_order, barber_service)
             new_order = Order(
@@ -415,6 +495,7 @@ async def finalize_temporary_order(user_id: int) -> Order:
             )
             session.add(new_order)
             await session.flush()
+            await apply_order_stats_delta(session, [new_order], sign=1)
 
             await session.execute(
                 delete(TemporaryOrder).where(TemporaryOrder.user_id == normalized_user_id)
@@ -431,12 +512,17 @@ async def finalize_temporary_order(user_id: int) -> Order:
                 )
                 raise
 
+            invalidate_barber_day(new_order.barber_id, new_order.date)
+            invalidate_order_pages()
             logger.info(
                 "Temporary order finalized for user_id=%s order_id=%s",
                 normalized_user_id,
                 new_order.id,
             )
             return new_order
+        except SlotUnavailableError:
+            await session.rollback()
+            raise
         except Exception:
             if not commit_failed:
                 await session.rollback()
@@ -4,6 +4,7 @@ from typing import Optional, Dict
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .db import async_session
+from .db_roles import invalidate_user_roles
 from .models import User
 
 logger = logging.getLogger(__name__)
@@ -49,6 +50,7 @@ async def save_user(data: Dict) -> Optional[User]:
             session.add(new_user)
             await session.commit()
             await session.refresh(new_user)
+            invalidate_user_roles(tg_id)
             return new_user
 
         except Exception as e:
@@ -1,6 +1,7 @@
 # sql/models.py
 from sqlalchemy import (
     Column,
+    Computed,
     Integer,
     BigInteger,
     String,
@@ -11,14 +12,41 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Numeric,
+    SmallInteger,
+    Text,
     UniqueConstraint,
 )
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column, text
+from sqlalchemy.sql.functions import FunctionElement
 from sql.db import Base
 
 
+class digits_only(FunctionElement):
+    """Matndan faqat raqamlarni qoldiradi (generated ustunlar uchun)."""
+
+    type = String()
+    name = "digits_only"
+    inherit_cache = True
+
+
+@compiles(digits_only, "postgresql")
+def _digits_only_postgresql(element, compiler, **kw):
+    return f"regexp_replace({compiler.process(element.clauses, **kw)}, '[^0-9]', '', 'g')"
+
+
+@compiles(digits_only)
+def _digits_only_default(element, compiler, **kw):
+    # regexp_replace'siz bazalar (SQLite testlari): telefondagi odatiy belgilar olib tashlanadi
+    expression = compiler.process(element.clauses, **kw)
+    for char in "+ -().":
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
 #Vaqtinchalik foydalanuvchi
 class OrdinaryUser(Base):
     __tablename__ = "ordinary_users"
@@ -46,22 +74,56 @@ class User(Base):
 #Buyurtmalar
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Bo'sh slotlar, bugungi navbatlar, pause_today: (barber, kun) bo'yicha vaqt tartibida
+        Index(
+            "ix_orders_barber_date_time",
+            "barber_id",
+            "date",
+            "time",
+            postgresql_include=["booked_duration_minutes"],
+        ),
+        # Mijoz navbatlari: user_id + date >= bugun, (date, time, id) tartibida
+        Index("ix_orders_user_date_time_id", "user_id", "date", "time", "id"),
+        # Mijoz navbatlarida telefon bo'yicha qidiruv: user_id = ? AND LIKE '%raqamlar%'
+        # (btree_gin: user_id ham shu GIN indeksda, trigram qismi bilan birga)
+        Index(
+            "ix_orders_phone_digits_trgm",
+            "user_id",
+            "phone_digits",
+            postgresql_using="gin",
+            postgresql_ops={"phone_digits": "gin_trgm_ops"},
+            info={"postgresql_extensions": ("btree_gin", "pg_trgm")},
+        ),
+        # Hafta kuni bo'yicha qidiruv: so'rovdagi EXTRACT(dow FROM date) bilan bir xil ifoda
+        Index(
+            "ix_orders_user_weekday",
+            "user_id",
+            text("EXTRACT(dow FROM date)"),
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(BigInteger, nullable=False, index=True)
+    # Alohida indeks yo'q: ix_orders_user_date_time_id user_id bilan boshlanadi
+    user_id = Column(BigInteger, nullable=False)
     fullname = Column(String(100), nullable=False)
     phonenumber = Column(String(30), nullable=False)
+    # Faqat raqamlar (db_order_queries.phone_digits bilan bir xil); baza o'zi hisoblaydi
+    phone_digits = Column(
+        String(30),
+        Computed(digits_only(literal_column("phonenumber")), persisted=True),
+    )
     barber_service_id = Column(
         Integer,
         ForeignKey("barber_services.id", ondelete="SET NULL"),
         nullable=True,
         index=True,
     )
+    # Alohida indeks yo'q: ix_orders_barber_date_time barber_id bilan boshlanadi (FK uchun ham yetarli)
     barber_id = Column(
         BigInteger,
         ForeignKey("barbers.id", ondelete="SET NULL"),
         nullable=True,
-        index=True,
     )
     service_id = Column(
         BigInteger,
@@ -74,9 +136,10 @@ class Order(Base):
     barber_name = Column(String(150), nullable=False)
     booked_price = Column(Integer, nullable=False)
     booked_duration_minutes = Column(Integer, nullable=False)
-    date = Column(Date, nullable=False)
+    # Bugungi delta (daily_order_stats ustiga) shu indekslar orqali o'qiladi
+    date = Column(Date, nullable=False, index=True)
     time = Column(Time, nullable=False)
-    booked_date = Column(Date, nullable=False)
+    booked_date = Column(Date, nullable=False, index=True)
     booked_time = Column(Time, nullable=False)
 
     barber_service = relationship("BarberServices", back_populates="orders")
@@ -150,6 +213,13 @@ class Barbers(Base):
     is_paused = Column(Boolean, default=False)
     breakdown = Column(String(20), nullable=True)     # "13:00-14:00" yoki None
     is_paused_date = Column(Date, nullable=True)
+    # Yuqoridagi matnli jadvalning kompilyatsiyasi (sql.db_availability.compile_schedule):
+    # hafta kunlari bitmaskasi (bit 0 — dushanba) va kun boshidan daqiqalar
+    work_days_mask = Column(SmallInteger, nullable=True)
+    work_start_minute = Column(SmallInteger, nullable=True)
+    work_end_minute = Column(SmallInteger, nullable=True)
+    break_start_minute = Column(SmallInteger, nullable=True)
+    break_end_minute = Column(SmallInteger, nullable=True)
 
     barber_services = relationship(
         "BarberServices",
@@ -253,6 +323,15 @@ class BarberServiceDiscounts(Base):
     barber_service = relationship("BarberServices", back_populates="discounts")
 
 
+# Katalog (xizmatlar, barberlar, narxlar) versiyasi: bitta qator, admin yozuvlaridan
+# keyin oshiriladi — barcha worker'lar keshini shu qator bo'yicha yangilaydi
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
 #Xizmatlar Profili
 # class ServiceProfileSettings(Base):
 #     __tablename__ = "service_profile_settings"
@@ -317,6 +396,23 @@ class InfoProfileSettings(Base):
 
 class BarberOrderInbox(Base):
     __tablename__ = "barber_order_inbox"
+    __table_args__ = (
+        # Bitta buyurtma barberga bir marta: yozish INSERT ... ON CONFLICT bilan.
+        # Eski bazadagi takrorlar constraint qo'shilishidan oldin o'chiriladi
+        UniqueConstraint(
+            "order_id",
+            "barber_tg_id",
+            name="uq_barber_order_inbox_order_barber",
+            info={"dedupe_before_create": True},
+        ),
+        # Faqat yetkazilmaganlar: yetkazilgan qatorlar indeksni kattalashtirmaydi
+        Index(
+            "ix_barber_order_inbox_undelivered",
+            "barber_tg_id",
+            "id",
+            postgresql_where=text("is_delivered = false"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -331,15 +427,28 @@ class BarberOrderInbox(Base):
     # Barber telegram id (Barbers.tg_id)
     barber_tg_id = Column(BigInteger, nullable=False, index=True)
 
-    # Barberga telegramda yuborildimi?
+    # Barberga telegramda yuborildimi? (faqat xabar muvaffaqiyatli ketgandan keyin True)
     is_delivered = Column(Boolean, default=False)
 
+    # Yuborish uchun olingan: kim oldi va qachongacha. Worker yuborishdan oldin o'lib qolsa,
+    # muddat tugagach qator boshqa worker tomonidan qayta olinadi
+    claimed_by = Column(String(64), nullable=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+
     # Barber ko�rdimi? (detail bosdi yoki yopdi)
     is_seen = Column(Boolean, default=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+#Barber paneli faolligi: barcha worker'lar uchun umumiy (panel_presence.py)
+class BarberPresence(Base):
+    __tablename__ = "barber_presence"
+
+    # Har bir barber uchun bitta qator: jadval barberlar sonidan oshmaydi
+    barber_tg_id = Column(BigInteger, primary_key=True)
+    last_seen = Column(DateTime(timezone=True), nullable=False)
+
 
 class BarberProfileSettings(Base):
     __tablename__ = "barber_profile_settings"
@@ -359,3 +468,106 @@ class StartVdOrImg(Base):
     vd_file_id = Column(String(300), nullable=True)
     img_file_id = Column(String(300), nullable=True)
     
+
+
+#FSM holatlari (bir nechta worker uchun umumiy saqlash)
+class FsmStorageRecord(Base):
+    __tablename__ = "fsm_storage"
+
+    key = Column(String(255), primary_key=True)
+    state = Column(String(255), nullable=True)
+    data = Column(JSON, nullable=False, default=dict)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+
+# Bitta FSM kaliti update'lari uchun jarayonlararo lock (muddatli ijara)
+class FsmEventLock(Base):
+    __tablename__ = "fsm_event_locks"
+
+    key = Column(String(255), primary_key=True)
+    # Lock'ni olgan handler tokeni: faqat egasi bo'shata oladi
+    owner = Column(String(64), nullable=False)
+    # Shu vaqtdan keyin (egasi o'lib qolgan bo'lsa ham) lock boshqaga o'tadi
+    locked_until = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+#Ommaviy xabar yuborish vazifalari (qayta ishga tushishdan keyin davom etadi)
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sender_tg_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True)
+    # pending -> running -> done
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # Qabul qiluvchilar hali oqim bilan qo'shilmoqda: yuboruvchi navbat bo'shasa ham kutadi
+    is_collecting = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Joyida yangilanadigan progress xabari
+    progress_chat_id = Column(BigInteger, nullable=True)
+    progress_message_id = Column(Integer, nullable=True)
+    # Vazifani bajarayotgan jarayon va uning ijarasi (lease): muddati o'tsa boshqa worker oladi
+    owner = Column(String(64), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BroadcastRecipient(Base):
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        UniqueConstraint("job_id", "chat_id", name="uq_broadcast_recipients_job_chat"),
+        # Navbatdagilar id tartibida olinadi; yuborilganlar indeksdan chiqadi
+        Index(
+            "ix_broadcast_recipients_pending",
+            "job_id",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(
+        Integer,
+        ForeignKey("broadcast_jobs.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    chat_id = Column(BigInteger, nullable=False)
+    # pending -> sending (egasi olgan bo'lak) -> sent / failed
+    status = Column(String(20), nullable=False, default="pending")
+    error = Column(String(255), nullable=True)
+
+
+#Kunlik statistika (orders'dan yig'ma; buyurtma yozilganda/o'chirilganda yangilanadi)
+class DailyOrderStat(Base):
+    __tablename__ = "daily_order_stats"
+
+    # Navbat kuni (orders.date); barber/xizmat o'chirilgan bo'lsa 0
+    day = Column(Date, primary_key=True)
+    barber_id = Column(BigInteger, primary_key=True, default=0)
+    service_id = Column(BigInteger, primary_key=True, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(BigInteger, nullable=False, default=0)
+    minutes_booked = Column(BigInteger, nullable=False, default=0)
+
+
+#Mijoz bo'yicha buyurtmalar soni: unikal mijozlar orders'ni skanerlamasdan sanaladi
+class OrderUserStat(Base):
+    __tablename__ = "order_user_stats"
+
+    user_id = Column(BigInteger, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+
+
+#Sxema versiyasi: auto_migrate oxirgi marta qaysi model holati bilan ishlagani
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    # Bitta qator (id=1)
+    id = Column(Integer, primary_key=True)
+    # Base.metadata DDL'ining sha256 xeshi (utils/auto_migrate.metadata_fingerprint)
+    fingerprint = Column(String(64), nullable=False)
+    migrated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
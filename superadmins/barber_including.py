@@ -6,6 +6,7 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 from sqlalchemy import select
 
 from sql.db import async_session
+from sql.db_roles import resolve_user_roles
 from sql.db_barber_services import (
     create_barber_service,
     delete_barber_service,
@@ -16,12 +17,13 @@ from sql.db_barber_services import (
     normalize_money,
     update_barber_service,
 )
-from sql.models import Barbers, Services
+from sql.models import Services
 from utils.emoji_map import SERVICE_EMOJIS
 from utils.service_pricing import (
     build_service_price_lines,
     format_duration_minutes,
 )
+from .superadmin import get_barber_by_tg_id
 
 router = Router()
 
@@ -41,15 +43,7 @@ class BarberServiceStates(StatesGroup):
 
 
 async def is_barber(tg_id: int) -> bool:
-    async with async_session() as session:
-        result = await session.execute(select(Barbers.id).where(Barbers.tg_id == tg_id))
-        return result.scalar_one_or_none() is not None
-
-
-async def get_barber_by_tg_id(tg_id: int):
-    async with async_session() as session:
-        result = await session.execute(select(Barbers).where(Barbers.tg_id == tg_id))
-        return result.scalar_one_or_none()
+    return (await resolve_user_roles(tg_id)).is_barber
 
 
 async def _fetch_services() -> list[Services]:
@@ -8,6 +8,8 @@ from sqlalchemy import delete, update
 
 from handlers.barber_cards import get_barber_card_content
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_schedule, store_compiled_schedule
+from sql.db_catalog import bump_catalog_version
 from sql.db_barber_profile import (
     ALLOWED_HIDDEN_FIELDS,
     get_barber_hidden_fields,
@@ -278,8 +280,10 @@ async def _handle_field_update(barber: Barbers, field_key: str, raw_text: str) -
             .where(Barbers.id == barber.id)
             .values(**values)
         )
+        refreshed = await store_compiled_schedule(session, barber.id)
         await session.commit()
-        refreshed = await session.get(Barbers, barber.id)
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
     if field_key in ALLOWED_HIDDEN_FIELDS:
         await set_barber_field_visibility(barber.id, field_key, False)
@@ -405,6 +409,7 @@ async def save_new_profile_photo(message: types.Message, state: FSMContext):
         await session.execute(delete(BarberPhotos).where(BarberPhotos.barber_id == barber.id))
         session.add(BarberPhotos(barber_id=barber.id, photo=photo_file_id))
         await session.commit()
+    await bump_catalog_version()
 
     refreshed = await _refresh_barber(barber.id)
     await _show_profile_exact(
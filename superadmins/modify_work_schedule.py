@@ -4,6 +4,8 @@ from aiogram.filters import StateFilter
 from sqlalchemy import update
 
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_schedule, store_compiled_schedule
+from sql.db_catalog import bump_catalog_version
 from sql.models import Barbers
 from .superadmin import get_barber_by_tg_id
 from .superadmin_buttons import get_schedule_keyboard
@@ -259,8 +261,10 @@ async def save_break_time(message: types.Message, state: FSMContext):
             .where(Barbers.id == barber.id)
             .values(breakdown=new_value)
         )
+        refreshed = await store_compiled_schedule(session, barber.id)
         await session.commit()
-        refreshed = await session.get(Barbers, barber.id)
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
     await state.clear()
 
@@ -294,8 +298,10 @@ async def save_work_days(message: types.Message, state: FSMContext):
             .where(Barbers.id == barber.id)
             .values(work_days=work_days)
         )
+        refreshed = await store_compiled_schedule(session, barber.id)
         await session.commit()
-        refreshed = await session.get(Barbers, barber.id)
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
     await state.clear()
 
@@ -335,8 +341,10 @@ async def save_work_time(message: types.Message, state: FSMContext):
             .where(Barbers.id == barber.id)
             .values(work_time=new_value)
         )
+        refreshed = await store_compiled_schedule(session, barber.id)
         await session.commit()
-        refreshed = await session.get(Barbers, barber.id)
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
     await state.clear()
 
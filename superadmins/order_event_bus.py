@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from time import monotonic
+
+import asyncpg
+from aiogram import Bot
+
+import config
+from sql.db import engine
+from sql.db_barber_inbox import BARBER_INBOX_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[Bot, int], Awaitable[object]]
+
+
+class BarberInboxEventBus:
+    """
+    Yangi navbat e'lonlari (pg_notify, payload — barber tg_id) uchun LISTEN.
+
+    Har bir worker kanalni tinglaydi; e'lon kelganda barber bo'yicha flush_delay
+    davomida kutiladi va shu oraliqdagi barcha e'lonlar bitta deliver() chaqiruviga
+    yig'iladi. Qaysi worker yuborishini inbox qatorlarini atomar olish hal qiladi
+    (inbox_claim_undelivered). Qator faqat xabar ketgandan keyin yetkazilgan deb belgilanadi:
+    yuborgan worker belgilashdan oldin o'lib qolsa, muddat tugagach xabar qayta yuborilishi
+    mumkin (kamida bir marta yetkazish).
+
+    Oldingi flush'dan keyin window soniya ichida kelgan navbatlar oyna oxirida bitta
+    digest xabarga yig'iladi (Telegram'ning chat bo'yicha flood limitlari uchun).
+    Flush vaqti har bir worker'da e'lon vaqtidan hisoblanadi, shuning uchun oyna
+    worker'lar orasida ham deyarli bir xil.
+    """
+
+    def __init__(
+        self,
+        deliver: Deliver,
+        *,
+        flush_delay: float = config.BARBER_NOTIFY_FLUSH_DELAY_SECONDS,
+        window: float = config.BARBER_NOTIFY_DIGEST_WINDOW_SECONDS,
+        channel: str = BARBER_INBOX_CHANNEL,
+        reconnect_delay: float = 5.0,
+        clock: Callable[[], float] = monotonic,
+        sleep: Callable[[float], Awaitable[object]] = asyncio.sleep,
+    ):
+        self._deliver = deliver
+        self._flush_delay = flush_delay
+        self._window = window
+        self._clock = clock
+        self._sleep = sleep
+        self._channel = channel
+        self._reconnect_delay = reconnect_delay
+        # barber tg_id -> hali uxlayotgan flush; oyna ichidagi e'lonlar shunga qo'shiladi
+        self._pending: dict[int, asyncio.Task] = {}
+        # barber tg_id -> oxirgi flush vaqti (faqat oyna ichidagilar saqlanadi)
+        self._last_flush: dict[int, float] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._bot: Bot | None = None
+        self._listener_task: asyncio.Task | None = None
+        self._listening = False
+
+    @property
+    def is_listening(self) -> bool:
+        return self._listening
+
+    def _flush_delay_for(self, barber_tg_id: int) -> float:
+        now = self._clock()
+        for tg_id, flushed_at in list(self._last_flush.items()):
+            if now - flushed_at >= self._window:
+                del self._last_flush[tg_id]
+
+        flushed_at = self._last_flush.get(barber_tg_id)
+        if flushed_at is None:
+            return self._flush_delay
+        return max(self._flush_delay, flushed_at + self._window - now)
+
+    def schedule(self, bot: Bot, barber_tg_id: int) -> None:
+        barber_tg_id = int(barber_tg_id)
+        if barber_tg_id in self._pending:
+            return
+        task = asyncio.create_task(
+            self._flush_later(bot, barber_tg_id, self._flush_delay_for(barber_tg_id))
+        )
+        self._pending[barber_tg_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, bot: Bot, barber_tg_id: int, delay: float) -> None:
+        try:
+            await self._sleep(delay)
+        finally:
+            # Yuborish paytida kelgan e'lonlar keyingi (oyna oxiridagi) flush'ga tushadi
+            self._pending.pop(barber_tg_id, None)
+        self._last_flush[barber_tg_id] = self._clock()
+        try:
+            await self._deliver(bot, barber_tg_id)
+        except Exception:
+            logger.exception("Barber inbox flush failed for barber_tg_id=%s", barber_tg_id)
+
+    def _on_notification(self, _connection, _pid, _channel, payload: str) -> None:
+        try:
+            barber_tg_id = int(payload)
+        except (TypeError, ValueError):
+            logger.warning("Barber inbox event ignored: payload=%r", payload)
+            return
+        if self._bot is not None:
+            self.schedule(self._bot, barber_tg_id)
+
+    def start(self, bot: Bot, engine_=engine) -> bool:
+        """Faqat Postgres'da tinglaydi; boshqa bazada e'lonlar shu jarayonda schedule() bilan ishlanadi."""
+        if engine_.dialect.name != "postgresql" or self._listener_task is not None:
+            return False
+        self._bot = bot
+        self._listener_task = asyncio.create_task(self._listen(engine_))
+        return True
+
+    @staticmethod
+    def _listen_dsn(engine_) -> str:
+        # "postgresql+asyncpg://..." -> asyncpg tushunadigan "postgresql://..."
+        return engine_.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def _listen(self, engine_) -> None:
+        # LISTEN uchun pool'dan tashqari alohida ulanish: pool ulanishi uzoq band qilinmaydi
+        # va pool qayta ishlatganda (reset/recycle) tinglovchi jimgina yo'qolmaydi
+        dsn = self._listen_dsn(engine_)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(self._channel, self._on_notification)
+                self._listening = True
+                logger.info("Listening for %s events", self._channel)
+                while not connection.is_closed():
+                    await asyncio.sleep(self._reconnect_delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s listener failed, reconnecting", self._channel)
+            finally:
+                self._listening = False
+                if connection is not None and not connection.is_closed():
+                    with suppress(Exception):
+                        await asyncio.shield(connection.close(timeout=self._reconnect_delay))
+            # Uzilish paytidagi e'lonlar inbox'da qoladi va /barber da yoki keyingi e'londa yuboriladi
+            await asyncio.sleep(self._reconnect_delay)
+
+    async def stop(self) -> None:
+        # Bekor qilingan flush'lardagi navbatlar inbox'da qoladi: deliver_barber_inbox
+        # olib qo'ygan qatorlarni bekor qilinganda ham qaytaradi
+        tasks = list(self._tasks)
+        if self._listener_task is not None:
+            tasks.append(self._listener_task)
+            self._listener_task = None
+        self._pending.clear()
+        self._last_flush.clear()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._bot = None
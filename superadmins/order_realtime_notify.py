@@ -1,10 +1,17 @@
+import asyncio
 import logging
+import uuid
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from sql.db import async_session
-from sql.models import Barbers, Order, Services
-from sql.db_barber_inbox import inbox_add, inbox_get_undelivered, inbox_mark_delivered
-from .panel_presence import is_barber_active
+from sql.models import Order
+from sql.db_barber_inbox import (
+    ClaimedInboxRow,
+    inbox_claim_undelivered,
+    inbox_mark_delivered,
+    inbox_upsert_for_order,
+)
+from .order_event_bus import BarberInboxEventBus
+from .panel_presence import presence_cutoff
 
 logger = logging.getLogger(__name__)
 
@@ -34,107 +41,115 @@ def _batch_notify_text(total: int) -> str:
     )
 
 
-async def _service_name(session, service_id_raw: str) -> str:
-    if not service_id_raw:
-        return "Noma'lum"
-    try:
-        sid = int(service_id_raw)
-        service = await session.get(Services, sid)
-        if service:
-            return service.name
-    except Exception:
-        pass
-    return str(service_id_raw)
-
-
-async def _get_barber_tg_id(barber_db_id: int) -> int | None:
-    async with async_session() as session:
-        try:
-            barber = await session.get(Barbers, int(barber_db_id))
-            if barber and getattr(barber, "tg_id", None):
-                return int(barber.tg_id)
-            return None
-        except Exception:
-            logger.exception("_get_barber_tg_id failed")
-            return None
-
-
-async def _build_short_text(order_id: int) -> str:
-    async with async_session() as session:
-        order = await session.get(Order, int(order_id))
-        if not order:
-            return "⚠️ Buyurtma topilmadi."
-        service_name = order.service_name or "Noma'lum"
-
-        # Qisqa preview uchun username fallback
-        username = "—"
-
-        return (
-            "🆕 <b>Yangi navbat!</b>\n\n"
-            f"👤 <b>Mijoz:</b> {order.fullname}\n"
-            f"💈 <b>Xizmat:</b> {service_name}\n"
-            f"📅 <b>Sana:</b> {order.date}\n"
-            f"🕒 <b>Vaqt:</b> {order.time}\n"
-            f"🧾 <b>Order ID:</b> {order.id}\n"
-            f"👤 <b>Username:</b> {username}"
-        )
-
+def _build_short_text(row: ClaimedInboxRow) -> str:
+    service_name = row.service_name or "Noma'lum"
 
-async def notify_barber_realtime(bot: Bot, order_id: int, barber_db_id: int) -> None:
-    barber_tg_id = await _get_barber_tg_id(barber_db_id)
-    if not barber_tg_id:
-        logger.warning("notify_barber_realtime: barber tg_id topilmadi, barber_db_id=%s", barber_db_id)
-        return
-
-    inbox_row = await inbox_add(order_id=int(order_id), barber_tg_id=int(barber_tg_id))
-    if not inbox_row:
-        return
-    if getattr(inbox_row, "is_delivered", False):
-        return
+    # Qisqa preview uchun username fallback
+    username = "—"
 
-    if is_barber_active(barber_tg_id):
-        try:
-            text = await _build_short_text(order_id)
-            await bot.send_message(
-                chat_id=barber_tg_id,
-                text=text,
-                parse_mode="HTML",
-                reply_markup=_notify_keyboard(order_id),
-                disable_web_page_preview=True
-            )
-            await inbox_mark_delivered(inbox_row.id)
-        except Exception:
-            logger.exception("notify_barber_realtime send_message failed")
-            # yuborilmasa inboxda qoladi
+    return (
+        "🆕 <b>Yangi navbat!</b>\n\n"
+        f"👤 <b>Mijoz:</b> {row.fullname}\n"
+        f"💈 <b>Xizmat:</b> {service_name}\n"
+        f"📅 <b>Sana:</b> {row.order_date}\n"
+        f"🕒 <b>Vaqt:</b> {row.order_time}\n"
+        f"🧾 <b>Order ID:</b> {row.order_id}\n"
+        f"👤 <b>Username:</b> {username}"
+    )
 
 
-async def flush_undelivered_to_barber(bot: Bot, barber_tg_id: int) -> None:
-    rows = await inbox_get_undelivered(int(barber_tg_id))
+async def deliver_barber_inbox(bot: Bot, barber_tg_id: int, *, require_presence: bool = True) -> int:
+    """
+    Barberning yetkazilmagan navbatlarini atomar (muddatli) oladi va bitta xabar yuboradi:
+    bitta navbat bo'lsa — qisqa ma'lumot, bir nechta bo'lsa — umumiy son.
+    require_presence=True bo'lsa, barber panelda faol bo'lmaganda inbox'da qoladi.
+    Qatorlar faqat xabar ketgandan keyin yetkazilgan deb belgilanadi; yuborilmasa inbox'ga
+    qaytariladi, worker o'lib qolsa muddat tugagach qayta olinadi.
+    Qaytaradi: xabardagi navbatlar soni.
+    """
+    active_since = presence_cutoff() if require_presence else None
+    claim_token = uuid.uuid4().hex
+    claim = asyncio.ensure_future(
+        inbox_claim_undelivered(int(barber_tg_id), claimed_by=claim_token, active_since=active_since)
+    )
+    try:
+        rows = await asyncio.shield(claim)
+    except asyncio.CancelledError:
+        # Bekor qilish claim commit bo'lgandan keyin kelgan bo'lishi mumkin:
+        # olingan qatorlar inbox'ga qaytariladi
+        rows = await claim
+        await _release_claimed(rows, claim_token)
+        raise
     if not rows:
-        return
+        return 0
 
-    unique_order_ids = []
+    unique_rows = []
     seen_order_ids = set()
     for row in rows:
-        order_id = int(row.order_id)
-        if order_id in seen_order_ids:
+        if row.order_id in seen_order_ids:
             continue
-        seen_order_ids.add(order_id)
-        unique_order_ids.append(order_id)
+        seen_order_ids.add(row.order_id)
+        unique_rows.append(row)
 
-    if not unique_order_ids:
-        return
+    if len(unique_rows) == 1:
+        text = _build_short_text(unique_rows[0])
+    else:
+        text = _batch_notify_text(len(unique_rows))
 
-    anchor_order_id = unique_order_ids[0]
     try:
         await bot.send_message(
             chat_id=barber_tg_id,
-            text=_batch_notify_text(len(unique_order_ids)),
+            text=text,
             parse_mode="HTML",
-            reply_markup=_notify_keyboard(anchor_order_id),
+            reply_markup=_notify_keyboard(unique_rows[0].order_id),
             disable_web_page_preview=True
         )
-        for row in rows:
-            await inbox_mark_delivered(row.id)
+    except asyncio.CancelledError:
+        # stop() (deploy) paytida: xabar yuborilmagan deb hisoblanadi
+        await _release_claimed(rows, claim_token)
+        raise
     except Exception:
-        logger.exception("flush_undelivered_to_barber failed for barber_tg_id=%s", barber_tg_id)
+        logger.exception("Barber inbox delivery failed for barber_tg_id=%s", barber_tg_id)
+        # yuborilmasa inboxda qoladi
+        await _release_claimed(rows, claim_token)
+        return 0
+
+    # Xabar ketdi: endi yetkazilgan. Belgilash bekor qilinmasligi kerak, aks holda
+    # muddat tugagach xabar qayta yuboriladi
+    await asyncio.shield(inbox_mark_delivered([row.id for row in rows], claimed_by=claim_token))
+    return len(unique_rows)
+
+
+async def _release_claimed(rows, claim_token: str) -> None:
+    ids = [row.id for row in rows]
+    if ids:
+        # Qaytarish o'zi bekor qilinmasligi kerak
+        await asyncio.shield(inbox_mark_delivered(ids, delivered=False, claimed_by=claim_token))
+
+
+barber_event_bus = BarberInboxEventBus(deliver_barber_inbox)
+
+
+async def notify_barber_realtime(bot: Bot, order: Order) -> None:
+    """
+    order — finalize_temporary_order qaytargan (yuklangan) buyurtma; qayta o'qilmaydi.
+    Inbox yozuvi, barber tg_id va Postgres'da pg_notify bitta so'rovda. Xabarni e'lonni
+    olgan worker'lardan biri yuboradi; tinglovchi bo'lmasa — shu jarayonning o'zi.
+    """
+    if order.barber_id is None:
+        return
+
+    inbox_row = await inbox_upsert_for_order(order_id=int(order.id), barber_id=int(order.barber_id))
+    if not inbox_row:
+        logger.warning("notify_barber_realtime: barber tg_id topilmadi, barber_db_id=%s", order.barber_id)
+        return
+    if inbox_row.is_delivered:
+        return
+
+    if not (inbox_row.published and barber_event_bus.is_listening):
+        barber_event_bus.schedule(bot, inbox_row.barber_tg_id)
+
+
+async def flush_undelivered_to_barber(bot: Bot, barber_tg_id: int) -> None:
+    # Barber panelni hozir ochdi: faollik tekshirilmaydi
+    await deliver_barber_inbox(bot, barber_tg_id, require_presence=False)
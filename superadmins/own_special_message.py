@@ -2,9 +2,9 @@
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select
-from sql.db import async_session
-from sql.models import Order
+from sql.db_broadcast import create_broadcast_job
+from sql.db_order_queries import count_barber_clients, get_barber_client_ids
+from utils.broadcast import broadcast_engine
 from .superadmin import get_barber_by_tg_id
 from utils.states import BarberPage
 
@@ -19,13 +19,7 @@ async def start_special_message(message: types.Message, state: FSMContext):
     if not barber:
         return await message.answer("❌ Siz barber sifatida topilmadingiz.")
 
-    barber_key = str(barber.id)
-
-    async with async_session() as session:
-        result = await session.execute(
-            select(Order.user_id).where(Order.barber_id == barber_key).distinct()
-        )
-        client_ids = result.scalars().all()
+    clients_count = await count_barber_clients(barber.id)
 
     await state.set_state(BarberPage.waiting_for_message)
 
@@ -33,7 +27,7 @@ async def start_special_message(message: types.Message, state: FSMContext):
         f"✏️ <b>Maxsus xabar yuborish</b>\n\n"
         f"Iltimos, yubormoqchi bo'lgan xabaringizni kiriting.\n"
         f"U barcha mijozlaringizga yuboriladi.\n\n"
-        f"👥 Mijozlar soni: <b>{len(client_ids)}</b>\n\n"
+        f"👥 Mijozlar soni: <b>{clients_count}</b>\n\n"
         f"❌ Bekor qilish: /cancel",
         parse_mode="HTML"
     )
@@ -56,54 +50,27 @@ async def send_special_message(message: types.Message, state: FSMContext):
     if len(text) < 10:
         return await message.answer("❌ Xabar juda qisqa. Kamida 10 ta belgi kiriting.")
 
-    barber_key = str(barber.id)
-
-    async with async_session() as session:
-        result = await session.execute(
-            select(Order.user_id).where(Order.barber_id == barber_key).distinct()
-        )
-        client_ids = result.scalars().all()
+    client_ids = await get_barber_client_ids(barber.id)
 
     if not client_ids:
         await state.clear()
         return await message.answer("❌ Sizda hali mijozlar yo'q.")
 
     status_msg = await message.answer("📨 Xabarlar yuborilmoqda...")
-
-    sent = 0
-    failed = 0
-
-    for client_id in client_ids:
-        try:
-            await message.bot.send_message(
-                chat_id=client_id,
-                text=(
-                    f"📣 <b>{barber.barber_first_name} ustadan xabar</b>\n\n"
-                    f"{text}\n\n"
-                    f"--------------------\n"
-                    f"<i>Bu maxsus xabar sizning ustangiz tomonidan yuborildi.</i>"
-                ),
-                parse_mode="HTML"
-            )
-            sent += 1
-        except Exception:
-            failed += 1
-
-    try:
-        await status_msg.delete()
-    except Exception:
-        pass
-
-    await state.clear()
-
-    result_text = (
-        f"✅ <b>Xabar yuborildi</b>\n\n"
-        f"📨 Yuborilgan xabar:\n"
-        f"<code>{text[:100]}{'...' if len(text) > 100 else ''}</code>\n\n"
-        f"--------------------\n"
-        f"✅ Muvaffaqiyatli: <b>{sent}</b>\n"
-        f"❌ Xato: <b>{failed}</b>\n"
-        f"👥 Jami: <b>{len(client_ids)}</b>"
+    job = await create_broadcast_job(
+        sender_tg_id=tg_id,
+        text=(
+            f"📣 <b>{barber.barber_first_name} ustadan xabar</b>\n\n"
+            f"{text}\n\n"
+            f"--------------------\n"
+            f"<i>Bu maxsus xabar sizning ustangiz tomonidan yuborildi.</i>"
+        ),
+        parse_mode="HTML",
+        chat_ids=client_ids,
+        progress_chat_id=status_msg.chat.id,
+        progress_message_id=status_msg.message_id,
     )
+    await state.clear()
 
-    await message.answer(result_text, parse_mode="HTML")
+    # Yuborish fonda: natija (yuborildi/xato/jami) shu status xabarida yangilanadi
+    broadcast_engine.start(message.bot, job.id)
@@ -1,11 +1,13 @@
-from datetime import date, timedelta
+from datetime import date
 
 from aiogram import F, Router, types
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy import and_, func, select
 
 from sql.db import async_session
+from sql.db_order_queries import barber_orders_query
+from sql.db_order_stats import get_barber_order_stats
+from sql.db_pagination import KeysetPage, fetch_keyset_page
 from sql.models import Order, Services
 
 from .superadmin import get_barber_by_tg_id
@@ -124,27 +126,16 @@ def _build_pagination_rows(page: int, total_pages: int):
     return rows
 
 
-def _build_orders_text(
-    orders,
-    service_map,
-    barber_name: str,
-    page: int,
-    total_pages: int,
-    page_size: int,
-):
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_orders = orders[start:end]
-
+def _build_orders_text(order_page: KeysetPage, service_map, barber_name: str):
     lines = [
         "📂 <b>Barcha buyurtmalar</b>",
         f"👤 <b>Barber:</b> {barber_name}",
-        f"📦 <b>Jami:</b> {len(orders)}",
-        f"📄 <b>Sahifa:</b> {page}/{total_pages}",
+        f"📦 <b>Jami:</b> {order_page.total}",
+        f"📄 <b>Sahifa:</b> {order_page.page}/{order_page.total_pages}",
         "━━━━━━━━━━━━━━━━━━",
     ]
 
-    for idx, order in enumerate(page_orders, start=start + 1):
+    for idx, order in enumerate(order_page.items, start=order_page.first_position):
         service_name, price, duration = service_map.get(
             order.service_id, ("Noma'lum", None, None)
         )
@@ -213,57 +204,23 @@ def _parse_orders_page(data: str) -> int | None:
 
 
 async def _render_barber_statistics_text(barber):
-    barber_key = str(barber.id)
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-
-    async with async_session() as session:
-        total_orders = await session.scalar(
-            select(func.count(Order.id)).where(Order.barber_id == barber_key)
-        )
-
-        today_orders = await session.scalar(
-            select(func.count(Order.id)).where(and_(Order.barber_id == barber_key, Order.date == today))
-        )
-
-        pending_orders = await session.scalar(
-            select(func.count(Order.id)).where(and_(Order.barber_id == barber_key, Order.date >= today))
-        )
-
-        finished_orders = await session.scalar(
-            select(func.count(Order.id)).where(and_(Order.barber_id == barber_key, Order.date < today))
-        )
-
-        week_orders = await session.scalar(
-            select(func.count(Order.id)).where(
-                and_(Order.barber_id == barber_key, Order.date >= week_ago, Order.date <= today)
-            )
-        )
-
-        month_orders = await session.scalar(
-            select(func.count(Order.id)).where(
-                and_(Order.barber_id == barber_key, Order.date >= month_ago, Order.date <= today)
-            )
-        )
-
-        unique_clients = await session.scalar(
-            select(func.count(func.distinct(Order.user_id))).where(Order.barber_id == barber_key)
-        )
+    stats = await get_barber_order_stats(barber.id)
+    top_service = stats.top_service_name or "Mavjud emas"
 
     return (
         f"📊 <b>Shaxsiy statistika</b>\n"
         f"👤 <b>Barber:</b> {barber.barber_first_name}\n\n"
         f"--------------------\n"
         f"<b>📈 Umumiy ko'rsatkichlar</b>\n"
-        f"📦 Jami buyurtmalar: <b>{total_orders or 0}</b>\n"
-        f"✅ Yakunlangan: <b>{finished_orders or 0}</b>\n"
-        f"⏳ Kutilayotgan: <b>{pending_orders or 0}</b>\n"
-        f"👥 Unikal mijozlar: <b>{unique_clients or 0}</b>\n\n"
+        f"📦 Jami buyurtmalar: <b>{stats.total}</b>\n"
+        f"✅ Yakunlangan: <b>{stats.past_days}</b>\n"
+        f"⏳ Kutilayotgan: <b>{stats.pending_days}</b>\n"
+        f"👥 Unikal mijozlar: <b>{stats.unique_users}</b>\n"
+        f"⭐ Eng ko'p olingan xizmat: <b>{top_service}</b> ({stats.top_service_count})\n\n"
         f"<b>📅 Vaqt bo'yicha</b>\n"
-        f"📅 Bugun: <b>{today_orders or 0}</b>\n"
-        f"📆 Oxirgi 7 kun: <b>{week_orders or 0}</b>\n"
-        f"📉 Oxirgi 30 kun: <b>{month_orders or 0}</b>\n"
+        f"📅 Bugun: <b>{stats.today}</b>\n"
+        f"📆 Oxirgi 7 kun: <b>{stats.last_7_days}</b>\n"
+        f"📉 Oxirgi 30 kun: <b>{stats.last_30_days}</b>\n"
         f"--------------------"
     )
 
@@ -276,18 +233,21 @@ async def _show_barber_orders(callback: types.CallbackQuery, page: int):
         await callback.answer("❌ Siz barber sifatida topilmadingiz.", show_alert=True)
         return
 
-    barber_key = str(barber.id)
     barber_name = " ".join(
         part for part in [barber.barber_first_name, barber.barber_last_name] if part
     ).strip() or str(barber.id)
 
     async with async_session() as session:
-        result = await session.execute(
-            select(Order).where(Order.barber_id == barber_key).order_by(Order.date, Order.time)
+        order_page = await fetch_keyset_page(
+            session,
+            barber_orders_query(barber.id),
+            [Order.date, Order.time, Order.id],
+            scope=("barber_orders", barber.id),
+            page=page,
+            page_size=ORDERS_PER_PAGE,
         )
-        orders = result.scalars().all()
 
-        if not orders:
+        if not order_page.items:
             await _safe_edit_message_text(
                 callback.message,
                 "📭 <b>Buyurtmalar topilmadi</b>\n\nHozircha sizga tegishli buyurtmalar mavjud emas.",
@@ -297,16 +257,12 @@ async def _show_barber_orders(callback: types.CallbackQuery, page: int):
             return
 
         service_map = {}
-        for order in orders:
+        for order in order_page.items:
             if order.service_id not in service_map:
                 service_map[order.service_id] = await _get_service_info(session, order.service_id)
 
-    page_size = ORDERS_PER_PAGE
-    total_pages = max((len(orders) + page_size - 1) // page_size, 1)
-    page = _clamp_page(page, total_pages)
-
-    text = _build_orders_text(orders, service_map, barber_name, page, total_pages, page_size)
-    keyboard = _build_orders_keyboard(page, total_pages)
+    text = _build_orders_text(order_page, service_map, barber_name)
+    keyboard = _build_orders_keyboard(order_page.page, order_page.total_pages)
 
     await _safe_edit_message_text(callback.message, text, reply_markup=keyboard)
     await callback.answer()
@@ -1,16 +1,58 @@
-﻿import time
-from typing import Dict
+from datetime import datetime, timedelta, timezone
 
-_BARBER_LAST_SEEN: Dict[int, float] = {}
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql.db import async_session
+from sql.models import BarberPresence
 
 # Barber panel active deb hisoblanadigan TTL
-PRESENCE_TTL = 10 * 60  # 10 daqiqa
+PRESENCE_TTL = timedelta(minutes=10)
+
+# Faollik barber_presence jadvalida: booking boshqa worker'da bo'lsa ham ko'rinadi
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def presence_cutoff(now: datetime | None = None) -> datetime:
+    """Shu vaqtdan keyin ko'ringan barber faol hisoblanadi."""
+    return (now or _utcnow()) - PRESENCE_TTL
+
+
+async def touch_barber(barber_tg_id: int, *, now: datetime | None = None) -> None:
+    seen_at = now or _utcnow()
+    async with async_session() as session:
+        try:
+            upsert_insert = _UPSERT_INSERTS[session.get_bind().dialect.name]
+            statement = upsert_insert(BarberPresence).values(
+                barber_tg_id=int(barber_tg_id),
+                last_seen=seen_at,
+            )
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[BarberPresence.barber_tg_id],
+                    set_={"last_seen": statement.excluded.last_seen},
+                )
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
 
-def touch_barber(barber_tg_id: int) -> None:
-    _BARBER_LAST_SEEN[int(barber_tg_id)] = time.time()
 
-def is_barber_active(barber_tg_id: int) -> bool:
-    ts = _BARBER_LAST_SEEN.get(int(barber_tg_id))
-    if not ts:
-        return False
-    return (time.time() - ts) <= PRESENCE_TTL
+async def is_barber_active(barber_tg_id: int, *, now: datetime | None = None) -> bool:
+    async with async_session() as session:
+        last_seen = await session.scalar(
+            select(BarberPresence.last_seen).where(
+                BarberPresence.barber_tg_id == int(barber_tg_id),
+                BarberPresence.last_seen >= presence_cutoff(now),
+            )
+        )
+    return last_seen is not None
@@ -1,13 +1,20 @@
 # superadmins/pause_today.py
+from collections.abc import Mapping
+from dataclasses import dataclass
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from sqlalchemy import update, select, and_
+from sqlalchemy import update, select
 from datetime import date
 
 from sql.db import async_session
+from sql.db_availability import invalidate_barber_schedule
+from sql.db_catalog import bump_catalog_version
+from sql.db_order_queries import get_barber_day_orders
+from sql.db_order_utils import CancelledOrder, cancel_barber_day_orders
 from sql.models import Barbers, Order, Services
+from utils.broadcast import broadcast_engine
 from .superadmin import get_barber_by_tg_id
 from .superadmin_buttons import get_pause_cancel_keyboard, get_pause_confirm_keyboard
 
@@ -28,29 +35,20 @@ def get_pause_reject_keyboard():
 
 
 # ====== Helper: bugungi buyurtmalar + xizmat nomlari ======
-async def _get_today_orders_with_services(barber_id_str: str):
-    today = date.today()
-    async with async_session() as session:
-        res = await session.execute(
-            select(Order).where(
-                and_(
-                    Order.barber_id == barber_id_str,
-                    Order.date == today
-                )
-            ).order_by(Order.time.asc())
-        )
-        orders = res.scalars().all()
-
-        # service_id larni yig'amiz (Order.service_id string bo'lishi mumkin)
-        service_ids_int = []
-        for o in orders:
-            try:
-                service_ids_int.append(int(o.service_id))
-            except Exception:
-                pass
-
-        services_map = {}
-        if service_ids_int:
+async def _get_today_orders_with_services(barber_id: int):
+    orders = await get_barber_day_orders(barber_id, date.today())
+
+    # service_id larni yig'amiz (Order.service_id string bo'lishi mumkin)
+    service_ids_int = []
+    for o in orders:
+        try:
+            service_ids_int.append(int(o.service_id))
+        except Exception:
+            pass
+
+    services_map = {}
+    if service_ids_int:
+        async with async_session() as session:
             srv_res = await session.execute(
                 select(Services).where(Services.id.in_(list(set(service_ids_int))))
             )
@@ -68,6 +66,79 @@ async def _get_today_orders_with_services(barber_id_str: str):
     return orders, service_name
 
 
+@dataclass(frozen=True, slots=True)
+class PauseCancellationReport:
+    cancelled: tuple[CancelledOrder, ...]
+    delivered: tuple[int, ...]
+    # order_id -> xatolik matni
+    failed: Mapping[int, str]
+
+    @property
+    def failed_orders(self) -> list[CancelledOrder]:
+        return [order for order in self.cancelled if order.order_id in self.failed]
+
+
+def _build_apology_text(order: CancelledOrder, apology_text: str) -> str:
+    return (
+        f"⚠️ <b>Navbat bekor qilindi</b>\n\n"
+        f"📅 Sana: <b>{order.order_date.strftime('%d.%m.%Y')}</b>\n"
+        f"⏰ Vaqt: <b>{order.order_time.strftime('%H:%M')}</b>\n"
+        f"✂️ Xizmat: <b>{order.service_name}</b>\n\n"
+        f"{apology_text}"
+    )
+
+
+async def cancel_today_orders_with_apology(
+    bot,
+    barber: Barbers,
+    apology_text: str,
+    *,
+    day: date | None = None,
+) -> PauseCancellationReport:
+    """
+    Bugungi navbatlarni bitta DELETE ... RETURNING bilan o'chiradi, keyin uzr
+    xabarlarini umumiy rate limit ostida parallel yuboradi.
+    """
+    cancelled = await cancel_barber_day_orders(
+        barber.id,
+        day or date.today(),
+        pause_barber=True,
+    )
+    errors = await broadcast_engine.send_many(
+        bot,
+        [(order.user_id, _build_apology_text(order, apology_text)) for order in cancelled],
+        parse_mode="HTML",
+    )
+    return PauseCancellationReport(
+        cancelled=tuple(cancelled),
+        delivered=tuple(
+            order.order_id for order, error in zip(cancelled, errors) if error is None
+        ),
+        failed={
+            order.order_id: error
+            for order, error in zip(cancelled, errors)
+            if error is not None
+        },
+    )
+
+
+def _build_cancellation_report_text(report: PauseCancellationReport) -> str:
+    text = (
+        f"✅ Bekor qilindi.\n"
+        f"📨 Xabar yuborildi: {len(report.delivered)}\n"
+        f"❌ Xabar yetmadi: {len(report.failed)}\n"
+        f"🗑 O'chirildi: {len(report.cancelled)}"
+    )
+    failed_orders = report.failed_orders
+    if failed_orders:
+        lines = [
+            f"🕒 {order.order_time.strftime('%H:%M')} - ✂️ {order.service_name}"
+            for order in failed_orders
+        ]
+        text += "\n\nXabar yetmagan navbatlar:\n" + "\n".join(lines)
+    return text
+
+
 def _build_pause_confirmation_text() -> str:
     return (
         "⛔ <b>Bugungi ish rejimini to'xtatish</b>\n\n"
@@ -79,8 +150,6 @@ def _build_pause_confirmation_text() -> str:
 
 async def _activate_pause_today(barber: Barbers):
     today = date.today()
-    barber_key = str(barber.id)
-
     async with async_session() as session:
         await session.execute(
             update(Barbers)
@@ -88,8 +157,10 @@ async def _activate_pause_today(barber: Barbers):
             .values(is_paused=True)
         )
         await session.commit()
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
-    orders, service_name = await _get_today_orders_with_services(barber_key)
+    orders, service_name = await _get_today_orders_with_services(barber.id)
 
     if not orders:
         return (
@@ -201,10 +272,8 @@ async def pause_reject_ask_apology(callback: types.CallbackQuery, state: FSMCont
         await callback.answer("❌ Xatolik!", show_alert=True)
         return
 
-    barber_key = str(barber.id)
-
     # Bugungi orders borligini tekshiramiz (bo'lmasa: hech narsa qilmaymiz)
-    orders, _ = await _get_today_orders_with_services(barber_key)
+    orders, _ = await _get_today_orders_with_services(barber.id)
     if not orders:
         await callback.answer("Bugun buyurtma yo'q.", show_alert=True)
         return
@@ -235,69 +304,15 @@ async def pause_send_apology_and_delete_orders(message: types.Message, state: FS
     if not apology_text:
         return await message.answer("Uzr matnini yozing (bo'sh bo'lmasin).")
 
-    today = date.today()
-    barber_key = str(barber.id)
+    report = await cancel_today_orders_with_apology(message.bot, barber, apology_text)
 
-    orders, service_name = await _get_today_orders_with_services(barber_key)
+    await state.clear()
 
-    # Agar buyurtmalar bo'lmasa — state tozalaymiz
-    if not orders:
-        await state.clear()
+    # Agar buyurtmalar bo'lmasa (allaqachon bekor qilingan)
+    if not report.cancelled:
         return await message.answer("Bugun bekor qilinadigan buyurtma topilmadi.")
 
-    # Mijozlarga uzr yuborish
-    sent = 0
-    for o in orders:
-        try:
-            t = o.time.strftime("%H:%M")
-            srv = service_name(o)
-            await message.bot.send_message(
-                chat_id=o.user_id,
-                text=(
-                    f"⚠️ <b>Navbat bekor qilindi</b>\n\n"
-                    f"📅 Sana: <b>{today.strftime('%d.%m.%Y')}</b>\n"
-                    f"⏰ Vaqt: <b>{t}</b>\n"
-                    f"✂️ Xizmat: <b>{srv}</b>\n\n"
-                    f"{apology_text}"
-                ),
-                parse_mode="HTML"
-            )
-            sent += 1
-        except Exception:
-            continue
-
-    # Orders ni o'chirish (bugungi) + barber is_paused True bo'lib qoladi
-    async with async_session() as session:
-        # qayta select qilib, sessionga bog'lab o'chiramiz
-        res = await session.execute(
-            select(Order).where(
-                and_(
-                    Order.barber_id == barber_key,
-                    Order.date == today
-                )
-            )
-        )
-        db_orders = res.scalars().all()
-
-        for o in db_orders:
-            await session.delete(o)
-
-        # is_paused ni True qilib qo'yib ketamiz (talabga muvofiq)
-        await session.execute(
-            update(Barbers)
-            .where(Barbers.id == barber.id)
-            .values(is_paused=True)
-        )
-
-        await session.commit()
-
-    await state.clear()
-
-    await message.answer(
-        f"✅ Bekor qilindi.\n"
-        f"📨 Xabar yuborildi: {sent}\n"
-        f"🗑 O'chirildi: {len(orders)}"
-    )
+    await message.answer(_build_cancellation_report_text(report))
 
 
 # =========================================================
@@ -321,6 +336,8 @@ async def pause_close(callback: types.CallbackQuery, state: FSMContext):
             .values(is_paused=False)
         )
         await session.commit()
+    invalidate_barber_schedule(barber.id)
+    await bump_catalog_version()
 
     await state.clear()
 
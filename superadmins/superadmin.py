@@ -1,10 +1,9 @@
 #superadmins/superadmin.py
 from aiogram import Router, types, F
 from aiogram.filters import Command
-from sqlalchemy import select
 
-from sql.db import async_session
-from sql.models import Barbers
+from sql.db_barbers import get_barber
+from sql.db_roles import resolve_user_roles
 from .panel_presence import touch_barber
 from .order_realtime_notify import flush_undelivered_to_barber
 from .superadmin_buttons import get_barber_inline_menu, get_barber_menu
@@ -12,15 +11,18 @@ from .superadmin_buttons import get_barber_inline_menu, get_barber_menu
 router = Router()
 
 async def is_barber(tg_id: int) -> bool:
-    async with async_session() as session:
-        result = await session.execute(select(Barbers).where(Barbers.tg_id == tg_id))
-        return result.scalar_one_or_none() is not None
+    return (await resolve_user_roles(tg_id)).is_barber
 
 
 async def get_barber_by_tg_id(tg_id: int):
-    async with async_session() as session:
-        result = await session.execute(select(Barbers).where(Barbers.tg_id == tg_id))
-        return result.scalar_one_or_none()
+    # Keshdan faqat barber id'si: qator (is_paused, jadval, profil) har safar bazadan yangi o'qiladi
+    barber_id = (await resolve_user_roles(tg_id)).barber_id
+    if barber_id is None:
+        return None
+    barber = await get_barber(barber_id)
+    if barber is None or barber.tg_id != int(tg_id):
+        return None
+    return barber
 
 
 @router.message(Command("barber"))
@@ -35,7 +37,7 @@ async def barber_entry(message: types.Message):
             parse_mode="HTML"
         )
 
-    touch_barber(tg_id)
+    await touch_barber(tg_id)
     await flush_undelivered_to_barber(message.bot, tg_id)
 
     barber = await get_barber_by_tg_id(tg_id)
@@ -54,7 +56,7 @@ async def barber_entry(message: types.Message):
 
 @router.callback_query(F.data == "barber_menu")
 async def back_to_barber_menu(callback: types.CallbackQuery):
-    touch_barber(callback.from_user.id)
+    await touch_barber(callback.from_user.id)
 
     sent = False
     try:
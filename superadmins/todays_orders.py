@@ -1,10 +1,11 @@
 # superadmins/todays_orders.py
 from aiogram import Router, types, F
 from aiogram.filters import StateFilter
-from sqlalchemy import select, and_
 from datetime import date, datetime
 
 from sql.db import async_session
+from sql.db_order_queries import barber_day_orders_query
+from sql.db_pagination import fetch_keyset_page
 from sql.models import Order, Services
 from .superadmin import get_barber_by_tg_id
 from .superadmin_buttons import get_todays_orders_keyboard
@@ -41,42 +42,42 @@ def _status_for_time(order_time, today_: date) -> tuple[str, str]:
     return "🟢 Kutilmoqda", ""
 
 
-async def _get_today_orders(barber_id_str: str):
-    today_ = date.today()
+async def _get_today_orders_page(barber_id: int, page: int, today_: date):
     async with async_session() as session:
-        result = await session.execute(
-            select(Order).where(
-                and_(Order.barber_id == barber_id_str, Order.date == today_)
-            ).order_by(Order.time)
+        order_page = await fetch_keyset_page(
+            session,
+            barber_day_orders_query(barber_id, today_),
+            [Order.time, Order.id],
+            scope=("todays_orders", barber_id, today_),
+            page=page,
+            page_size=PAGE_SIZE,
         )
-        return result.scalars().all()
+        service_name = None
+        if order_page.items:
+            service_name = await _service_name(session, order_page.items[0].service_id)
+    return order_page, service_name
 
 
-async def _render_page_to_message(msg: types.Message, barber_id_str: str, page: int):
+async def _render_page_to_message(msg: types.Message, barber_id: int, page: int):
     today_ = date.today()
-    orders = await _get_today_orders(barber_id_str)
+    order_page, service_name = await _get_today_orders_page(barber_id, page, today_)
 
-    if not orders:
+    if not order_page.items:
         return await msg.answer(
             "📭 <b>Bugungi buyurtmalar yo'q</b>\n\n"
             "Hozircha bugun uchun navbatlar mavjud emas.",
             parse_mode="HTML",
         )
 
-    total_pages = (len(orders) + PAGE_SIZE - 1) // PAGE_SIZE
-    page = max(1, min(page, total_pages))
-
-    start = (page - 1) * PAGE_SIZE
-    order = orders[start]  # PAGE_SIZE=1
-
-    async with async_session() as session:
-        service_name = await _service_name(session, order.service_id)
+    page = order_page.page
+    total_pages = order_page.total_pages
+    order = order_page.items[0]  # PAGE_SIZE=1
 
     status, time_status = _status_for_time(order.time, today_)
 
     text = (
         f"📋 <b>Bugungi buyurtmalar</b>\n"
-        f"📦 <b>Jami:</b> {len(orders)}\n"
+        f"📦 <b>Jami:</b> {order_page.total}\n"
         f"📄 <b>Sahifa:</b> {page}/{total_pages}\n"
         f"--------------------\n"
         f"<b>Navbat</b> {status}\n\n"
@@ -93,11 +94,11 @@ async def _render_page_to_message(msg: types.Message, barber_id_str: str, page:
     await msg.answer(text, parse_mode="HTML", reply_markup=keyboard)
 
 
-async def _edit_page_in_message(msg: types.Message, barber_id_str: str, page: int):
+async def _edit_page_in_message(msg: types.Message, barber_id: int, page: int):
     today_ = date.today()
-    orders = await _get_today_orders(barber_id_str)
+    order_page, service_name = await _get_today_orders_page(barber_id, page, today_)
 
-    if not orders:
+    if not order_page.items:
         try:
             await msg.edit_text(
                 "📭 <b>Bugungi buyurtmalar yo'q</b>\n\n"
@@ -108,20 +109,15 @@ async def _edit_page_in_message(msg: types.Message, barber_id_str: str, page: in
             pass
         return
 
-    total_pages = (len(orders) + PAGE_SIZE - 1) // PAGE_SIZE
-    page = max(1, min(page, total_pages))
-
-    start = (page - 1) * PAGE_SIZE
-    order = orders[start]
-
-    async with async_session() as session:
-        service_name = await _service_name(session, order.service_id)
+    page = order_page.page
+    total_pages = order_page.total_pages
+    order = order_page.items[0]
 
     status, time_status = _status_for_time(order.time, today_)
 
     text = (
         f"📋 <b>Bugungi buyurtmalar</b>\n"
-        f"📦 <b>Jami:</b> {len(orders)}\n"
+        f"📦 <b>Jami:</b> {order_page.total}\n"
         f"📄 <b>Sahifa:</b> {page}/{total_pages}\n"
         f"--------------------\n"
         f"<b>Navbat</b> {status}\n\n"
@@ -147,8 +143,7 @@ async def show_todays_orders(message: types.Message):
     if not barber:
         return await message.answer("❌ Siz barber sifatida topilmadingiz.")
 
-    barber_key = str(barber.id)
-    await _render_page_to_message(message, barber_key, page=1)
+    await _render_page_to_message(message, barber.id, page=1)
 
 
 @router.callback_query(F.data.startswith("todays_orders_page_"))
@@ -166,8 +161,7 @@ async def paginate_todays_orders(callback: types.CallbackQuery):
         await callback.answer("❌ Noto'g'ri sahifa!", show_alert=True)
         return
 
-    barber_key = str(barber.id)
-    await _edit_page_in_message(callback.message, barber_key, page=page)
+    await _edit_page_in_message(callback.message, barber.id, page=page)
     await callback.answer()
 
 
@@ -0,0 +1,67 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+async def create_sqlite_db(test_case, *models, name: str = "test.db"):
+    """
+    Vaqtinchalik fayldagi SQLite (aiosqlite) baza: faqat berilgan modellar jadvallari yaratiladi.
+    Fayl — fon vazifalari va test alohida ulanishlardan foydalanishi uchun.
+    Katalog va engine test tugaganda tozalanadi. (engine, session_factory) qaytaradi.
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp_dir.cleanup)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp_dir.name) / name}")
+    test_case.addAsyncCleanup(engine.dispose)
+    async with engine.begin() as conn:
+        for model in models:
+            await conn.run_sync(model.__table__.create)
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class FakeClock:
+    """monotonic/asyncio.sleep o'rnida: sleep() vaqtni darhol oldinga suradi."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+class FakeBot:
+    def __init__(self, *, retry_after_for=(), forbidden=(), network_errors=None):
+        self.retry_after_for = set(retry_after_for)
+        self.forbidden = set(forbidden)
+        # chat_id -> nechta urinish tarmoq xatoligi bilan tugaydi
+        self.network_errors = dict(network_errors or {})
+        self.sent = []
+        self.messages = []
+        self.edits = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id in self.retry_after_for:
+            self.retry_after_for.discard(chat_id)
+            raise TelegramRetryAfter(method=method, message="Flood", retry_after=5)
+        if chat_id in self.forbidden:
+            raise TelegramForbiddenError(method=method, message="bot was blocked by the user")
+        if self.network_errors.get(chat_id):
+            self.network_errors[chat_id] -= 1
+            raise ConnectionResetError("connection reset")
+        self.sent.append(chat_id)
+        self.messages.append((chat_id, text))
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self.edits.append((chat_id, message_id, text))
@@ -0,0 +1,172 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from sql.models import BarberOrderInbox, Order
+from utils import auto_migrate
+
+BARBER_INDEX = "ix_orders_barber_date_time"
+USER_INDEX = "ix_orders_user_date_time_id"
+PHONE_INDEX = "ix_orders_phone_digits_trgm"
+WEEKDAY_INDEX = "ix_orders_user_weekday"
+FINGERPRINTED_INDEXES = (BARBER_INDEX, USER_INDEX, PHONE_INDEX, WEEKDAY_INDEX)
+
+
+def _fake_conn():
+    conn = MagicMock()
+    conn.dialect = postgresql.dialect()
+    conn.execute = AsyncMock()
+    conn.begin_nested = AsyncMock(return_value=AsyncMock())
+    return conn
+
+
+def _executed_sql(conn) -> list[str]:
+    return [str(call.args[0]) for call in conn.execute.await_args_list]
+
+
+def _index(name):
+    return next(index for index in Order.__table__.indexes if index.name == name)
+
+
+def _existing_single_column_indexes() -> dict[str, str]:
+    return {
+        f"ix_orders_{column}": f"CREATE INDEX ix_orders_{column} ON public.orders USING btree ({column})"
+        for column in ("barber_service_id", "service_id", "date", "booked_date")
+    }
+
+
+class CompositeIndexSyncTests(unittest.IsolatedAsyncioTestCase):
+    async def test_missing_composite_indexes_are_created_with_fingerprint(self):
+        conn = _fake_conn()
+
+        await auto_migrate._sync_indexes(
+            conn, "orders", Order.__table__, _existing_single_column_indexes(), {}
+        )
+
+        sql = _executed_sql(conn)
+        self.assertIn(
+            "CREATE INDEX ix_orders_barber_date_time ON orders (barber_id, date, time) "
+            "INCLUDE (booked_duration_minutes)",
+            sql,
+        )
+        self.assertIn("CREATE INDEX ix_orders_user_date_time_id ON orders (user_id, date, time, id)", sql)
+        self.assertIn(
+            "CREATE INDEX ix_orders_phone_digits_trgm ON orders USING gin (user_id, phone_digits gin_trgm_ops)",
+            sql,
+        )
+        self.assertIn("CREATE INDEX ix_orders_user_weekday ON orders (user_id, EXTRACT(dow FROM date))", sql)
+        self.assertEqual(sum("COMMENT ON INDEX" in statement for statement in sql), 4)
+
+    async def test_matching_unmarked_index_is_adopted_and_changed_one_is_rebuilt(self):
+        dialect = postgresql.dialect()
+        db_indexes = _existing_single_column_indexes()
+        db_indexes[BARBER_INDEX] = (
+            'CREATE INDEX ix_orders_barber_date_time ON public.orders USING btree '
+            '(barber_id, date, "time") INCLUDE (booked_duration_minutes)'
+        )
+        # Eski ta'rif: INCLUDE'siz — izoh (xesh) mos kelmaydi
+        db_indexes[USER_INDEX] = (
+            "CREATE INDEX ix_orders_user_date_time_id ON public.orders USING btree (user_id, date)"
+        )
+        comments = {USER_INDEX: "auto_migrate:0000000000000000"}
+        conn = _fake_conn()
+
+        await auto_migrate._sync_indexes(conn, "orders", Order.__table__, db_indexes, comments)
+
+        sql = _executed_sql(conn)
+        barber_fingerprint = auto_migrate._index_fingerprint(_index(BARBER_INDEX), dialect)
+        self.assertIn(f"COMMENT ON INDEX \"{BARBER_INDEX}\" IS '{barber_fingerprint}'", sql)
+        self.assertFalse(any(statement.startswith("CREATE INDEX ix_orders_barber") for statement in sql))
+        self.assertIn(f'DROP INDEX IF EXISTS "{USER_INDEX}"', sql)
+        self.assertIn("CREATE INDEX ix_orders_user_date_time_id ON orders (user_id, date, time, id)", sql)
+
+    async def test_single_column_indexes_covered_by_composites_are_dropped(self):
+        db_indexes = _existing_single_column_indexes()
+        db_indexes["ix_orders_user_id"] = "CREATE INDEX ix_orders_user_id ON public.orders USING btree (user_id)"
+        db_indexes["ix_orders_barber_id"] = (
+            "CREATE INDEX ix_orders_barber_id ON public.orders USING btree (barber_id)"
+        )
+        db_indexes["orders_manual_fullname"] = (
+            "CREATE INDEX orders_manual_fullname ON public.orders USING btree (fullname)"
+        )
+        conn = _fake_conn()
+
+        await auto_migrate._sync_indexes(conn, "orders", Order.__table__, db_indexes, {})
+
+        sql = _executed_sql(conn)
+        self.assertIn('DROP INDEX IF EXISTS "ix_orders_user_id"', sql)
+        self.assertIn('DROP INDEX IF EXISTS "ix_orders_barber_id"', sql)
+        self.assertFalse(any("orders_manual_fullname" in statement for statement in sql))
+        self.assertFalse(any("ix_orders_date" in statement for statement in sql))
+
+    async def test_up_to_date_index_is_left_alone(self):
+        dialect = postgresql.dialect()
+        db_indexes = _existing_single_column_indexes()
+        comments = {}
+        for name in FINGERPRINTED_INDEXES:
+            db_indexes[name] = "CREATE INDEX ... USING btree (x)"
+            comments[name] = auto_migrate._index_fingerprint(_index(name), dialect)
+        conn = _fake_conn()
+
+        await auto_migrate._sync_indexes(conn, "orders", Order.__table__, db_indexes, comments)
+
+        conn.execute.assert_not_awaited()
+
+
+class SearchColumnMigrationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_phone_digits_is_added_as_generated_column(self):
+        conn = _fake_conn()
+
+        await auto_migrate._add_column(
+            conn, "orders", Order.__table__.c.phone_digits, postgresql.dialect()
+        )
+
+        (sql,) = _executed_sql(conn)
+        self.assertTrue(sql.startswith('ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "phone_digits"'))
+        self.assertIn("GENERATED ALWAYS AS (regexp_replace(phonenumber, '[^0-9]', '', 'g'))", sql)
+        self.assertTrue(sql.endswith("STORED"))
+
+    async def test_index_extensions_are_enabled_first(self):
+        conn = _fake_conn()
+
+        await auto_migrate._ensure_extensions(conn, Order.metadata)
+
+        self.assertEqual(
+            _executed_sql(conn),
+            ['CREATE EXTENSION IF NOT EXISTS "btree_gin"', 'CREATE EXTENSION IF NOT EXISTS "pg_trgm"'],
+        )
+
+    def test_changed_generation_expression_is_detected(self):
+        column = Order.__table__.c.phone_digits
+        dialect = postgresql.dialect()
+        stored = "regexp_replace((phonenumber)::text, '[^0-9]'::text, ''::text, 'g'::text)"
+        old = "replace(replace((phonenumber)::text, '+'::text, ''::text), ' '::text, ''::text)"
+
+        self.assertFalse(
+            auto_migrate._generation_expression_changed(column, {"generation_expression": stored}, dialect)
+        )
+        self.assertTrue(
+            auto_migrate._generation_expression_changed(column, {"generation_expression": old}, dialect)
+        )
+
+
+class UniqueConstraintSyncTests(unittest.IsolatedAsyncioTestCase):
+    async def test_inbox_duplicates_are_removed_before_unique_is_added(self):
+        conn = _fake_conn()
+        table = BarberOrderInbox.__table__
+
+        await auto_migrate._sync_unique_constraints(conn, table.name, table, {})
+
+        delete_sql, alter_sql = _executed_sql(conn)
+        self.assertTrue(delete_sql.startswith('DELETE FROM "barber_order_inbox" a USING'))
+        self.assertIn('a."barber_tg_id" = b."barber_tg_id" AND a."order_id" = b."order_id"', delete_sql)
+        self.assertEqual(
+            alter_sql,
+            'ALTER TABLE "barber_order_inbox" ADD CONSTRAINT "uq_barber_order_inbox_order_barber" '
+            'UNIQUE ("barber_tg_id", "order_id")',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import unittest
+from datetime import date, datetime, time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import insert, update
+
+from keyboards import booking_keyboards
+from sql import db_availability
+from sql.models import Barbers
+from tests.helpers import create_sqlite_db
+
+
+def make_barber(**overrides):
+    payload = {
+        "id": 20,
+        "work_days": "Har kuni",
+        "work_time": "09:00-12:00",
+        "breakdown": None,
+        "is_paused": False,
+    }
+    payload.update(overrides)
+    return SimpleNamespace(**payload)
+
+
+# 2026-05-11 — dushanba
+MONDAY = date(2026, 5, 11)
+BEFORE_MONDAY = datetime(2026, 5, 10, 20, 0).astimezone()
+
+
+class ComputeAvailableSlotsTests(unittest.TestCase):
+    def test_booked_orders_and_break_are_excluded(self):
+        barber = make_barber(breakdown="10:00-10:30")
+        slots = db_availability.compute_available_slots(
+            barber,
+            30,
+            MONDAY,
+            [(time(9, 0), 60)],
+            now=BEFORE_MONDAY,
+        )
+        self.assertEqual(slots, ["10:30", "11:00", "11:30"])
+
+    def test_day_off_has_no_slots(self):
+        barber = make_barber(work_days="Seshanba-Shanba")
+        slots = db_availability.compute_available_slots(
+            barber, 30, MONDAY, [], now=BEFORE_MONDAY
+        )
+        self.assertEqual(slots, [])
+
+    def test_paused_barber_has_no_slots(self):
+        barber = make_barber(is_paused=True)
+        slots = db_availability.compute_available_slots(
+            barber, 30, MONDAY, [], now=BEFORE_MONDAY
+        )
+        self.assertEqual(slots, [])
+
+
+class CompiledScheduleTests(unittest.TestCase):
+    def test_text_schedule_compiles_to_mask_and_minutes(self):
+        schedule = db_availability.compile_schedule("Dushanba-Juma", "09:00-18:00", "13:00-14:00")
+
+        self.assertEqual(schedule.days_mask, 0b0011111)
+        self.assertEqual((schedule.work_start, schedule.work_end), (540, 1080))
+        self.assertEqual((schedule.break_start, schedule.break_end), (780, 840))
+        self.assertTrue(schedule.works_on(MONDAY.weekday()))
+        self.assertFalse(schedule.works_on(6))
+        # Tushunarsiz ish kunlari avvalgidek har kuni deb olinadi
+        self.assertEqual(
+            db_availability.compile_schedule("???", None, None).days_mask,
+            db_availability.ALL_WEEKDAYS_MASK,
+        )
+
+    def test_stored_columns_give_the_same_slots_as_text(self):
+        text_barber = make_barber(work_days="Dushanba, Chorshanba", breakdown="10:00-10:30")
+        compiled = db_availability.compile_schedule("Dushanba, Chorshanba", "09:00-12:00", "10:00-10:30")
+        column_barber = SimpleNamespace(
+            work_days=None, work_time=None, breakdown=None, is_paused=False, **compiled.column_values()
+        )
+        booked = [(time(11, 0), 20)]
+
+        for target_date in (MONDAY, date(2026, 5, 12), date(2026, 5, 13)):
+            for duration in (20, 30, 45):
+                with self.subTest(target_date=target_date, duration=duration):
+                    self.assertEqual(
+                        db_availability.compute_available_slots(
+                            text_barber, duration, target_date, booked, now=BEFORE_MONDAY
+                        ),
+                        db_availability.compute_available_slots(
+                            column_barber, duration, target_date, booked, now=BEFORE_MONDAY
+                        ),
+                    )
+
+    def test_today_keeps_only_slots_after_now(self):
+        now = datetime(2026, 5, 11, 10, 0, 30).astimezone()
+        slots = db_availability.compute_available_slots(make_barber(), 30, MONDAY, [], now=now)
+
+        self.assertEqual(slots, ["10:30", "11:00", "11:30"])
+        self.assertEqual(
+            db_availability.compute_available_slots(
+                make_barber(), 30, date(2026, 5, 10), [], now=now
+            ),
+            [],
+        )
+
+
+class CompiledScheduleStorageTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(self, Barbers, name="schedule.db")
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(Barbers),
+                [
+                    {"id": 1, "experience": "3", "work_days": "Har kuni", "work_time": "09:00-18:00"},
+                    {"id": 2, "experience": "3", "work_days": "Shanba", "work_time": "10:00-14:00"},
+                ],
+            )
+
+    async def test_backfill_and_text_updates_keep_columns_in_sync(self):
+        self.assertEqual(await db_availability.backfill_barber_schedules(self.session_factory), 2)
+        self.assertEqual(await db_availability.backfill_barber_schedules(self.session_factory), 0)
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Barbers).where(Barbers.id == 2).values(breakdown="12:00-12:30")
+            )
+            await db_availability.store_compiled_schedule(session, 2)
+            await session.commit()
+
+        async with self.session_factory() as session:
+            first = await session.get(Barbers, 1)
+            second = await session.get(Barbers, 2)
+
+        self.assertEqual(
+            (first.work_days_mask, first.work_start_minute, first.work_end_minute),
+            (db_availability.ALL_WEEKDAYS_MASK, 540, 1080),
+        )
+        self.assertEqual(
+            db_availability.schedule_of(second),
+            db_availability.CompiledSchedule(1 << 5, 600, 840, 720, 750),
+        )
+
+
+class TimeKeyboardTests(unittest.IsolatedAsyncioTestCase):
+    async def test_time_buttons_come_from_duration_based_slots(self):
+        slots_mock = AsyncMock(return_value=["09:00", "09:40", "10:20"])
+
+        with patch.object(booking_keyboards, "get_available_slots", slots_mock):
+            markup = await booking_keyboards.time_keyboard("10", "20", "2026-05-11")
+
+        slots_mock.assert_awaited_once_with("10", "20", MONDAY)
+        self.assertEqual(
+            [[button.text for button in row] for row in markup.inline_keyboard],
+            [["09:00", "09:40"], ["10:20"]],
+        )
+        self.assertEqual(
+            markup.inline_keyboard[1][0].callback_data, "confirm_10_20_2026-05-11_10:20"
+        )
+
+
+class AvailableDatesTests(unittest.IsolatedAsyncioTestCase):
+    async def test_dates_match_per_day_slots_from_single_window_load(self):
+        snapshot = make_barber(work_time="09:00-10:00", service_durations={10: 60})
+        window = {date(2026, 5, 12): ((time(9, 0), 60),)}
+
+        with patch.object(
+            db_availability,
+            "_get_schedule_window",
+            AsyncMock(return_value=(snapshot, window)),
+        ) as load_mock:
+            dates = await db_availability.get_available_dates(
+                "10", "20", start_date=MONDAY, days=3, now=BEFORE_MONDAY
+            )
+
+        load_mock.assert_awaited_once_with(20, MONDAY, date(2026, 5, 13))
+        self.assertEqual(dates, [MONDAY, date(2026, 5, 13)])
+
+
+class ScheduleCacheTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        db_availability.clear_availability_cache()
+        self.addCleanup(db_availability.clear_availability_cache)
+
+    async def test_window_is_served_from_cache_until_day_is_invalidated(self):
+        snapshot = db_availability.BarberScheduleSnapshot(
+            id=20,
+            schedule=db_availability.compile_schedule("Har kuni", "09:00-12:00", None),
+            is_paused=False,
+            service_durations={10: 30},
+        )
+        rows_mock = AsyncMock(return_value={MONDAY: [(time(9, 0), 60)]})
+
+        with patch.object(db_availability, "async_session", FakeSessionFactory()), patch.object(
+            db_availability, "_load_schedule_snapshot", AsyncMock(return_value=snapshot)
+        ) as snapshot_mock, patch.object(db_availability, "_load_booked_rows", rows_mock):
+            first = await db_availability._get_schedule_window(20, MONDAY, MONDAY)
+            second = await db_availability._get_schedule_window(20, MONDAY, MONDAY)
+            db_availability.invalidate_barber_day(20, MONDAY)
+            await db_availability._get_schedule_window(20, MONDAY, MONDAY)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[1][MONDAY], ((time(9, 0), 60),))
+        snapshot_mock.assert_awaited_once()
+        self.assertEqual(rows_mock.await_count, 2)
+
+
+class FakeSessionFactory:
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return SimpleNamespace()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
@@ -4,6 +4,7 @@ from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
 from handlers import booking
+from sql import db_temporary_orders
 
 
 class FakeState:
@@ -97,6 +98,7 @@ def created_order(**overrides):
         "service_name": "Haircut",
         "barber_id": "20",
         "barber_id_name": "Barber One",
+        "barber_name": "Barber One",
         "date": date(2026, 5, 10),
         "time": time(9, 0),
     }
@@ -137,11 +139,39 @@ class BookingConfirmationTests(unittest.IsolatedAsyncioTestCase):
             result = await booking.process_booking_confirmation(1, state, callback)
 
         self.assertTrue(result)
-        finalize_mock.assert_awaited_once_with(1)
+        # FSM'da booking holati yo'q: temporary_orders yozuvidan yakunlanadi
+        finalize_mock.assert_awaited_once_with(1, None)
         render_mock.assert_awaited_once()
         self.assertTrue(state.cleared)
         self.assertEqual(callback.message.answers[-1]["text"], "🏠 Asosiy menyu:")
 
+    async def test_concurrently_taken_slot_shows_slot_taken_reply(self):
+        state = FakeState()
+        callback = FakeCallback()
+        temp_order = complete_temp_order()
+        slot_error = booking.SlotUnavailableError(20, date(2026, 5, 10), time(9, 0))
+
+        with (
+            patch.object(booking, "get_temporary_order", AsyncMock(return_value=temp_order)),
+            patch.object(booking, "get_user", AsyncMock(return_value=SimpleNamespace())),
+            patch.object(booking, "save_user", AsyncMock(return_value=SimpleNamespace())),
+            patch.object(booking, "finalize_temporary_order", AsyncMock(side_effect=slot_error)),
+            patch.object(booking, "notify_barber_realtime", AsyncMock()) as notify_mock,
+            patch.object(booking, "_build_time_keyboard", AsyncMock(return_value=("time-kb", 0, 1))),
+            patch.object(booking, "_persist_booking_state", AsyncMock()) as persist_mock,
+        ):
+            result = await booking.process_booking_confirmation(1, state, callback)
+
+        self.assertFalse(result)
+        notify_mock.assert_not_awaited()
+        self.assertEqual(
+            persist_mock.await_args.kwargs["next_state"],
+            booking.UserState.waiting_for_time,
+        )
+        self.assertIn("endi mavjud emas", callback.message.edits[-1]["text"])
+        self.assertIn("band", callback.answers[-1]["text"])
+        self.assertFalse(state.cleared)
+
     async def test_missing_data_shows_error_and_does_not_finalize(self):
         state = FakeState()
         callback = FakeCallback()
@@ -159,7 +189,10 @@ class BookingConfirmationTests(unittest.IsolatedAsyncioTestCase):
         self.assertIn("to'liq emas", callback.answers[-1]["text"])
 
     async def test_cancel_pauses_booking_without_deleting_temp_order(self):
-        state = FakeState(state=booking.UserState.waiting_for_barber.state)
+        state = FakeState(
+            {"fullname": "Ali Valiyev", "service_id": 10},
+            state=booking.UserState.waiting_for_barber.state,
+        )
         message = FakeMessage(user_id=1)
 
         with (
@@ -169,11 +202,11 @@ class BookingConfirmationTests(unittest.IsolatedAsyncioTestCase):
         ):
             await booking._finish_booking_cancel(message, state)
 
-        upsert_mock.assert_awaited_once_with(
-            {
-                "user_id": 1,
-                "current_state": booking.UserState.waiting_for_barber.state,
-            }
+        # FSM'dagi qoralama to'liq yoziladi, oxirgi flush'dan keyingi qadamlar ham
+        (written,) = upsert_mock.await_args.args
+        self.assertEqual(
+            (written["user_id"], written["current_state"], written["fullname"], written["service_id"]),
+            (1, booking.UserState.waiting_for_barber.state, "Ali Valiyev", "10"),
         )
         delete_mock.assert_not_awaited()
         self.assertTrue(state.cleared)
@@ -314,14 +347,8 @@ class BookingConfirmationTests(unittest.IsolatedAsyncioTestCase):
         )
 
     async def test_confirm_does_not_recreate_missing_temporary_order(self):
-        state = FakeState(
-            {
-                "fullname": "Ali Valiyev",
-                "phonenumber": "+998901234567",
-                "is_for_other": False,
-            },
-            state=booking.UserState.waiting_for_time.state,
-        )
+        # Ikkinchi "tasdiqlash": birinchisi yakunlab FSM'ni tozalagan
+        state = FakeState()
         callback = FakeCallback(data="confirm_10_20_2026-05-10_09:00")
 
         with (
@@ -340,6 +367,69 @@ class BookingConfirmationTests(unittest.IsolatedAsyncioTestCase):
             answer_text="Vaqt tanlandi ✅",
         )
 
+    async def test_confirmation_books_the_fsm_draft_without_reading_the_db_row(self):
+        state = FakeState(
+            {
+                "fullname": "Ali Valiyev",
+                "phonenumber": "+998901234567",
+                "service_id": "10",
+                "barber_id": "20",
+                "date": "2026-05-10",
+                "time": "09:00",
+            },
+            state=booking.UserState.waiting_for_time.state,
+        )
+        callback = FakeCallback()
+
+        with (
+            patch.object(booking, "get_temporary_order", AsyncMock()) as get_temp_mock,
+            patch.object(booking, "get_user", AsyncMock(return_value=SimpleNamespace())),
+            patch.object(booking, "save_user", AsyncMock(return_value=SimpleNamespace())),
+            patch.object(booking, "finalize_temporary_order", AsyncMock(return_value=created_order())) as finalize_mock,
+            patch.object(booking, "notify_barber_realtime", AsyncMock()),
+            patch.object(booking, "_render_booking_success", AsyncMock()),
+            patch.object(booking, "get_main_menu", return_value="main-menu"),
+        ):
+            result = await booking.process_booking_confirmation(1, state, callback)
+
+        self.assertTrue(result)
+        get_temp_mock.assert_not_awaited()
+        user_id, draft = finalize_mock.await_args.args
+        self.assertEqual((user_id, draft["date"], draft["time"]), (1, "2026-05-10", "09:00"))
+
+    async def test_booking_steps_flush_to_db_at_most_once_per_interval(self):
+        state = FakeState(state=booking.UserState.waiting_for_service.state)
+
+        with patch.object(booking, "upsert_temporary_order", AsyncMock()) as upsert_mock:
+            await booking._persist_booking_state(1, state, fullname="Ali Valiyev")
+            await booking._persist_booking_state(
+                1, state, next_state=booking.UserState.waiting_for_barber, service_id=10
+            )
+            self.assertEqual(upsert_mock.await_count, 1)
+
+            # Oraliq o'tdi: keyingi qadam yana yoziladi
+            state.data[booking.TEMPORARY_ORDER_FLUSHED_AT_KEY] -= (
+                db_temporary_orders.TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS
+            )
+            await booking._persist_booking_state(1, state, barber_id=20)
+
+        self.assertEqual(upsert_mock.await_count, 2)
+        (written,) = upsert_mock.await_args.args
+        self.assertEqual((written["service_id"], written["barber_id"]), ("10", "20"))
+        self.assertEqual(state.data["service_id"], 10)
+
+    async def test_failed_flush_keeps_the_step_and_retries_next_time(self):
+        state = FakeState(state=booking.UserState.waiting_for_service.state)
+
+        with patch.object(
+            booking, "upsert_temporary_order", AsyncMock(side_effect=[RuntimeError("db down"), None])
+        ) as upsert_mock:
+            await booking._persist_booking_state(1, state, fullname="Ali Valiyev")
+            await booking._persist_booking_state(1, state, phonenumber="+998901234567")
+
+        self.assertEqual(upsert_mock.await_count, 2)
+        self.assertEqual(state.data["fullname"], "Ali Valiyev")
+
 
 if __name__ == "__main__":
     unittest.main()
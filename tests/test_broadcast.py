@@ -0,0 +1,183 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from sqlalchemy import select, update
+
+from sql import db_broadcast
+from sql.models import BroadcastJob, BroadcastRecipient
+from tests.helpers import FakeBot, FakeClock, create_sqlite_db
+from utils.broadcast import BroadcastEngine
+
+
+class BroadcastEngineTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(
+            self, BroadcastJob, BroadcastRecipient, name="broadcast.db"
+        )
+        patcher = patch.object(db_broadcast, "async_session", self.session_factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock = FakeClock()
+
+    def _engine(self, **kwargs) -> BroadcastEngine:
+        return BroadcastEngine(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    async def test_retry_after_is_honoured_and_results_are_persisted(self):
+        job = await db_broadcast.create_broadcast_job(
+            sender_tg_id=1,
+            text="Salom",
+            chat_ids=[10, 20, 30],
+            progress_chat_id=1,
+            progress_message_id=99,
+        )
+        bot = FakeBot(retry_after_for={20}, forbidden={30})
+
+        finished = await self._engine(global_rate=100).run_job(bot, job.id)
+
+        self.assertCountEqual(bot.sent, [10, 20])
+        self.assertIn(5, self.clock.sleeps)
+        self.assertEqual((finished.sent, finished.failed, finished.total), (2, 1, 3))
+        self.assertEqual(await db_broadcast.list_unfinished_broadcast_job_ids(), [])
+        self.assertEqual(bot.edits[-1][:2], (1, 99))
+        self.assertIn("Yuborildi: 2 ta", bot.edits[-1][2])
+
+    async def test_resumed_job_sends_only_pending_recipients(self):
+        job = await db_broadcast.create_broadcast_job(
+            sender_tg_id=1,
+            text="Salom",
+            chat_ids=[10, 20],
+        )
+        # Qayta ishga tushishdan oldin 10 ga yuborilgan edi
+        await db_broadcast.record_broadcast_results(job.id, sent_chat_ids=[10])
+        await db_broadcast.set_broadcast_job_status(job.id, db_broadcast.BROADCAST_JOB_RUNNING)
+        bot = FakeBot()
+        engine = self._engine()
+
+        self.assertEqual(await engine.resume_unfinished(bot), 1)
+        await engine.start(bot, job.id)
+
+        self.assertEqual(bot.sent, [20])
+        finished = await db_broadcast.get_broadcast_job(job.id)
+        self.assertEqual((finished.sent, finished.status), (2, db_broadcast.BROADCAST_JOB_DONE))
+
+    async def test_engine_waits_for_streamed_recipients(self):
+        job = await db_broadcast.create_broadcast_job(
+            sender_tg_id=1,
+            text="Salom",
+            chat_ids=[10],
+            collecting=True,
+        )
+        bot = FakeBot()
+        task = self._engine().start(bot, job.id)
+
+        while bot.sent != [10]:
+            await asyncio.sleep(0.01)
+        await db_broadcast.add_broadcast_recipients(job.id, [20, 30])
+        await db_broadcast.finish_broadcast_collection(job.id)
+        finished = await task
+
+        self.assertEqual(bot.sent, [10, 20, 30])
+        self.assertEqual((finished.sent, finished.total), (3, 3))
+
+    async def _hand_to_other_worker(self, job_id: int, *, lease_until: datetime, sending=()):
+        async with self.session_factory() as session:
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(owner="other-worker", lease_until=lease_until, status="running")
+            )
+            await session.execute(
+                update(BroadcastRecipient)
+                .where(BroadcastRecipient.job_id == job_id, BroadcastRecipient.chat_id.in_(sending))
+                .values(status=db_broadcast.RECIPIENT_SENDING)
+            )
+            await session.commit()
+
+    async def test_job_leased_by_live_worker_is_not_resumed(self):
+        job = await db_broadcast.create_broadcast_job(sender_tg_id=1, text="Salom", chat_ids=[10, 20])
+        await self._hand_to_other_worker(
+            job.id, lease_until=datetime.now(timezone.utc) + timedelta(minutes=5), sending=[10]
+        )
+        bot = FakeBot()
+        engine = self._engine()
+
+        self.assertEqual(await engine.resume_unfinished(bot), 0)
+        await engine.run_job(bot, job.id)
+
+        self.assertEqual(bot.sent, [])
+        async with self.session_factory() as session:
+            statuses = dict(
+                (await session.execute(select(BroadcastRecipient.chat_id, BroadcastRecipient.status))).all()
+            )
+        self.assertEqual(statuses, {10: "sending", 20: "pending"})
+
+    async def test_expired_lease_is_taken_over_and_in_flight_chunk_requeued(self):
+        job = await db_broadcast.create_broadcast_job(sender_tg_id=1, text="Salom", chat_ids=[10, 20])
+        await self._hand_to_other_worker(
+            job.id, lease_until=datetime.now(timezone.utc) - timedelta(seconds=1), sending=[10]
+        )
+        bot = FakeBot()
+        engine = self._engine()
+
+        self.assertEqual(await engine.resume_unfinished(bot), 1)
+        await engine.start(bot, job.id)
+
+        self.assertEqual(bot.sent, [10, 20])
+        finished = await db_broadcast.get_broadcast_job(job.id)
+        self.assertEqual((finished.sent, finished.status, finished.owner), (2, "done", None))
+
+    async def test_live_collection_is_not_closed_by_another_worker(self):
+        job = await db_broadcast.create_broadcast_job(
+            sender_tg_id=1,
+            text="Salom",
+            chat_ids=[10],
+            collecting=True,
+            owner="collector",
+            lease_seconds=60,
+        )
+
+        self.assertEqual(await self._engine().resume_unfinished(FakeBot()), 0)
+        await db_broadcast.add_broadcast_recipients(job.id, [20])
+
+        current = await db_broadcast.get_broadcast_job(job.id)
+        self.assertTrue(current.is_collecting)
+        self.assertEqual((current.owner, current.total), ("collector", 2))
+
+    async def test_recipient_chunk_is_claimed_once(self):
+        job = await db_broadcast.create_broadcast_job(sender_tg_id=1, text="Salom", chat_ids=[10, 20, 30])
+        self.assertEqual(await db_broadcast.claim_broadcast_jobs("w1", 60, job_id=job.id), [job.id])
+
+        first = await db_broadcast.claim_pending_recipients(job.id, "w1", 2)
+        second = await db_broadcast.claim_pending_recipients(job.id, "w1", 2)
+        stranger = await db_broadcast.claim_pending_recipients(job.id, "w2", 2)
+
+        self.assertEqual((first, second, stranger), ([10, 20], [30], []))
+
+    async def test_network_errors_are_retried_with_backoff(self):
+        job = await db_broadcast.create_broadcast_job(sender_tg_id=1, text="Salom", chat_ids=[10, 20])
+        bot = FakeBot(network_errors={10: 2, 20: 10})
+
+        finished = await self._engine(global_rate=100, per_chat_interval=0).run_job(bot, job.id)
+
+        self.assertEqual(bot.sent, [10])
+        self.assertEqual((finished.sent, finished.failed), (1, 1))
+        # 10: 1 + 2 soniya; 20: 1 + 2 + 4 soniya, keyin xatolik sifatida yoziladi
+        self.assertEqual(sorted(s for s in self.clock.sleeps if s >= 1), [1, 1, 2, 2, 4])
+
+    async def test_token_bucket_spaces_sends_at_global_rate(self):
+        job = await db_broadcast.create_broadcast_job(
+            sender_tg_id=1,
+            text="Salom",
+            chat_ids=range(1, 11),
+        )
+
+        await self._engine(global_rate=5).run_job(FakeBot(), job.id)
+
+        # 5 token darhol, qolgan 5 tasi soniyasiga 5 tadan
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from admins import special_message
+from sql.models import Admins, Barbers, OrdinaryUser, User
+from tests.helpers import create_sqlite_db
+
+
+class TargetRecipientStreamTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_sqlite_db(
+            self, Admins, Barbers, User, OrdinaryUser, name="recipients.db"
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(Admins), [{"id": 1, "tg_id": 1}, {"id": 2, "tg_id": 2}])
+            await conn.execute(
+                insert(Barbers),
+                [
+                    {"id": 1, "tg_id": 2, "experience": "3", "work_days": "Har kuni"},
+                    {"id": 2, "tg_id": None, "experience": "1", "work_days": "Har kuni"},
+                ],
+            )
+            await conn.execute(insert(User), [{"id": 1, "tg_id": 3}, {"id": 2, "tg_id": 4}])
+            await conn.execute(insert(OrdinaryUser), [{"tg_id": 4}, {"tg_id": 5}])
+        patcher = patch.object(special_message, "async_session", session_factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_all_target_is_deduplicated_and_streamed_in_chunks(self):
+        chunks = [
+            chunk
+            async for chunk in special_message._iter_target_tg_id_chunks(
+                special_message.SPECIAL_MSG_ALL_CB,
+                chunk_size=2,
+            )
+        ]
+
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+        recipients = [tg_id for chunk in chunks for tg_id in chunk]
+        self.assertCountEqual(recipients, [1, 2, 3, 4, 5])
+
+    def test_all_target_uses_single_union_query(self):
+        query = special_message._target_tg_ids_query(special_message.SPECIAL_MSG_ALL_CB)
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        self.assertEqual(sql.count("UNION SELECT"), 3)
+        self.assertNotIn("UNION ALL", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
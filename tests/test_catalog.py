@@ -0,0 +1,123 @@
+import unittest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import update
+
+from sql import db_barber_profile, db_catalog
+from sql.models import CatalogVersion
+from tests.helpers import create_sqlite_db
+from utils.service_pricing import build_service_price_lines
+
+
+def make_snapshot(version, *, offerings=()):
+    return db_catalog.CatalogSnapshot(
+        version=version,
+        loaded_at=db_catalog.monotonic(),
+        services=(SimpleNamespace(id=10, name="Soch olish"),),
+        barbers=(),
+        barbers_by_id={},
+        offerings_by_service={10: tuple(offerings)},
+        photo_by_barber={},
+        hidden_fields_by_barber={},
+    )
+
+
+class CatalogCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        db_catalog._catalog = None
+        self.addCleanup(setattr, db_catalog, "_catalog", None)
+        self.engine, self.session_factory = await create_sqlite_db(self, CatalogVersion, name="catalog.db")
+        patcher = patch.object(db_catalog, "async_session", self.session_factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_navigation_reuses_snapshot_until_version_bump(self):
+        load_mock = AsyncMock(side_effect=lambda version: make_snapshot(version))
+
+        with patch.object(db_catalog, "_load_catalog_snapshot", load_mock):
+            await db_catalog.get_catalog_services()
+            await db_catalog.get_catalog_services()
+            self.assertEqual(load_mock.await_count, 1)
+
+            self.assertEqual(await db_catalog.bump_catalog_version(), 1)
+            services = await db_catalog.get_catalog_services()
+
+        self.assertEqual(load_mock.await_count, 2)
+        self.assertEqual([service.id for service in services], [10])
+
+    async def test_bump_from_another_worker_invalidates_snapshot(self):
+        load_mock = AsyncMock(side_effect=lambda version: make_snapshot(version))
+        await db_catalog.bump_catalog_version()
+
+        with patch.object(db_catalog, "_load_catalog_snapshot", load_mock):
+            await db_catalog.get_catalog()
+            # Boshqa worker: faqat bazadagi versiya oshadi, shu jarayon keshi tegilmaydi
+            async with self.session_factory() as session:
+                await session.execute(update(CatalogVersion).values(version=CatalogVersion.version + 1))
+                await session.commit()
+            snapshot = await db_catalog.get_catalog()
+
+        self.assertEqual(load_mock.await_count, 2)
+        self.assertEqual(snapshot.version, 2)
+
+    async def test_catalog_offerings_are_immutable_snapshots(self):
+        offering = db_catalog.CatalogOffering(
+            id=1,
+            barber_id=20,
+            service_id=10,
+            price=50000,
+            duration_minutes=30,
+            barber=None,
+            service=None,
+            price_snapshot=db_catalog.build_price_snapshot(
+                50000, discount_percent=Decimal("10"), discounted_price=45000
+            ),
+        )
+
+        self.assertIn("💸 <b>Chegirmali narx:</b> 45 000 so'm", build_service_price_lines(offering))
+        with self.assertRaises(AttributeError):
+            offering.price = 1
+
+    async def test_offerings_skip_paused_barbers(self):
+        active = SimpleNamespace(id=1, barber=SimpleNamespace(id=20, is_paused=False))
+        paused = SimpleNamespace(id=2, barber=SimpleNamespace(id=21, is_paused=True))
+        load_mock = AsyncMock(
+            side_effect=lambda version: make_snapshot(version, offerings=(active, paused))
+        )
+
+        with patch.object(db_catalog, "_load_catalog_snapshot", load_mock):
+            offerings = await db_catalog.get_catalog_offerings("10")
+            all_offerings = await db_catalog.get_catalog_offerings(10, include_paused=True)
+
+        self.assertEqual(offerings, [active])
+        self.assertEqual(all_offerings, [active, paused])
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return list(self.rows)
+
+
+class BarberCardsBatchTests(unittest.IsolatedAsyncioTestCase):
+    async def test_cards_load_in_one_statement(self):
+        barber = SimpleNamespace(id=20)
+        session = SimpleNamespace(
+            execute=AsyncMock(return_value=FakeResult([(barber, "photo-id", ["phone", "bogus"])]))
+        )
+
+        cards = await db_barber_profile.load_barber_cards(["20", 20, None], session=session)
+
+        session.execute.assert_awaited_once()
+        statement = str(session.execute.await_args.args[0])
+        self.assertIn("LATERAL", statement)
+        self.assertEqual(cards[20].photo, "photo-id")
+        self.assertEqual(cards[20].hidden_fields, frozenset({"phone"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
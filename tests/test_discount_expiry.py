@@ -0,0 +1,43 @@
+import unittest
+from datetime import date, datetime, time
+
+from sql.db_barber_services import SERVICE_DISCOUNT_TIMEZONE, ServiceDiscountExpiryScheduler
+
+
+def local_dt(hour, minute=0):
+    return datetime(2026, 5, 11, hour, minute, tzinfo=SERVICE_DISCOUNT_TIMEZONE)
+
+
+class ServiceDiscountExpirySchedulerTests(unittest.TestCase):
+    def test_next_deadline_skips_discarded_and_rescheduled_items(self):
+        scheduler = ServiceDiscountExpiryScheduler()
+        scheduler.schedule(1, date(2026, 5, 11), time(10, 0))
+        scheduler.schedule(2, date(2026, 5, 11), time(11, 0))
+        scheduler.schedule(3, date(2026, 5, 11), time(12, 0))
+
+        scheduler.discard(1)
+        scheduler.schedule(2, date(2026, 5, 11), time(13, 0))
+
+        self.assertEqual(scheduler.next_deadline(), local_dt(12))
+
+    def test_pop_due_only_reports_expired_items(self):
+        scheduler = ServiceDiscountExpiryScheduler()
+        scheduler.schedule(1, date(2026, 5, 11), time(10, 0))
+        scheduler.schedule(2, date(2026, 5, 11), time(12, 0))
+
+        self.assertFalse(scheduler.pop_due(local_dt(9, 59)))
+        self.assertTrue(scheduler.pop_due(local_dt(10, 0)))
+        self.assertFalse(scheduler.pop_due(local_dt(10, 30)))
+        self.assertEqual(scheduler.next_deadline(), local_dt(12))
+
+    def test_clear_drops_all_deadlines(self):
+        scheduler = ServiceDiscountExpiryScheduler()
+        scheduler.schedule(1, date(2026, 5, 11), time(10, 0))
+        scheduler.clear()
+
+        self.assertIsNone(scheduler.next_deadline())
+        self.assertFalse(scheduler.pop_due(local_dt(23)))
+
+
+if __name__ == "__main__":
+    unittest.main()
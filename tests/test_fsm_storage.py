@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import insert, select
+
+from sql.db_fsm_storage import DatabaseEventIsolation, DatabaseStorage
+from sql.models import FsmEventLock, FsmStorageRecord
+from tests.helpers import create_sqlite_db
+
+
+class DatabaseStorageTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(self, FsmStorageRecord, name="fsm.db")
+        self.key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def test_state_and_data_survive_new_storage_instance(self):
+        storage = DatabaseStorage(self.session_factory)
+        await storage.set_state(self.key, "UserState:waiting_for_date")
+        await storage.set_data(self.key, {"service_id": "10"})
+        await storage.update_data(self.key, {"barber_id": "3"})
+
+        restarted = DatabaseStorage(self.session_factory)
+        self.assertEqual(await restarted.get_state(self.key), "UserState:waiting_for_date")
+        self.assertEqual(
+            await restarted.get_data(self.key),
+            {"service_id": "10", "barber_id": "3"},
+        )
+
+    async def test_expired_state_is_not_returned_or_resurrected(self):
+        expired = DatabaseStorage(self.session_factory, ttl=timedelta(seconds=-1))
+        await expired.set_state(self.key, "UserState:waiting_for_time")
+        await expired.set_data(self.key, {"date": "2026-05-11"})
+
+        storage = DatabaseStorage(self.session_factory)
+        self.assertIsNone(await storage.get_state(self.key))
+        self.assertEqual(await storage.get_data(self.key), {})
+
+        await storage.set_data(self.key, {"fullname": "Ali"})
+        self.assertIsNone(await storage.get_state(self.key))
+        self.assertEqual(await storage.get_data(self.key), {"fullname": "Ali"})
+
+        self.assertEqual(await storage.purge_expired(), 0)
+
+
+class DatabaseEventIsolationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(self, FsmEventLock, name="locks.db")
+        self.key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    def _isolation(self, **kwargs) -> DatabaseEventIsolation:
+        return DatabaseEventIsolation(self.session_factory, poll_interval=0.005, **kwargs)
+
+    async def _lock_rows(self):
+        async with self.session_factory() as session:
+            return (await session.execute(select(FsmEventLock.key))).scalars().all()
+
+    async def _run_two(self, first, second):
+        events = []
+
+        async def handle(isolation, name: str):
+            async with isolation.lock(self.key):
+                events.append(f"{name}:start")
+                await asyncio.sleep(0.02)
+                events.append(f"{name}:end")
+
+        await asyncio.gather(handle(first, "a"), handle(second, "b"))
+        return events
+
+    async def test_same_key_updates_run_one_at_a_time(self):
+        isolation = self._isolation()
+
+        events = await self._run_two(isolation, isolation)
+
+        self.assertEqual(events, ["a:start", "a:end", "b:start", "b:end"])
+        # Bo'shagan kalit lug'atda ham, bazada ham qolmaydi
+        self.assertEqual(isolation._locks, {})
+        self.assertEqual(await self._lock_rows(), [])
+
+    async def test_lock_is_shared_across_processes(self):
+        # Ikki alohida instance — ikki worker jarayoni kabi, umumiy baza orqali
+        events = await self._run_two(self._isolation(), self._isolation())
+
+        self.assertEqual(events, ["a:start", "a:end", "b:start", "b:end"])
+        self.assertEqual(await self._lock_rows(), [])
+
+    async def test_stale_lock_of_dead_worker_expires(self):
+        isolation = self._isolation()
+        lock_key = isolation._key_builder.build(self.key, "lock")
+        async with self.session_factory() as session:
+            await session.execute(
+                insert(FsmEventLock).values(
+                    key=lock_key,
+                    owner="dead-worker",
+                    locked_until=datetime.now(timezone.utc) + timedelta(seconds=0.05),
+                )
+            )
+            await session.commit()
+
+        async with isolation.lock(self.key):
+            pass
+
+        self.assertEqual(await self._lock_rows(), [])
+        self.assertEqual(await isolation.purge_expired(), 0)
+
+    async def test_waiting_for_a_held_lock_times_out(self):
+        holder = self._isolation(timeout=timedelta(seconds=5))
+        waiter = self._isolation(timeout=timedelta(seconds=0.05))
+
+        async with holder.lock(self.key):
+            with self.assertRaises(TimeoutError):
+                async with waiter.lock(self.key):
+                    pass
+
+        self.assertEqual(waiter._locks, {})
+        self.assertEqual(await self._lock_rows(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, func, select
+from sqlalchemy.dialects import postgresql
+
+from sql import db_order_queries
+from sql.models import Order
+
+NOW = datetime(2026, 5, 11, 14, 30)
+
+
+def _compile(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+class OrderQueryTypingTests(unittest.TestCase):
+    def _statements(self):
+        barber_filter = db_order_queries.barber_orders_filter("7")
+        return [
+            db_order_queries.barber_day_orders_query("7", date(2026, 5, 11)),
+            db_order_queries.barber_orders_query(7),
+            db_order_queries.barber_client_ids_query("7"),
+            select(func.count(Order.id))
+            .where(barber_filter)
+            .where(db_order_queries.upcoming_condition(NOW)),
+            select(func.count(Order.id))
+            .where(barber_filter)
+            .where(db_order_queries.completed_condition(NOW)),
+        ]
+
+    def test_panel_queries_compile_without_casts(self):
+        for statement in self._statements():
+            sql = str(_compile(statement))
+            with self.subTest(sql=sql):
+                self.assertNotIn("CAST", sql.upper())
+                self.assertNotIn("::", sql)
+
+    def test_barber_id_is_bound_as_integer(self):
+        for statement in self._statements():
+            compiled = _compile(statement)
+            barber_binds = [
+                name for name, bind in compiled.binds.items() if name.startswith("barber_id")
+            ]
+            with self.subTest(sql=str(compiled)):
+                self.assertTrue(barber_binds)
+                for name in barber_binds:
+                    self.assertIsInstance(compiled.binds[name].type, BigInteger)
+                    self.assertEqual(compiled.params[name], 7)
+                    self.assertIsInstance(compiled.params[name], int)
+
+
+class SearchConditionTests(unittest.TestCase):
+    def test_phone_search_uses_digit_column(self):
+        digits = db_order_queries.phone_digits("+998 (90) 123-45")
+        sql = str(_compile(db_order_queries.phone_search_condition(digits)))
+
+        self.assertEqual(digits, "9989012345")
+        self.assertEqual(sql, "orders.phone_digits LIKE %(phone_digits_1)s")
+
+    def test_weekday_condition_matches_index_expression(self):
+        index = next(index for index in Order.__table__.indexes if index.name == "ix_orders_user_weekday")
+        index_expression = str(index.expressions[1])
+        sql = str(_compile(db_order_queries.weekday_condition(2)))
+
+        self.assertEqual(sql, "EXTRACT(dow FROM orders.date) = %(param_1)s")
+        self.assertEqual(index_expression, "EXTRACT(dow FROM date)")
+
+
+if __name__ == "__main__":
+    unittest.main()
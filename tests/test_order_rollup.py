@@ -0,0 +1,124 @@
+import unittest
+from datetime import date, datetime, time
+from unittest.mock import patch
+
+from sqlalchemy import insert, select
+
+from sql import db_order_utils
+from sql.db_order_rollup import apply_order_stats_delta, backfill_order_stats
+from sql.db_order_stats import get_overall_order_stats
+from sql.models import Barbers, DailyOrderStat, Order, OrderUserStat
+from tests.helpers import create_sqlite_db
+
+NOW = datetime(2026, 5, 11, 14, 30)
+TODAY = NOW.date()
+
+
+def _order_row(order_id: int, barber_id: int | None, user_id: int, order_date: date, order_time: time) -> dict:
+    return {
+        "id": order_id,
+        "user_id": user_id,
+        "fullname": "Client",
+        "phonenumber": "+998900000000",
+        "barber_id": barber_id,
+        "service_id": None,
+        "service_name": "Soch olish",
+        "barber_id_name": str(barber_id),
+        "barber_name": "Barber",
+        "booked_price": 50000,
+        "booked_duration_minutes": 30,
+        "date": order_date,
+        "time": order_time,
+        "booked_date": date(2026, 5, 1) if order_id % 2 else TODAY,
+        "booked_time": time(9, 0),
+    }
+
+
+ORDER_ROWS = [
+    _order_row(1, 1, 10, date(2026, 4, 1), time(10, 0)),
+    _order_row(2, 1, 11, TODAY, time(10, 0)),
+    _order_row(3, 1, 10, TODAY, time(16, 0)),
+    _order_row(4, 2, 12, TODAY, time(11, 0)),
+    _order_row(5, 2, 12, date(2026, 5, 20), time(10, 0)),
+    _order_row(6, None, 13, date(2026, 5, 20), time(12, 0)),
+]
+
+
+class OrderRollupTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(
+            self, Barbers, Order, DailyOrderStat, OrderUserStat, name="rollup.db"
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(Barbers),
+                [
+                    {"id": 1, "experience": "3", "work_days": "Har kuni", "is_paused": False},
+                    {"id": 2, "experience": "3", "work_days": "Har kuni", "is_paused": False},
+                ],
+            )
+
+        # Yozish yo'li: har bir buyurtma qo'shilganda delta
+        async with self.session_factory() as session:
+            for row in ORDER_ROWS:
+                order = Order(**row)
+                session.add(order)
+                await session.flush()
+                await apply_order_stats_delta(session, [order], sign=1)
+            await session.commit()
+
+    async def _snapshot(self):
+        async with self.session_factory() as session:
+            days = (
+                await session.execute(
+                    select(
+                        DailyOrderStat.day,
+                        DailyOrderStat.barber_id,
+                        DailyOrderStat.service_id,
+                        DailyOrderStat.order_count,
+                        DailyOrderStat.revenue,
+                        DailyOrderStat.minutes_booked,
+                    )
+                    .where(DailyOrderStat.order_count != 0)
+                    .order_by(DailyOrderStat.day, DailyOrderStat.barber_id)
+                )
+            ).all()
+            users = (
+                await session.execute(
+                    select(OrderUserStat.user_id, OrderUserStat.order_count)
+                    .where(OrderUserStat.order_count != 0)
+                    .order_by(OrderUserStat.user_id)
+                )
+            ).all()
+        return [tuple(row) for row in days], [tuple(row) for row in users]
+
+    async def test_incremental_updates_match_backfill_after_cancellation(self):
+        with (
+            patch.object(db_order_utils, "async_session", self.session_factory),
+            patch.object(db_order_utils, "invalidate_barber_day"),
+        ):
+            cancelled = await db_order_utils.cancel_barber_day_orders(1, TODAY)
+        self.assertEqual(len(cancelled), 2)
+
+        incremental = await self._snapshot()
+        await backfill_order_stats(self.session_factory)
+
+        self.assertEqual(incremental, await self._snapshot())
+        self.assertIn((TODAY, 2, 0, 1, 50000, 30), incremental[0])
+        self.assertNotIn(11, [user_id for user_id, _ in incremental[1]])
+
+    async def test_overall_panel_reads_rollup_plus_today_delta(self):
+        async with self.session_factory() as session:
+            stats = await get_overall_order_stats(now=NOW, session=session)
+
+        self.assertEqual(stats.total, 6)
+        self.assertEqual(stats.revenue, 300000)
+        self.assertEqual(stats.queue_users, 4)
+        self.assertEqual(stats.booked_today, 3)
+        self.assertEqual((stats.today_completed, stats.today_upcoming), (2, 1))
+        # Kelasi kunlar (yig'madan) + bugun hali boshlanmaganlar (orders'dan)
+        self.assertEqual(stats.upcoming, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from datetime import date, datetime, time
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from sql.db_order_stats import build_barber_stats_query, get_barber_order_stats
+from sql.models import Order, Services
+from tests.helpers import create_sqlite_db
+
+NOW = datetime(2026, 5, 11, 14, 30)
+
+
+def _order_row(order_id: int, barber_id: int, user_id: int, service_id: int, order_date: date, order_time: time) -> dict:
+    return {
+        "id": order_id,
+        "user_id": user_id,
+        "fullname": "Client",
+        "phonenumber": "+998900000000",
+        "barber_id": barber_id,
+        "service_id": service_id,
+        "service_name": "Soch olish",
+        "barber_id_name": str(barber_id),
+        "barber_name": "Barber",
+        "booked_price": 50000,
+        "booked_duration_minutes": 30,
+        "date": order_date,
+        "time": order_time,
+        "booked_date": date(2026, 5, 1),
+        "booked_time": time(9, 0),
+    }
+
+
+class BarberOrderStatsTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(self, Services, Order, name="stats.db")
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(Services),
+                [{"id": 1, "name": "Soch olish"}, {"id": 2, "name": "Soqol"}],
+            )
+            await conn.execute(
+                insert(Order),
+                [
+                    _order_row(1, 1, 10, 2, date(2026, 5, 1), time(10, 0)),
+                    _order_row(2, 1, 11, 2, date(2026, 5, 9), time(10, 0)),
+                    _order_row(3, 1, 10, 1, date(2026, 5, 11), time(12, 0)),
+                    _order_row(4, 1, 12, 2, date(2026, 5, 11), time(16, 0)),
+                    _order_row(5, 1, 12, 1, date(2026, 5, 13), time(10, 0)),
+                    _order_row(6, 2, 13, 1, date(2026, 5, 11), time(10, 0)),
+                ],
+            )
+
+    def test_statement_is_a_single_filtered_aggregate(self):
+        sql = str(build_barber_stats_query(1, NOW).compile(dialect=postgresql.dialect()))
+
+        self.assertEqual(sql.count("SELECT"), 3)
+        self.assertIn("FILTER (WHERE", sql)
+        self.assertIn("LEFT OUTER JOIN services ON services.id = top_service.service_id", sql)
+        self.assertNotIn("CAST", sql.upper())
+
+    async def test_counters_and_top_service_are_returned_together(self):
+        async with self.session_factory() as session:
+            stats = await get_barber_order_stats(1, now=NOW, session=session)
+
+        self.assertEqual(stats.total, 5)
+        self.assertEqual(stats.today, 2)
+        self.assertEqual(stats.booked_today, 0)
+        self.assertEqual((stats.today_completed, stats.today_upcoming), (1, 1))
+        self.assertEqual(stats.upcoming, 2)
+        self.assertEqual((stats.pending_days, stats.past_days), (3, 2))
+        self.assertEqual((stats.last_7_days, stats.last_30_days), (3, 4))
+        self.assertEqual(stats.unique_users, 3)
+        self.assertEqual(
+            (stats.top_service_id, stats.top_service_name, stats.top_service_count),
+            (2, "Soqol", 3),
+        )
+
+    async def test_barber_without_orders_gets_zeroes(self):
+        async with self.session_factory() as session:
+            stats = await get_barber_order_stats(99, now=NOW, session=session)
+
+        self.assertEqual(stats.total, 0)
+        self.assertIsNone(stats.top_service_name)
+        self.assertEqual(stats.top_service_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
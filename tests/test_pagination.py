@@ -0,0 +1,137 @@
+import unittest
+from datetime import date, time, timedelta
+
+from sqlalchemy import case, delete, event, insert, select
+
+from sql import db_pagination
+from sql.models import Order
+from tests.helpers import create_sqlite_db
+
+START_DAY = date(2026, 5, 1)
+ORDER_COUNT = 47
+
+
+def _order_row(order_id: int) -> dict:
+    # Bir xil (date, time) juftliklari ko'p: tartibni faqat id ajratadi
+    order_date = START_DAY + timedelta(days=order_id % 6)
+    order_time = time(10 + order_id % 3, 0)
+    return {
+        "id": order_id,
+        "user_id": 100,
+        "fullname": "Client",
+        "phonenumber": "+998900000000",
+        "barber_id": 1,
+        "service_name": "Soch olish",
+        "barber_id_name": "1",
+        "barber_name": "Barber",
+        "booked_price": 50000,
+        "booked_duration_minutes": 30,
+        "date": order_date,
+        "time": order_time,
+        "booked_date": START_DAY,
+        "booked_time": time(9, 0),
+    }
+
+
+class KeysetPaginationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(self, Order, name="pages.db")
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(Order), [_order_row(i) for i in range(1, ORDER_COUNT + 1)])
+        db_pagination.invalidate_order_pages()
+        self.addCleanup(db_pagination.invalidate_order_pages)
+
+    async def _expected_ids(self, ordering) -> list[int]:
+        async with self.session_factory() as session:
+            return list((await session.execute(select(Order.id).order_by(*ordering))).scalars())
+
+    async def _walk(self, pages, *, page_size, sort_keys, descending=False, scope="walk"):
+        seen = []
+        async with self.session_factory() as session:
+            for page in pages:
+                order_page = await db_pagination.fetch_keyset_page(
+                    session,
+                    select(Order).where(Order.barber_id == 1),
+                    sort_keys,
+                    scope=scope,
+                    page=page,
+                    page_size=page_size,
+                    descending=descending,
+                )
+                seen.append(order_page)
+        return seen
+
+    async def test_jumps_return_the_same_rows_as_offset_pagination(self):
+        sort_keys = [Order.date, Order.time, Order.id]
+        expected = await self._expected_ids(sort_keys)
+        # ±1, ±5, ±10, oxirgi sahifa va chegaradan tashqari
+        pages = [1, 2, 7, 17, 12, 11, 47, 37, 36, 99, 0, 6]
+
+        for page_size in (1, 3):
+            with self.subTest(page_size=page_size):
+                db_pagination.invalidate_order_pages()
+                for order_page in await self._walk(pages, page_size=page_size, sort_keys=sort_keys):
+                    start = (order_page.page - 1) * page_size
+                    self.assertEqual(
+                        [order.id for order in order_page.items],
+                        expected[start:start + page_size],
+                    )
+                    self.assertEqual(order_page.total, ORDER_COUNT)
+
+    async def test_descending_and_expression_keys(self):
+        rank = case((Order.date == START_DAY, 0), else_=1)
+        descending_keys = [Order.date, Order.time, Order.id]
+        expected_desc = await self._expected_ids([key.desc() for key in descending_keys])
+        expected_rank = await self._expected_ids([rank, Order.date, Order.time, Order.id])
+
+        desc_pages = await self._walk(
+            [1, 11, 6, 5, 47], page_size=1, sort_keys=descending_keys, descending=True, scope="desc"
+        )
+        rank_pages = await self._walk(
+            [1, 2, 12, 7, 8],
+            page_size=1,
+            sort_keys=[rank, Order.date, Order.time, Order.id],
+            scope="rank",
+        )
+
+        self.assertEqual(
+            [page.items[0].id for page in desc_pages],
+            [expected_desc[i - 1] for i in (1, 11, 6, 5, 47)],
+        )
+        self.assertEqual(
+            [page.items[0].id for page in rank_pages],
+            [expected_rank[i - 1] for i in (1, 2, 12, 7, 8)],
+        )
+
+    async def test_short_page_from_cached_scope_is_recounted_once(self):
+        sort_keys = [Order.date, Order.time, Order.id]
+        statements = []
+        await self._walk([1], page_size=10, sort_keys=sort_keys)
+
+        # Boshqa jarayon qatorlarni o'chirdi: keshdagi jami son (47) eskirgan
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(Order).where(Order.id > 12))
+        expected = await self._expected_ids(sort_keys)
+
+        event.listen(
+            self.engine.sync_engine,
+            "before_cursor_execute",
+            lambda _conn, _cursor, statement, *_args: statements.append(statement),
+        )
+        last_page, = await self._walk([2], page_size=10, sort_keys=sort_keys)
+
+        self.assertEqual((last_page.total, last_page.total_pages, last_page.page), (12, 2, 2))
+        self.assertEqual([order.id for order in last_page.items], expected[10:])
+        self.assertEqual(sum("count(*)" in statement for statement in statements), 1)
+
+    def test_plan_seeks_from_the_nearest_known_page(self):
+        anchors = {10: ("k10",), 11: ("k11",)}
+
+        self.assertEqual(db_pagination._plan(15, 1, 1000, 1000, anchors), ("forward", ("k11",), 4))
+        self.assertEqual(db_pagination._plan(5, 1, 1000, 1000, anchors), ("forward", None, 4))
+        self.assertEqual(db_pagination._plan(8, 1, 1000, 1000, anchors), ("backward", ("k10",), 1))
+        self.assertEqual(db_pagination._plan(995, 1, 1000, 1000, anchors), ("backward", None, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
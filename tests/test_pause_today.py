@@ -0,0 +1,108 @@
+import unittest
+from datetime import date, time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import insert, select
+
+from sql import db_order_utils
+from sql.db_order_utils import CancelledOrder
+from sql.models import Barbers, DailyOrderStat, Order, OrderUserStat
+from superadmins import pause_today
+from tests.helpers import FakeBot, create_sqlite_db
+from utils.broadcast import BroadcastEngine
+
+TODAY = date(2026, 5, 11)
+
+
+def _order_row(order_id: int, barber_id: int, order_date: date, order_time: time) -> dict:
+    return {
+        "id": order_id,
+        "user_id": 100 + order_id,
+        "fullname": "Client",
+        "phonenumber": "+998900000000",
+        "barber_id": barber_id,
+        "service_name": "Soch olish",
+        "barber_id_name": str(barber_id),
+        "barber_name": "Barber",
+        "booked_price": 50000,
+        "booked_duration_minutes": 30,
+        "date": order_date,
+        "time": order_time,
+        "booked_date": order_date,
+        "booked_time": order_time,
+    }
+
+
+class CancelBarberDayOrdersTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(
+            self, Barbers, Order, DailyOrderStat, OrderUserStat, name="orders.db"
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(Barbers),
+                [{"id": 1, "experience": "3", "work_days": "Har kuni", "is_paused": False}],
+            )
+            await conn.execute(
+                insert(Order),
+                [
+                    _order_row(1, 1, TODAY, time(12, 0)),
+                    _order_row(2, 1, TODAY, time(10, 0)),
+                    _order_row(3, 1, date(2026, 5, 12), time(10, 0)),
+                    _order_row(4, 2, TODAY, time(10, 0)),
+                ],
+            )
+        patcher = patch.object(db_order_utils, "async_session", self.session_factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_only_that_barber_day_is_deleted_and_returned(self):
+        with (
+            patch.object(db_order_utils, "invalidate_barber_schedule") as invalidate_mock,
+            patch.object(db_order_utils, "bump_catalog_version"),
+        ):
+            cancelled = await db_order_utils.cancel_barber_day_orders(1, TODAY, pause_barber=True)
+
+        self.assertEqual([order.order_id for order in cancelled], [2, 1])
+        self.assertEqual(cancelled[0].user_id, 102)
+        invalidate_mock.assert_called_once_with(1)
+
+        async with self.session_factory() as session:
+            remaining = (await session.execute(select(Order.id).order_by(Order.id))).scalars().all()
+            barber = await session.get(Barbers, 1)
+        self.assertEqual(remaining, [3, 4])
+        self.assertTrue(barber.is_paused)
+
+
+class PauseCancellationPipelineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_report_lists_delivered_and_failed_apologies(self):
+        cancelled = [
+            CancelledOrder(1, 101, TODAY, time(10, 0), "Soch olish"),
+            CancelledOrder(2, 102, TODAY, time(11, 0), "Soqol"),
+        ]
+        bot = FakeBot(forbidden={102})
+        cancel_mock = AsyncMock(return_value=cancelled)
+
+        with (
+            patch.object(pause_today, "cancel_barber_day_orders", cancel_mock),
+            patch.object(pause_today, "broadcast_engine", BroadcastEngine(global_rate=100)),
+        ):
+            report = await pause_today.cancel_today_orders_with_apology(
+                bot,
+                SimpleNamespace(id=7),
+                "Uzr, bugun ishlamayman.",
+                day=TODAY,
+            )
+
+        cancel_mock.assert_awaited_once_with(7, TODAY, pause_barber=True)
+        self.assertEqual(report.delivered, (1,))
+        self.assertEqual(set(report.failed), {2})
+        self.assertIn("Uzr, bugun ishlamayman.", bot.messages[0][1])
+        report_text = pause_today._build_cancellation_report_text(report)
+        self.assertIn("Xabar yuborildi: 1", report_text)
+        self.assertIn("🕒 11:00 - ✂️ Soqol", report_text)
+
+
+if __name__ == "__main__":
+    unittest.main()
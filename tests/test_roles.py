@@ -0,0 +1,101 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import delete, event, insert, update
+
+from sql import db_barbers, db_roles
+from sql.db_roles import RoleCache
+from sql.models import Admins, Barbers, User
+from superadmins.superadmin import get_barber_by_tg_id
+from tests.helpers import FakeClock, create_sqlite_db
+from utils.role_middleware import RoleMiddleware
+
+
+class RoleCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(
+            self, Admins, Barbers, User, name="roles.db"
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(Admins), [{"id": 1, "tg_id": 10, "admin_fullname": "Admin"}])
+            await conn.execute(
+                insert(Barbers),
+                [{"id": 1, "tg_id": 20, "experience": "3", "work_days": "Har kuni", "is_paused": False}],
+            )
+            await conn.execute(insert(User), [{"id": 1, "tg_id": 30, "fullname": "Client", "phone": "+998900000000"}])
+
+        self.statements = 0
+
+        def count_statement(*_args):
+            self.statements += 1
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", count_statement)
+        self.clock = FakeClock()
+        self.cache = RoleCache(self.session_factory, ttl=60, clock=self.clock)
+
+    async def test_roles_are_resolved_once_until_invalidated_or_expired(self):
+        admin = await self.cache.resolve(10)
+        barber = await self.cache.resolve(20)
+        client = await self.cache.resolve(30)
+        loaded = self.statements
+
+        self.assertTrue(admin.is_admin and not admin.is_barber)
+        self.assertEqual((barber.is_barber, barber.barber_id), (True, 1))
+        self.assertTrue(client.is_registered and not client.is_admin)
+
+        self.assertIs(await self.cache.resolve(10), admin)
+        self.assertEqual(self.statements, loaded)
+
+        async with self.session_factory() as session:
+            await session.execute(delete(Admins).where(Admins.tg_id == 10))
+            await session.commit()
+        self.cache.invalidate(10)
+        self.assertFalse((await self.cache.resolve(10)).is_admin)
+        # Boshqa foydalanuvchilar keshda qoladi
+        statements = self.statements
+        await self.cache.resolve(20)
+        self.assertEqual(self.statements, statements)
+
+        self.clock.now = 61
+        await self.cache.resolve(20)
+        self.assertGreater(self.statements, statements)
+
+    async def test_expired_entries_are_evicted(self):
+        await self.cache.resolve(10)
+        await self.cache.resolve(20)
+
+        self.clock.now = 61
+        await self.cache.resolve(30)
+
+        self.assertEqual(set(self.cache._entries), {30})
+
+    async def test_barber_row_is_loaded_fresh_behind_cached_id(self):
+        with patch.object(db_roles, "role_cache", self.cache), patch.object(
+            db_barbers, "async_session", self.session_factory
+        ):
+            before = await get_barber_by_tg_id(20)
+            # Boshqa worker barberni pauzaga qo'ydi: rollar keshi invalidatsiya qilinmaydi
+            async with self.session_factory() as session:
+                await session.execute(update(Barbers).where(Barbers.id == 1).values(is_paused=True))
+                await session.commit()
+            after = await get_barber_by_tg_id(20)
+            missing = await get_barber_by_tg_id(30)
+
+        self.assertEqual((before.is_paused, after.is_paused), (False, True))
+        self.assertIsNone(missing)
+
+    async def test_middleware_injects_roles_into_handler_data(self):
+        middleware = RoleMiddleware(self.cache)
+        handler = AsyncMock(return_value="ok")
+
+        result = await middleware(handler, SimpleNamespace(), {"event_from_user": SimpleNamespace(id=20)})
+        await middleware(handler, SimpleNamespace(), {})
+
+        self.assertEqual(result, "ok")
+        self.assertTrue(handler.await_args_list[0].args[1]["roles"].is_barber)
+        self.assertNotIn("roles", handler.await_args_list[1].args[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import Column, MetaData, String, select
+from sqlalchemy.dialects import postgresql
+
+from sql.db import Base
+from sql.models import SchemaVersion
+from tests.helpers import create_sqlite_db
+from utils import auto_migrate
+
+
+def _metadata_with_extra_column() -> MetaData:
+    metadata = MetaData()
+    for table in Base.metadata.tables.values():
+        table.to_metadata(metadata)
+    metadata.tables["users"].append_column(Column("nickname", String(50)))
+    return metadata
+
+
+class SchemaFingerprintTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, _ = await create_sqlite_db(self, name="schema.db")
+        # auto_migrate'ning o'zi Postgres katalogiga bog'liq: bu yerda faqat chaqirilishi tekshiriladi
+        patcher = patch.object(auto_migrate, "auto_migrate", AsyncMock())
+        self.auto_migrate_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _migrate(self, metadata=Base.metadata, **kwargs) -> bool:
+        async with self.engine.begin() as conn:
+            return await auto_migrate.migrate_if_changed(conn, metadata, **kwargs)
+
+    def test_fingerprint_is_stable_and_tracks_model_changes(self):
+        fingerprint = auto_migrate.metadata_fingerprint(Base.metadata)
+
+        self.assertEqual(fingerprint, auto_migrate.metadata_fingerprint(Base.metadata))
+        self.assertNotEqual(
+            fingerprint, auto_migrate.metadata_fingerprint(_metadata_with_extra_column())
+        )
+
+    async def test_unchanged_schema_skips_auto_migrate(self):
+        self.assertTrue(await self._migrate())
+        self.assertFalse(await self._migrate())
+        self.assertEqual(self.auto_migrate_mock.await_count, 1)
+
+        self.assertTrue(await self._migrate(force=True))
+        self.assertTrue(await self._migrate(_metadata_with_extra_column()))
+        self.assertEqual(self.auto_migrate_mock.await_count, 3)
+
+        async with self.engine.connect() as conn:
+            stored = (await conn.execute(select(SchemaVersion.id, SchemaVersion.fingerprint))).all()
+        self.assertEqual(
+            stored, [(1, auto_migrate.metadata_fingerprint(_metadata_with_extra_column()))]
+        )
+
+    async def test_postgres_takes_advisory_lock_before_reading_version(self):
+        conn = MagicMock()
+        conn.dialect = postgresql.dialect()
+        conn.execute = AsyncMock()
+        conn.run_sync = AsyncMock(return_value=True)
+        conn.scalar = AsyncMock(return_value=auto_migrate.metadata_fingerprint(Base.metadata))
+
+        self.assertFalse(await auto_migrate.migrate_if_changed(conn, Base.metadata))
+
+        (lock_call,) = conn.execute.await_args_list
+        self.assertEqual(str(lock_call.args[0]), "SELECT pg_advisory_xact_lock(:key)")
+        self.assertEqual(lock_call.args[1], {"key": auto_migrate.SCHEMA_MIGRATION_LOCK_KEY})
+        self.auto_migrate_mock.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from datetime import date, time
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import insert, select
+
+from sql import db_temporary_orders
+from sql.models import (
+    BarberServiceDiscounts,
+    BarberServices,
+    Barbers,
+    DailyOrderStat,
+    Order,
+    OrderUserStat,
+    Services,
+    TemporaryOrder,
+)
+from tests.helpers import create_sqlite_db
+
+
+def _draft(**overrides) -> dict:
+    draft = {
+        "user_id": 1,
+        "current_state": "UserState:waiting_for_time",
+        "is_for_other": False,
+        "selected_barber_locked": False,
+        "fullname": "Ali",
+        "phonenumber": "+998901234567",
+        "service_id": "10",
+        "barber_id": "20",
+        "barber_service_id": None,
+        "date": "2026-05-11",
+        "time": "11:00",
+    }
+    draft.update(overrides)
+    return draft
+
+
+class TemporaryOrderDraftTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_sqlite_db(
+            self,
+            Barbers,
+            Services,
+            BarberServices,
+            BarberServiceDiscounts,
+            TemporaryOrder,
+            Order,
+            DailyOrderStat,
+            OrderUserStat,
+            name="drafts.db",
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(Barbers),
+                [{"id": 20, "experience": "3", "work_days": "Har kuni", "barber_first_name": "Vali"}],
+            )
+            await conn.execute(insert(Services), [{"id": 10, "name": "Soch olish"}])
+            await conn.execute(
+                insert(BarberServices),
+                [{"id": 5, "barber_id": 20, "service_id": 10, "price": 50000, "duration_minutes": 30}],
+            )
+        for name, value in (
+            ("async_session", self.session_factory),
+            ("is_slot_available_locked", AsyncMock(return_value=True)),
+            ("invalidate_barber_day", lambda *_args: None),
+            ("invalidate_order_pages", lambda: None),
+        ):
+            patcher = patch.object(db_temporary_orders, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _temporary_rows(self):
+        async with self.session_factory() as session:
+            return (await session.execute(select(TemporaryOrder.id))).scalars().all()
+
+    async def test_finalize_books_the_fsm_draft_not_the_stale_row(self):
+        # Bazadagi yozuv oldingi flush'dan: boshqa vaqt tanlangan edi
+        await db_temporary_orders.upsert_temporary_order(_draft(time="09:00"))
+
+        order = await db_temporary_orders.finalize_temporary_order(1, _draft())
+
+        self.assertEqual((order.date, order.time), (date(2026, 5, 11), time(11, 0)))
+        self.assertEqual((order.barber_service_id, order.booked_price), (5, 50000))
+        self.assertEqual(await self._temporary_rows(), [])
+
+    async def test_finalize_from_draft_works_without_a_flushed_row(self):
+        order = await db_temporary_orders.finalize_temporary_order(1, _draft())
+
+        self.assertEqual(order.service_name, "Soch olish")
+        self.assertEqual(await self._temporary_rows(), [])
+
+    async def test_incomplete_draft_is_rejected(self):
+        with self.assertRaises(db_temporary_orders.TemporaryOrderIncompleteError) as caught:
+            await db_temporary_orders.finalize_temporary_order(1, _draft(phonenumber=None))
+
+        self.assertEqual(caught.exception.missing_fields, ("phonenumber",))
+
+    def test_flush_is_due_once_per_interval(self):
+        interval = db_temporary_orders.TEMPORARY_ORDER_FLUSH_INTERVAL_SECONDS
+
+        self.assertTrue(db_temporary_orders.is_temporary_order_flush_due(None, 100.0))
+        self.assertFalse(db_temporary_orders.is_temporary_order_flush_due(100.0, 100.0 + interval / 2))
+        self.assertTrue(db_temporary_orders.is_temporary_order_flush_due(100.0, 100.0 + interval))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.webhook import SECRET_TOKEN_HEADER, build_webhook_app
+
+SECRET = "test-secret"
+
+
+def _message_update(update_id: int, chat_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1767225600,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+            "text": text,
+        },
+    }
+
+
+class WebhookAppTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.events = []
+        self.dispatcher = Dispatcher()
+        other_chat_done = asyncio.Event()
+
+        @self.dispatcher.message(F.text)
+        async def record(message: Message):
+            self.events.append((message.chat.id, message.text, "start"))
+            if message.text == "step1":
+                # Birinchi qadam boshqa chat ishlanguncha tugamaydi: keyingi qadam
+                # uni quvib o'tmasligi, boshqa chat esa uni kutmasligi kerak
+                await asyncio.wait_for(other_chat_done.wait(), timeout=2)
+            self.events.append((message.chat.id, message.text, "end"))
+            if message.chat.id == 20:
+                other_chat_done.set()
+
+        bot = Bot(token="42:TEST")
+        self.addAsyncCleanup(bot.session.close)
+        app = build_webhook_app(
+            self.dispatcher,
+            bot,
+            secret_token=SECRET,
+            workers=4,
+            max_pending=10,
+        )
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def _post(self, payload: dict, secret: str = SECRET):
+        return await self.client.post(
+            "/webhook",
+            json=payload,
+            headers={SECRET_TOKEN_HEADER: secret},
+        )
+
+    async def test_wrong_secret_is_rejected(self):
+        response = await self._post(_message_update(1, 10, "step1"), secret="wrong")
+
+        self.assertEqual(response.status, 401)
+        self.assertEqual(self.events, [])
+
+    async def test_health_endpoint_reports_pool(self):
+        response = await self.client.get("/health")
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            await response.json(),
+            {"status": "ok", "pending": 0, "workers": 4},
+        )
+
+    async def test_same_chat_keeps_order_while_other_chats_run_concurrently(self):
+        for payload in (
+            _message_update(1, 10, "step1"),
+            _message_update(2, 10, "step2"),
+            _message_update(3, 20, "other"),
+        ):
+            response = await self._post(payload)
+            self.assertEqual(response.status, 200)
+
+        for _ in range(100):
+            if len(self.events) == 6:
+                break
+            await asyncio.sleep(0.01)
+
+        chat_events = [event for event in self.events if event[0] == 10]
+        self.assertEqual(
+            chat_events,
+            [
+                (10, "step1", "start"),
+                (10, "step1", "end"),
+                (10, "step2", "start"),
+                (10, "step2", "end"),
+            ],
+        )
+        # Boshqa chat birinchi chatning sekin qadamini kutmaydi
+        self.assertLess(
+            self.events.index((20, "other", "end")),
+            self.events.index((10, "step1", "end")),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
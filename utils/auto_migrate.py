@@ -1,11 +1,20 @@
 # utils/auto_migrate.py
+import hashlib
 import logging
 import re
 
-from sqlalchemy import text
+from sqlalchemy import Column, delete, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 logger = logging.getLogger("auto_migrate")
 
+# auto_migrate mantig'i o'zgarsa (modellar emas) oshiriladi: barcha bazalar bir marta qayta tekshiriladi
+AUTO_MIGRATE_REVISION = 3
+# Bir vaqtda ishga tushgan worker'lar migratsiyani navbat bilan bajaradi (pg_advisory_xact_lock)
+SCHEMA_MIGRATION_LOCK_KEY = 0x6261726265725F31
+SCHEMA_VERSION_TABLE = "schema_version"
+
 _SA_TO_UDT = {
     "Integer": "int4",
     "BigInteger": "int8",
@@ -64,7 +73,7 @@ async def _get_db_columns(conn, table_name):
     result = await conn.execute(text(
         "SELECT column_name, data_type, udt_name, "
         "       character_maximum_length, numeric_precision, numeric_scale, "
-        "       is_nullable, column_default "
+        "       is_nullable, column_default, generation_expression "
         "FROM information_schema.columns "
         "WHERE table_schema = 'public' AND table_name = :tbl "
         "ORDER BY ordinal_position"
@@ -80,6 +89,7 @@ async def _get_db_columns(conn, table_name):
             "num_scale": row[5],
             "is_nullable": row[6] == "YES",
             "default": row[7],
+            "generation_expression": row[8],
         }
     return cols
 
@@ -92,6 +102,18 @@ async def _get_db_indexes(conn, table_name):
     return {row[0]: row[1] for row in result.fetchall()}
 
 
+async def _get_db_index_comments(conn, table_name):
+    result = await conn.execute(text(
+        "SELECT ic.relname, obj_description(ic.oid, 'pg_class') "
+        "FROM pg_index i "
+        "JOIN pg_class ic ON ic.oid = i.indexrelid "
+        "JOIN pg_class tc ON tc.oid = i.indrelid "
+        "JOIN pg_namespace n ON n.oid = tc.relnamespace "
+        "WHERE n.nspname = 'public' AND tc.relname = :tbl"
+    ), {"tbl": table_name})
+    return {row[0]: row[1] for row in result.fetchall()}
+
+
 async def _get_db_constraints(conn, table_name):
     fk_result = await conn.execute(text("""
         SELECT
@@ -146,6 +168,16 @@ async def _add_column(conn, table_name, col, dialect):
 
     parts = [f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS "{col.name}" {type_ddl}']
 
+    if col.computed is not None:
+        # Generated ustun: mavjud qatorlar uchun ham baza o'zi hisoblaydi
+        expression = col.computed.sqltext.compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        )
+        parts.append(f"GENERATED ALWAYS AS ({expression}) STORED")
+        await conn.execute(text(" ".join(parts)))
+        logger.info("  ✅ Generated ustun qo'shildi: %s.%s  (%s)", table_name, col.name, type_ddl)
+        return
+
     sd_compiled = _compile_server_default(col, dialect)
     if sd_compiled is not None:
         parts.append(f"DEFAULT {sd_compiled}")
@@ -165,6 +197,23 @@ async def _add_column(conn, table_name, col, dialect):
         )
 
 
+def _normalize_generation_expression(expression):
+    # Postgres ifodani o'zicha saqlaydi: (phonenumber)::text, '...'::text — turlar va qavslarsiz solishtiramiz
+    normalized = re.sub(r"::[a-z ]+", "", str(expression or "").lower())
+    return re.sub(r"[\s()]", "", normalized)
+
+
+def _generation_expression_changed(col, db_col_info, dialect):
+    if col.computed is None or not db_col_info.get("generation_expression"):
+        return False
+    model_expression = col.computed.sqltext.compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+    return _normalize_generation_expression(model_expression) != _normalize_generation_expression(
+        db_col_info["generation_expression"]
+    )
+
+
 async def _alter_column_type(conn, table_name, col_name, new_type_ddl):
     sql = (
         f'ALTER TABLE "{table_name}" '
@@ -273,7 +322,7 @@ async def _sync_column(conn, table_name, model_col, db_col_info, dialect):
             await _set_default(conn, table_name, col_name, model_default)
 
 
-async def _sync_indexes(conn, table_name, table, db_indexes):
+async def _sync_indexes(conn, table_name, table, db_indexes, db_index_comments=None):
     """Modelda belgilangan indekslarni bazaga qo'shish."""
     for col in table.columns:
         if not col.index:
@@ -306,6 +355,168 @@ async def _sync_indexes(conn, table_name, table, db_indexes):
                 await nested.rollback()
                 logger.error("  ❌ Indeks yaratib bo'lmadi: %s | Xato: %s", idx_name, exc)
 
+    await _drop_stale_column_indexes(conn, table_name, table, db_indexes)
+    await _sync_composite_indexes(conn, table_name, table, db_indexes, db_index_comments or {})
+
+
+async def _drop_stale_column_indexes(conn, table_name, table, db_indexes):
+    """
+    Modelda index=True olib tashlangan ustunlarning ix_<jadval>_<ustun> indekslarini o'chiradi
+    (masalan, kompozit indeks boshidagi ustun uchun ortiqcha bo'lib qolganlar).
+    Faqat create_all/auto_migrate nomlash qoidasidagi indekslar: qo'lda yaratilganlarga tegilmaydi.
+    """
+    model_index_names = {index.name for index in table.indexes}
+    for col in table.columns:
+        if col.index or col.primary_key:
+            continue
+        idx_name = f"ix_{table_name}_{col.name}"
+        if idx_name in model_index_names or idx_name not in db_indexes:
+            continue
+        nested = await conn.begin_nested()
+        try:
+            await conn.execute(text(f'DROP INDEX IF EXISTS "{idx_name}"'))
+            await nested.commit()
+            logger.info("  🗑️  Ortiqcha indeks o'chirildi: %s → %s", table_name, idx_name)
+        except Exception as exc:
+            await nested.rollback()
+            logger.error("  ❌ Indeksni o'chirib bo'lmadi: %s | Xato: %s", idx_name, exc)
+
+
+_INDEX_COMMENT_PREFIX = "auto_migrate:"
+
+
+def _has_expressions(index):
+    return any(not isinstance(expression, Column) for expression in index.expressions)
+
+
+def _is_composite_index(index):
+    """Ko'p ustunli, INCLUDE, WHERE (partial), USING/ops yoki ifodali indekslar."""
+    pg_options = index.dialect_options["postgresql"]
+    return (
+        len(index.expressions) > 1
+        or bool(pg_options.get("include"))
+        or pg_options.get("where") is not None
+        or bool(pg_options.get("using"))
+        or bool(pg_options.get("ops"))
+        or _has_expressions(index)
+    )
+
+
+def _index_ddl(index, dialect):
+    return " ".join(str(CreateIndex(index).compile(dialect=dialect)).split())
+
+
+def _index_fingerprint(index, dialect):
+    digest = hashlib.sha1(_index_ddl(index, dialect).encode("utf-8")).hexdigest()[:16]
+    return f"{_INDEX_COMMENT_PREFIX}{digest}"
+
+
+def _split_index_columns(group):
+    return [part.strip().strip('"') for part in group.split(",") if part.strip()]
+
+
+def _parse_indexdef(indexdef):
+    """
+    pg_indexes.indexdef dan (kalit ustunlar, INCLUDE ustunlar, WHERE bormi).
+    Masalan: CREATE INDEX ix ON public.orders USING btree (a, b) INCLUDE (c) WHERE (...)
+    """
+    match = re.search(
+        r"USING \w+ \((?P<keys>[^)]*)\)(?: INCLUDE \((?P<include>[^)]*)\))?(?P<where> WHERE .*)?$",
+        indexdef,
+    )
+    if not match:
+        return None
+    return (
+        _split_index_columns(match.group("keys")),
+        _split_index_columns(match.group("include") or ""),
+        match.group("where") is not None,
+    )
+
+
+def _model_index_shape(index):
+    pg_options = index.dialect_options["postgresql"]
+    if pg_options.get("using") or pg_options.get("ops") or _has_expressions(index):
+        # indexdef'dan ishonchli solishtirib bo'lmaydi: bir marta qayta yaratiladi
+        return None
+    include = [
+        getattr(column, "name", column) for column in (pg_options.get("include") or [])
+    ]
+    return (
+        [column.name for column in index.columns],
+        include,
+        pg_options.get("where") is not None,
+    )
+
+
+async def _create_index(conn, index, dialect, fingerprint):
+    nested = await conn.begin_nested()
+    try:
+        await conn.execute(text(_index_ddl(index, dialect)))
+        await conn.execute(text(f'COMMENT ON INDEX "{index.name}" IS \'{fingerprint}\''))
+        await nested.commit()
+        logger.info("  📇 Indeks yaratildi: %s → %s", index.table.name, index.name)
+        return True
+    except Exception as exc:
+        await nested.rollback()
+        logger.error("  ❌ Indeks yaratib bo'lmadi: %s | Xato: %s", index.name, exc)
+        return False
+
+
+async def _sync_composite_indexes(conn, table_name, table, db_indexes, db_index_comments):
+    """
+    Ko'p ustunli / INCLUDE / partial indekslarni nomi bo'yicha solishtiradi.
+    Ta'rif model DDL xeshi sifatida indeks izohida saqlanadi: o'zgarsa qayta yaratiladi.
+    """
+    dialect = conn.dialect
+    for index in table.indexes:
+        if not index.name or not _is_composite_index(index):
+            continue
+
+        fingerprint = _index_fingerprint(index, dialect)
+        if index.name not in db_indexes:
+            await _create_index(conn, index, dialect, fingerprint)
+            continue
+
+        comment = db_index_comments.get(index.name)
+        if comment == fingerprint:
+            continue
+
+        if comment is None and _parse_indexdef(db_indexes[index.name]) == _model_index_shape(index):
+            # create_all bilan yaratilgan (izohsiz) indeks: ta'rif mos, faqat belgilaymiz
+            await conn.execute(text(f'COMMENT ON INDEX "{index.name}" IS \'{fingerprint}\''))
+            continue
+
+        logger.info("  🔁 Indeks ta'rifi o'zgargan: %s → %s", table_name, index.name)
+        nested = await conn.begin_nested()
+        try:
+            await conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+            await nested.commit()
+        except Exception as exc:
+            await nested.rollback()
+            logger.error("  ❌ Indeksni o'chirib bo'lmadi: %s | Xato: %s", index.name, exc)
+            continue
+        await _create_index(conn, index, dialect, fingerprint)
+
+
+async def _ensure_extensions(conn, metadata):
+    """Indekslar talab qiladigan kengaytmalar (masalan pg_trgm) — jadvallardan oldin."""
+    extensions = sorted(
+        {
+            extension
+            for table in metadata.tables.values()
+            for index in table.indexes
+            for extension in index.info.get("postgresql_extensions", ())
+        }
+    )
+    for extension in extensions:
+        nested = await conn.begin_nested()
+        try:
+            await conn.execute(text(f'CREATE EXTENSION IF NOT EXISTS "{extension}"'))
+            await nested.commit()
+        except Exception as exc:
+            await nested.rollback()
+            logger.error("  ❌ Kengaytmani yoqib bo'lmadi: %s | Xato: %s", extension, exc)
+
 
 # ────────────────────────────────────────────────────────────
 # Foreign Key larni sinxronlash
@@ -357,6 +568,17 @@ async def _sync_foreign_keys(conn, table_name, table, db_constraints):
 # Unique Constraint larni sinxronlash
 # ────────────────────────────────────────────────────────────
 
+async def _delete_duplicate_rows(conn, table_name, columns):
+    """Unique qo'shishdan oldin takroriy qatorlardan birinchisini (eng kichik ctid) qoldiradi."""
+    matches = " AND ".join(f'a."{c}" = b."{c}"' for c in columns)
+    result = await conn.execute(text(
+        f'DELETE FROM "{table_name}" a USING "{table_name}" b '
+        f"WHERE a.ctid > b.ctid AND {matches}"
+    ))
+    if result.rowcount:
+        logger.info("  🧹 Takroriy qatorlar o'chirildi: %s (%s ta)", table_name, result.rowcount)
+
+
 async def _sync_unique_constraints(conn, table_name, table, db_constraints):
     """Modelda belgilangan unique constraintlarni bazaga qo'shish."""
     # __table_args__ dagi UniqueConstraint lar
@@ -385,6 +607,8 @@ async def _sync_unique_constraints(conn, table_name, table, db_constraints):
             sql = f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{uq_name}" UNIQUE ({cols_str})'
             nested = await conn.begin_nested()
             try:
+                if constraint.info.get("dedupe_before_create"):
+                    await _delete_duplicate_rows(conn, table_name, uq_cols)
                 await conn.execute(text(sql))
                 await nested.commit()
                 logger.info("  🔒 Unique qo'shildi: %s → %s (%s)", table_name, uq_name, uq_cols)
@@ -455,6 +679,8 @@ async def auto_migrate(conn, metadata, *, drop_columns=False):
 
     changes_count = 0
 
+    await _ensure_extensions(conn, metadata)
+
     # ── 1) MODELDA YO'Q BO'LGAN JADVALLARNI O'CHIRISH (DROP TABLE) ──
     for db_table_name in existing_tables:
         if db_table_name not in model_tables:
@@ -486,6 +712,7 @@ async def auto_migrate(conn, metadata, *, drop_columns=False):
         # ── Bazadagi ma'lumotlarni olish ──
         db_columns = await _get_db_columns(conn, table_name)
         db_indexes = await _get_db_indexes(conn, table_name)
+        db_index_comments = await _get_db_index_comments(conn, table_name)
         db_constraints = await _get_db_constraints(conn, table_name)
 
         model_columns = {col.name: col for col in table.columns}
@@ -496,6 +723,22 @@ async def auto_migrate(conn, metadata, *, drop_columns=False):
                 await _add_column(conn, table_name, col, dialect)
                 changes_count += 1
 
+        # ── 1b) IFODASI O'ZGARGAN GENERATED USTUNLAR: o'chirib qayta qo'shiladi ──
+        # (ALTER ... SET EXPRESSION faqat PG17+; ustun indekslari 4-qadamda qayta yaratiladi)
+        rebuilt_generated = False
+        for col_name, col in model_columns.items():
+            if col_name in db_columns and _generation_expression_changed(
+                col, db_columns[col_name], dialect
+            ):
+                logger.info("  🔁 Generated ustun ifodasi o'zgardi: %s.%s", table_name, col_name)
+                await _drop_column(conn, table_name, col_name)
+                await _add_column(conn, table_name, col, dialect)
+                rebuilt_generated = True
+                changes_count += 1
+        if rebuilt_generated:
+            db_indexes = await _get_db_indexes(conn, table_name)
+            db_index_comments = await _get_db_index_comments(conn, table_name)
+
         # ── 2) ORTIQCHA USTUNLARNI BOSHQARISH ──
         for col_name in db_columns:
             if col_name not in model_columns:
@@ -515,7 +758,7 @@ async def auto_migrate(conn, metadata, *, drop_columns=False):
                 await _sync_column(conn, table_name, col, db_columns[col_name], dialect)
 
         # ── 4) INDEKSLAR ──
-        await _sync_indexes(conn, table_name, table, db_indexes)
+        await _sync_indexes(conn, table_name, table, db_indexes, db_index_comments)
 
         # ── 5) FOREIGN KEYS ──
         await _sync_foreign_keys(conn, table_name, table, db_constraints)
@@ -526,3 +769,67 @@ async def auto_migrate(conn, metadata, *, drop_columns=False):
     logger.info("=" * 60)
     logger.info("✅ AUTO-MIGRATE tugadi. O'zgarishlar soni: %d", changes_count)
     logger.info("=" * 60)
+
+
+# ────────────────────────────────────────────────────────────
+# Sxema fingerprint: o'zgarmagan ishga tushishlarda auto_migrate o'tkazib yuboriladi
+# ────────────────────────────────────────────────────────────
+
+def metadata_fingerprint(metadata):
+    """Base.metadata'ning PostgreSQL DDL'i (jadvallar, indekslar, kengaytmalar) sha256 xeshi."""
+    dialect = postgresql.dialect()
+    digest = hashlib.sha256(f"auto_migrate:{AUTO_MIGRATE_REVISION}\n".encode("utf-8"))
+    for table_name in sorted(metadata.tables):
+        table = metadata.tables[table_name]
+        digest.update(" ".join(str(CreateTable(table).compile(dialect=dialect)).split()).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda item: item.name or ""):
+            digest.update(_index_ddl(index, dialect).encode("utf-8"))
+            extensions = ",".join(sorted(index.info.get("postgresql_extensions", ())))
+            digest.update(f"extensions:{extensions}".encode("utf-8"))
+        for constraint in sorted(table.constraints, key=lambda item: item.name or ""):
+            if constraint.info:
+                digest.update(f"{constraint.name}:{sorted(constraint.info.items())}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def get_stored_fingerprint(conn):
+    has_table = await conn.run_sync(
+        lambda sync_conn: inspect(sync_conn).has_table(SCHEMA_VERSION_TABLE)
+    )
+    if not has_table:
+        return None
+    from sql.models import SchemaVersion
+
+    return await conn.scalar(select(SchemaVersion.fingerprint).where(SchemaVersion.id == 1))
+
+
+async def _store_fingerprint(conn, fingerprint):
+    from sql.models import SchemaVersion
+
+    await conn.run_sync(SchemaVersion.__table__.create, checkfirst=True)
+    await conn.execute(delete(SchemaVersion))
+    await conn.execute(insert(SchemaVersion).values(id=1, fingerprint=fingerprint))
+
+
+async def migrate_if_changed(conn, metadata, *, drop_columns=False, force=False):
+    """
+    Saqlangan fingerprint model bilan mos bo'lsa auto_migrate'ni o'tkazib yuboradi.
+    Postgres'da tranzaksiya davomida advisory lock olinadi: rolling deploy'da bitta
+    worker migratsiya qiladi, qolganlari kutib, keyin mos fingerprint'ni ko'rib o'tadi.
+    force=True — baza qo'lda o'zgartirilgan bo'lsa ham to'liq tekshirish.
+    Qaytaradi: auto_migrate ishladimi.
+    """
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": SCHEMA_MIGRATION_LOCK_KEY},
+        )
+
+    fingerprint = metadata_fingerprint(metadata)
+    if not force and await get_stored_fingerprint(conn) == fingerprint:
+        logger.info("✅ Sxema o'zgarmagan (%s) — auto_migrate o'tkazib yuborildi", fingerprint[:12])
+        return False
+
+    await auto_migrate(conn, metadata, drop_columns=drop_columns)
+    await _store_fingerprint(conn, fingerprint)
+    return True
@@ -0,0 +1,34 @@
+#utils/backfill_order_stats.py
+"""
+daily_order_stats va order_user_stats yig'malarini orders'dan qaytadan hisoblash.
+
+Ishga tushirish:  python -m utils.backfill_order_stats
+
+Birinchi joylashtirishda (eski buyurtmalar uchun) yoki yig'ma shubhali bo'lsa ishlatiladi.
+Keyin yig'ma buyurtma yozish/o'chirish yo'llarida avtomatik yangilanib boradi.
+"""
+import argparse
+import asyncio
+import logging
+
+from sql.db import engine, init_db
+from sql.db_order_rollup import backfill_order_stats
+
+
+async def run_backfill() -> int:
+    await init_db()
+    try:
+        return await backfill_order_stats()
+    finally:
+        await engine.dispose()
+
+
+def main():
+    argparse.ArgumentParser(description="daily_order_stats yig'masini qayta hisoblash").parse_args()
+    logging.basicConfig(level=logging.INFO)
+    rows = asyncio.run(run_backfill())
+    print(f"daily_order_stats: {rows} ta qator yozildi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#utils/bench_order_indexes.py
+"""
+orders indekslari uchun benchmark: issiq so'rovlarning EXPLAIN (ANALYZE, BUFFERS) rejasi.
+
+Ishga tushirish:  python -m utils.bench_order_indexes --rows 200000
+
+Haqiqiy ma'lumotlarga tegmaydi: public.orders nusxasi (indekslari bilan) vaqtinchalik
+jadvalga yaratiladi, sintetik qatorlar bilan to'ldiriladi va VACUUM ANALYZE qilinadi.
+Vaqtinchalik jadval shu ulanishda public.orders ni "yopadi", ulanish yopilganda o'chadi.
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from sqlalchemy import func, select, text
+
+from sql.db import engine
+from sql.models import Order
+
+BENCH_DAY = date(2026, 5, 11)
+BENCH_BARBER_ID = 1
+BENCH_USER_ID = 1001
+
+
+def _hot_queries():
+    # Yo'llar: db_availability, superadmins/todays_orders, queue._fetch_queue_orders, statistika
+    return {
+        "availability: vaqt + davomiylik": select(Order.time, Order.booked_duration_minutes).where(
+            Order.barber_id == BENCH_BARBER_ID,
+            Order.date == BENCH_DAY,
+        ),
+        "get_booked_times": select(Order.time).where(
+            Order.barber_id == BENCH_BARBER_ID,
+            Order.date == BENCH_DAY,
+        ),
+        "todays_orders: vaqt tartibida": select(Order.id, Order.time)
+        .where(Order.barber_id == BENCH_BARBER_ID, Order.date == BENCH_DAY)
+        .order_by(Order.time),
+        "queue: mijoz navbatlari": select(Order.id, Order.date, Order.time)
+        .where(Order.user_id == BENCH_USER_ID, Order.date >= BENCH_DAY)
+        .order_by(Order.date.asc(), Order.time.asc(), Order.id.asc()),
+        "statistics: kunlik son": select(func.count()).where(
+            Order.barber_id == BENCH_BARBER_ID,
+            Order.date == BENCH_DAY,
+        ),
+    }
+
+
+_SEED_SQL = """
+INSERT INTO orders (
+    id, user_id, fullname, phonenumber, barber_id, service_name, barber_id_name,
+    barber_name, booked_price, booked_duration_minutes, "date", "time", booked_date, booked_time
+)
+SELECT
+    g,
+    1000 + (g % :users),
+    'Bench', '+998900000000',
+    1 + (g % :barbers),
+    'Bench', 'bench', 'Bench',
+    50000, 30,
+    CAST(:start_day AS date) + (g % :days),
+    make_time(9 + (g / :barbers % 10), (g / (:barbers * 10) % 2) * 30, 0),
+    CAST(:start_day AS date), time '09:00'
+FROM generate_series(1, :rows) AS g
+"""
+
+
+async def run_benchmark(rows: int, *, barbers: int = 20, days: int = 120, users: int = 5000):
+    compiled = {
+        name: query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+        for name, query in _hot_queries().items()
+    }
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("DROP TABLE IF EXISTS pg_temp.orders"))
+        await conn.execute(
+            text("CREATE TEMP TABLE orders (LIKE public.orders INCLUDING ALL)")
+        )
+        await conn.execute(
+            text(_SEED_SQL),
+            {
+                "rows": rows,
+                "barbers": barbers,
+                "days": days,
+                "users": users,
+                "start_day": BENCH_DAY - timedelta(days=days // 2),
+            },
+        )
+        # Visibility map: index-only scan heap'ga qaytmasligi uchun
+        await conn.execute(text("VACUUM ANALYZE pg_temp.orders"))
+
+        for name, statement in compiled.items():
+            result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {statement}"))
+            plan = [row[0] for row in result]
+            index_only = any("Index Only Scan" in line for line in plan)
+            verdict = "ha" if index_only else "yo'q"
+            print(f"\n=== {name} — index-only: {verdict}")
+            print("\n".join(plan))
+
+        await conn.execute(text("DROP TABLE IF EXISTS pg_temp.orders"))
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="orders indekslari benchmarki")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.rows))
+
+
+if __name__ == "__main__":
+    main()
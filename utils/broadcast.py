@@ -0,0 +1,328 @@
+#utils/broadcast.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections.abc import Awaitable, Callable, Sequence
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from sql.db_broadcast import (
+    BROADCAST_JOB_DONE,
+    BROADCAST_JOB_RUNNING,
+    claim_broadcast_jobs,
+    claim_pending_recipients,
+    finish_broadcast_collection,
+    get_broadcast_job,
+    record_broadcast_results,
+    renew_broadcast_lease,
+    set_broadcast_job_status,
+)
+from sql.models import BroadcastJob
+
+logger = logging.getLogger(__name__)
+
+# Telegram: umumiy ~30 xabar/soniya, bitta chatga ~1 xabar/soniya
+BROADCAST_GLOBAL_RATE = 25.0
+BROADCAST_PER_CHAT_INTERVAL_SECONDS = 1.0
+BROADCAST_CONCURRENCY = 8
+BROADCAST_CHUNK_SIZE = 200
+BROADCAST_MAX_RETRIES = 3
+# Tarmoq va boshqa vaqtinchalik xatoliklarda qayta urinish: 1, 2, 4 ... soniya
+BROADCAST_RETRY_BACKOFF_SECONDS = 1.0
+# Vazifa ijarasi: egasi to'xtasa shu muddatdan keyin boshqa worker davom ettiradi
+BROADCAST_LEASE_SECONDS = 120.0
+BROADCAST_PROGRESS_INTERVAL_SECONDS = 3.0
+# Qabul qiluvchilar hali yig'ilayotganda navbatni qayta tekshirish oralig'i
+BROADCAST_COLLECT_POLL_SECONDS = 0.2
+
+Clock = Callable[[], float]
+Sleep = Callable[[float], Awaitable[None]]
+
+
+def _process_owner_id() -> str:
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TokenBucket:
+    """Global tezlik cheklovchisi; retry_after kelganda hamma yuboruvchilar to'xtaydi."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        *,
+        clock: Clock = monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ) -> None:
+        self._rate = float(rate)
+        self._capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+        self._tokens = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated_at, 0.0)
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._blocked_until:
+                    await self._sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await self._sleep((1.0 - self._tokens) / self._rate)
+
+
+class PerChatLimiter:
+    """Bitta chatga ketma-ket xabarlar orasidagi minimal oraliq."""
+
+    def __init__(
+        self,
+        interval: float,
+        *,
+        clock: Clock = monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ) -> None:
+        self._interval = interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next_allowed: dict[int, float] = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        now = self._clock()
+        # Eskirgan yozuvlar lug'atni o'stirmasligi uchun tozalanadi
+        if len(self._next_allowed) > 10_000:
+            self._next_allowed = {
+                key: value for key, value in self._next_allowed.items() if value > now
+            }
+        allowed_at = self._next_allowed.get(chat_id, 0.0)
+        self._next_allowed[chat_id] = max(allowed_at, now) + self._interval
+        if allowed_at > now:
+            await self._sleep(allowed_at - now)
+
+
+def format_broadcast_progress(job: BroadcastJob, *, finished: bool = False) -> str:
+    counts = (
+        f"✅ Yuborildi: {job.sent} ta\n"
+        f"❌ Xatolik: {job.failed} ta\n"
+        f"👥 Jami: {job.total} ta"
+    )
+    if not finished:
+        return f"📨 Xabar yuborilmoqda...\n\n{counts}"
+    if job.sent == 0:
+        return f"❌ Xabar yuborilmadi.\n\n{counts}"
+    return f"Xabar muvaffaqiyatli yuborildi ✅\n\n{counts}"
+
+
+class BroadcastEngine:
+    def __init__(
+        self,
+        *,
+        global_rate: float = BROADCAST_GLOBAL_RATE,
+        per_chat_interval: float = BROADCAST_PER_CHAT_INTERVAL_SECONDS,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        chunk_size: int = BROADCAST_CHUNK_SIZE,
+        max_retries: int = BROADCAST_MAX_RETRIES,
+        retry_backoff: float = BROADCAST_RETRY_BACKOFF_SECONDS,
+        progress_interval: float = BROADCAST_PROGRESS_INTERVAL_SECONDS,
+        lease_seconds: float = BROADCAST_LEASE_SECONDS,
+        owner: str | None = None,
+        clock: Clock = monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ) -> None:
+        self._bucket = TokenBucket(global_rate, clock=clock, sleep=sleep)
+        self._chat_limiter = PerChatLimiter(per_chat_interval, clock=clock, sleep=sleep)
+        self._concurrency = concurrency
+        self._chunk_size = chunk_size
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._progress_interval = progress_interval
+        self.lease_seconds = lease_seconds
+        self.owner = owner or _process_owner_id()
+        self._clock = clock
+        self._sleep = sleep
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    async def send_message(
+        self,
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        *,
+        parse_mode: str | None = None,
+    ) -> str | None:
+        """Umumiy limitlar ostida bitta xabar; muvaffaqiyatli bo'lsa None, aks holda xatolik matni."""
+        failures = 0
+        for _ in range(self._max_retries + 1):
+            await self._chat_limiter.acquire(chat_id)
+            await self._bucket.acquire()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                return None
+            except TelegramRetryAfter as exc:
+                logger.warning("Broadcast flood control: retry_after=%s", exc.retry_after)
+                self._bucket.pause(exc.retry_after)
+                await self._sleep(exc.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as exc:
+                return exc.message
+            except Exception as exc:
+                error = str(exc) or exc.__class__.__name__
+                logger.warning("Broadcast send failed: chat_id=%s error=%s", chat_id, error)
+                if failures >= self._max_retries:
+                    return error
+                await self._sleep(self._retry_backoff * 2**failures)
+                failures += 1
+        return "retry limit"
+
+    async def send_many(
+        self,
+        bot: Bot,
+        messages: Sequence[tuple[int, str]],
+        *,
+        parse_mode: str | None = None,
+    ) -> list[str | None]:
+        """(chat_id, matn) juftlarini parallel yuboradi; natijalar kirish tartibida."""
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def send(chat_id: int, text: str) -> str | None:
+            async with semaphore:
+                return await self.send_message(bot, chat_id, text, parse_mode=parse_mode)
+
+        return list(await asyncio.gather(*(send(chat_id, text) for chat_id, text in messages)))
+
+    async def _send_chunk(
+        self,
+        bot: Bot,
+        job: BroadcastJob,
+        chat_ids: list[int],
+    ) -> tuple[list[int], dict[int, str]]:
+        errors = await self.send_many(
+            bot,
+            [(chat_id, job.text) for chat_id in chat_ids],
+            parse_mode=job.parse_mode,
+        )
+        sent = [chat_id for chat_id, error in zip(chat_ids, errors) if error is None]
+        failed = {chat_id: error for chat_id, error in zip(chat_ids, errors) if error is not None}
+        return sent, failed
+
+    async def _show_progress(self, bot: Bot, job: BroadcastJob, *, finished: bool) -> None:
+        if not job.progress_chat_id or not job.progress_message_id:
+            return
+        try:
+            await bot.edit_message_text(
+                chat_id=job.progress_chat_id,
+                message_id=job.progress_message_id,
+                text=format_broadcast_progress(job, finished=finished),
+            )
+        except Exception:
+            # "message is not modified" va o'chirilgan xabar e'tiborsiz qoldiriladi
+            pass
+
+    async def run_job(self, bot: Bot, job_id: int) -> BroadcastJob | None:
+        job = await get_broadcast_job(job_id)
+        if job is None or job.status == BROADCAST_JOB_DONE:
+            return job
+        # Boshqa tirik worker ijarasidagi vazifa: u yerda davom etmoqda
+        if not await claim_broadcast_jobs(self.owner, self.lease_seconds, job_id=job_id):
+            logger.info("Broadcast job is owned by another worker: job_id=%s", job_id)
+            return job
+
+        await set_broadcast_job_status(job_id, BROADCAST_JOB_RUNNING)
+        last_progress_at = renewed_at = self._clock()
+        while True:
+            if self._clock() - renewed_at >= self.lease_seconds / 3:
+                renewed_at = self._clock()
+                if not await renew_broadcast_lease(job_id, self.owner, self.lease_seconds):
+                    logger.warning("Broadcast lease lost: job_id=%s", job_id)
+                    return job
+
+            chat_ids = await claim_pending_recipients(job_id, self.owner, self._chunk_size)
+            if not chat_ids:
+                job = await get_broadcast_job(job_id) or job
+                if not job.is_collecting:
+                    break
+                await self._sleep(BROADCAST_COLLECT_POLL_SECONDS)
+                continue
+            sent, failed = await self._send_chunk(bot, job, chat_ids)
+            job = await record_broadcast_results(job_id, sent_chat_ids=sent, failed=failed) or job
+            if self._clock() - last_progress_at >= self._progress_interval:
+                last_progress_at = self._clock()
+                await self._show_progress(bot, job, finished=False)
+
+        await set_broadcast_job_status(job_id, BROADCAST_JOB_DONE)
+        job = await get_broadcast_job(job_id) or job
+        await self._show_progress(bot, job, finished=True)
+        logger.info(
+            "Broadcast finished: job_id=%s sent=%s failed=%s",
+            job_id,
+            job.sent,
+            job.failed,
+        )
+        return job
+
+    def start(self, bot: Bot, job_id: int) -> asyncio.Task:
+        """Vazifani fonda ishga tushiradi; bitta vazifa ikki marta ishlamaydi."""
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.create_task(self.run_job(bot, job_id), name=f"broadcast-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda done: self._forget(job_id, done))
+        return task
+
+    def _forget(self, job_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(job_id) is task:
+            self._tasks.pop(job_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Vazifa "running" holatida qoladi va keyingi ishga tushishda davom etadi
+            logger.error("Broadcast job failed: job_id=%s", job_id, exc_info=task.exception())
+
+    async def resume_unfinished(self, bot: Bot) -> int:
+        """
+        Egasiz yoki egasining ijarasi tugagan vazifalarni shu jarayonga olib davom ettiradi.
+        Tirik worker bajarayotgan (ijarasi amal qilayotgan) vazifalarga tegilmaydi.
+        """
+        job_ids = await claim_broadcast_jobs(
+            self.owner,
+            self.lease_seconds,
+            exclude_ids=list(self._tasks),
+        )
+        for job_id in job_ids:
+            # Faqat egasi to'xtagan (ijarasi tugagan yoki egasiz) vazifalar olinadi:
+            # oqimni yig'ayotgan jarayon tirik emas, borlariga yuborib yakunlaymiz
+            await finish_broadcast_collection(job_id)
+            self.start(bot, job_id)
+        return len(job_ids)
+
+    async def watch_unfinished(self, bot: Bot) -> None:
+        """Ishga tushganda va har ijara muddatida to'xtab qolgan vazifalarni tekshiradi."""
+        while True:
+            try:
+                await self.resume_unfinished(bot)
+            except Exception:
+                logger.exception("Broadcast resume failed")
+            await asyncio.sleep(self.lease_seconds)
+
+
+broadcast_engine = BroadcastEngine()
@@ -0,0 +1,60 @@
+#utils/migrate.py
+"""
+Sxema migratsiyasini bot jarayonidan tashqarida ishga tushirish.
+
+Ishga tushirish:  python -m utils.migrate [--force] [--drop-columns] [--check]
+
+Deploy'da bot worker'laridan oldin ishlatilsa, worker'lar schema_version'dagi
+fingerprint'ni mos ko'rib auto_migrate'siz darhol ishga tushadi.
+  --force         fingerprint mos bo'lsa ham to'liq tekshirish (baza qo'lda o'zgargan bo'lsa)
+  --drop-columns  modelda yo'q ustunlarni ham o'chirish
+  --check         hech narsa o'zgartirmaydi; migratsiya kerak bo'lsa chiqish kodi 1
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+import sql.models  # noqa: F401 — modellarni ro'yxatga olish
+from sql.db import Base, engine
+from utils.auto_migrate import get_stored_fingerprint, metadata_fingerprint, migrate_if_changed
+
+
+async def run_migrate(*, force: bool = False, drop_columns: bool = False) -> bool:
+    try:
+        async with engine.begin() as conn:
+            return await migrate_if_changed(
+                conn, Base.metadata, drop_columns=drop_columns, force=force
+            )
+    finally:
+        await engine.dispose()
+
+
+async def check_migration_needed() -> bool:
+    try:
+        async with engine.connect() as conn:
+            stored = await get_stored_fingerprint(conn)
+    finally:
+        await engine.dispose()
+    return stored != metadata_fingerprint(Base.metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sxemani sql/models.py bilan moslashtirish")
+    parser.add_argument("--force", action="store_true", help="fingerprint mos bo'lsa ham tekshirish")
+    parser.add_argument("--drop-columns", action="store_true", help="modelda yo'q ustunlarni o'chirish")
+    parser.add_argument("--check", action="store_true", help="faqat migratsiya kerakligini tekshirish")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.check:
+        needed = asyncio.run(check_migration_needed())
+        print("Migratsiya kerak" if needed else "Sxema yangi")
+        sys.exit(1 if needed else 0)
+
+    migrated = asyncio.run(run_migrate(force=args.force, drop_columns=args.drop_columns))
+    print("auto_migrate bajarildi" if migrated else "Sxema o'zgarmagan, migratsiya o'tkazib yuborildi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#utils/role_middleware.py
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from sql.db_roles import RoleCache, role_cache
+
+
+class RoleMiddleware(BaseMiddleware):
+    """
+    Update boshida foydalanuvchi rollarini (admin, barber, ro'yxatdan o'tgan) bir marta
+    aniqlaydi va handler'larga `roles` argumenti sifatida beradi.
+    dp.update.outer_middleware sifatida ulanadi: event_from_user'ni aiogram'ning
+    UserContextMiddleware'i undan oldin qo'yadi.
+    """
+
+    def __init__(self, cache: RoleCache = role_cache):
+        self._cache = cache
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            data["roles"] = await self._cache.resolve(user.id)
+        return await handler(event, data)
@@ -39,24 +39,39 @@ def attach_service_discount_snapshot(
     setattr(service, SERVICE_DISCOUNTED_PRICE_ATTR, discounted_price)
 
 
-def get_service_price_snapshot(service: object) -> ServicePriceSnapshot:
-    base_price = int(getattr(service, "price", 0) or 0)
-    discount_percent = getattr(service, SERVICE_DISCOUNT_PERCENT_ATTR, None)
-    discounted_price = getattr(service, SERVICE_DISCOUNTED_PRICE_ATTR, None)
-
+def build_price_snapshot(
+    base_price: int | None,
+    *,
+    discount_percent: Decimal | None,
+    discounted_price: int | None,
+) -> ServicePriceSnapshot:
+    normalized_base_price = int(base_price or 0)
     if discount_percent is None or discounted_price is None:
         return ServicePriceSnapshot(
-            base_price=base_price,
-            current_price=base_price,
+            base_price=normalized_base_price,
+            current_price=normalized_base_price,
         )
 
     return ServicePriceSnapshot(
-        base_price=base_price,
+        base_price=normalized_base_price,
         current_price=int(discounted_price),
         discount_percent=discount_percent,
     )
 
 
+def get_service_price_snapshot(service: object) -> ServicePriceSnapshot:
+    # Tayyor narx (masalan, katalog nusxasidagi CatalogOffering) bo'lsa — o'sha
+    snapshot = getattr(service, "price_snapshot", None)
+    if isinstance(snapshot, ServicePriceSnapshot):
+        return snapshot
+
+    return build_price_snapshot(
+        getattr(service, "price", 0),
+        discount_percent=getattr(service, SERVICE_DISCOUNT_PERCENT_ATTR, None),
+        discounted_price=getattr(service, SERVICE_DISCOUNTED_PRICE_ATTR, None),
+    )
+
+
 def build_service_price_lines(service: object) -> tuple[str, ...]:
     snapshot = get_service_price_snapshot(service)
     if not snapshot.has_discount:
@@ -0,0 +1,200 @@
+#utils/webhook.py
+import asyncio
+import hmac
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+HEALTH_PATH = "/health"
+
+UpdateHandler = Callable[[Update], Awaitable[Any]]
+
+
+def update_order_key(update: Update) -> Hashable:
+    """Bitta chat (yoki foydalanuvchi) update'lari shu kalit bo'yicha ketma-ket ishlanadi."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat_id is not None:
+        return ("chat", context.chat_id)
+    if context.user_id is not None:
+        return ("user", context.user_id)
+    # Chatga bog'lanmagan update'lar (poll va h.k.) tartibni talab qilmaydi
+    return ("update", update.update_id)
+
+
+class OrderedUpdatePool:
+    """
+    Cheklangan worker pool: turli chatlar parallel, bitta chat esa qat'iy
+    kelish tartibida ishlanadi. Navbat to'lsa submit kutadi (backpressure).
+    """
+
+    def __init__(
+        self,
+        handler: UpdateHandler,
+        *,
+        workers: int = 16,
+        max_pending: int = 1000,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+        self._handler = handler
+        self._workers_count = workers
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._pending = 0
+        # Navbatdagi (yoki hozir ishlanayotgan) chatlar va ularning update'lari
+        self._chat_queues: dict[Hashable, deque[Update]] = {}
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def workers(self) -> int:
+        return self._workers_count
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{index}")
+            for index in range(self._workers_count)
+        ]
+
+    async def submit(self, update: Update) -> None:
+        await self._capacity.acquire()
+        self._pending += 1
+        key = update_order_key(update)
+        chat_queue = self._chat_queues.get(key)
+        if chat_queue is not None:
+            # Chat allaqachon workerda: tartib saqlanishi uchun uning orqasiga qo'yamiz
+            chat_queue.append(update)
+            return
+        self._chat_queues[key] = deque([update])
+        self._ready.put_nowait(key)
+
+    async def join(self) -> None:
+        """Barcha qabul qilingan update'lar ishlanib bo'lguncha kutadi."""
+        await self._ready.join()
+
+    async def close(self) -> None:
+        await self.join()
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            try:
+                await self._drain_chat(key)
+            finally:
+                self._ready.task_done()
+
+    async def _drain_chat(self, key: Hashable) -> None:
+        chat_queue = self._chat_queues[key]
+        while chat_queue:
+            update = chat_queue[0]
+            try:
+                await self._handler(update)
+            except Exception:
+                logger.exception("Webhook update failed: update_id=%s", update.update_id)
+            finally:
+                chat_queue.popleft()
+                self._pending -= 1
+                self._capacity.release()
+        del self._chat_queues[key]
+
+
+class WebhookHandler:
+    def __init__(
+        self,
+        bot: Bot,
+        pool: OrderedUpdatePool,
+        *,
+        secret_token: str | None = None,
+    ) -> None:
+        self._bot = bot
+        self._pool = pool
+        self._secret_token = secret_token
+
+    def _is_authorized(self, request: web.Request) -> bool:
+        if not self._secret_token:
+            return True
+        received = request.headers.get(SECRET_TOKEN_HEADER, "")
+        return hmac.compare_digest(received.encode(), self._secret_token.encode())
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if not self._is_authorized(request):
+            return web.Response(status=401, text="Unauthorized")
+        try:
+            payload = await request.json()
+            update = Update.model_validate(payload, context={"bot": self._bot})
+        except Exception:
+            logger.warning("Webhook: noto'g'ri update keldi")
+            return web.Response(status=400, text="Bad Request")
+
+        # Telegram tez javob kutadi: update pool'ga topshiriladi, ishlov fonda
+        await self._pool.submit(update)
+        return web.Response(text="OK")
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "status": "ok" if self._pool.running else "starting",
+                "pending": self._pool.pending,
+                "workers": self._pool.workers,
+            }
+        )
+
+
+UPDATE_POOL_KEY = web.AppKey("update_pool", OrderedUpdatePool)
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    path: str = "/webhook",
+    secret_token: str | None = None,
+    workers: int = 16,
+    max_pending: int = 1000,
+) -> web.Application:
+    async def feed(update: Update) -> None:
+        await dispatcher.feed_update(bot, update)
+
+    pool = OrderedUpdatePool(feed, workers=workers, max_pending=max_pending)
+    handler = WebhookHandler(bot, pool, secret_token=secret_token)
+
+    async def on_startup(app: web.Application) -> None:
+        pool.start()
+        await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+
+    async def on_shutdown(app: web.Application) -> None:
+        await pool.close()
+        await dispatcher.emit_shutdown(bot=bot, dispatcher=dispatcher)
+
+    app = web.Application()
+    app[UPDATE_POOL_KEY] = pool
+    app.router.add_post(path, handler.handle_update)
+    app.router.add_get(HEALTH_PATH, handler.handle_health)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app